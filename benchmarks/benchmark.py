@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Local benchmark for the backup runner.
+
+Runs ``container/backup.py`` end to end without touching GitHub or AWS:
+
+* synthetic repositories (configurable count and log-normal size
+  distribution) are generated once with ``git fast-import`` and cached;
+* git clones of ``https://github.com/<org>/<repo>.git`` are redirected
+  to them with a ``url.<base>.insteadOf`` rule, so they go through the
+  regular pack protocol of a ``file://`` remote;
+* a stand-in GitHub API serves the installation token and the
+  paginated repository list;
+* a moto server stands in for S3, Secrets Manager and CloudWatch.
+  ``--s3-endpoint`` sends S3 traffic to MinIO (or any S3-compatible
+  server) instead.
+
+The runner is started as a subprocess with the caller's environment,
+so ``BACKUP_*`` settings can be compared by exporting them.  The report
+gives wall time, throughput, peak memory and peak disk, plus the phase
+statistics from the manifest; ``--output`` saves it as JSON.
+
+Usage::
+
+    python benchmarks/benchmark.py --repos 200 --median-kb 2048
+    BACKUP_CONCURRENCY=8 BACKUP_STREAM_BUNDLES=true \\
+        python benchmarks/benchmark.py --repos 200 --output stream.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from moto.server import ThreadedMotoServer
+
+LOG = logging.getLogger("benchmark")
+
+RUNNER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "container", "backup.py"
+)
+ORG = "bench-org"
+BUCKET = "github-backup-bench"
+REGION = "us-east-1"
+INSTALLATION_ID = "1"
+
+
+# ── Synthetic repositories ──────────────────────────────────────
+
+
+def make_repo(path: str, size_kb: int, commits: int, rng: random.Random) -> None:
+    """
+    Create a bare repository holding about ``size_kb`` of history.
+
+    Blobs are random bytes, so they don't compress or delta and the
+    packed size matches the requested size.
+
+    :param path: Path of the bare repository to create.
+    :param size_kb: Approximate packed size in KiB.
+    :param commits: Number of commits to spread the content over.
+    :param rng: Random source (seeded, so repos are reproducible).
+    """
+    subprocess.run(["git", "init", "--bare", "-q", path], check=True)
+    stream = bytearray()
+    blob_size = max(1, size_kb * 1024 // commits)
+    for i in range(commits):
+        data = rng.randbytes(blob_size)
+        stream += f"commit refs/heads/main\nmark :{i + 1}\n".encode()
+        stream += (
+            f"committer Bench <bench@example.com> {1700000000 + i} +0000\n".encode()
+        )
+        message = f"commit {i}\n".encode()
+        stream += f"data {len(message)}\n".encode() + message
+        if i:
+            stream += f"from :{i}\n".encode()
+        stream += f"M 644 inline data-{i}.bin\ndata {len(data)}\n".encode()
+        stream += data + b"\n"
+    subprocess.run(
+        ["git", "--git-dir", path, "fast-import", "--quiet"],
+        input=bytes(stream),
+        check=True,
+    )
+    subprocess.run(
+        ["git", "--git-dir", path, "symbolic-ref", "HEAD", "refs/heads/main"],
+        check=True,
+    )
+
+
+def generate_repos(
+    root: str,
+    count: int,
+    median_kb: int,
+    sigma: float,
+    commits: int,
+    seed: int,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Generate (or reuse) the synthetic repositories of a benchmark.
+
+    Repos live under ``root/<parameters>/<org>/``, so a rerun with the
+    same parameters skips generation.
+
+    :param root: Cache directory.
+    :param count: Number of repositories.
+    :param median_kb: Median repository size in KiB.
+    :param sigma: Log-normal shape; 0 makes every repo the median size.
+    :param commits: Commits per repository.
+    :param seed: Random seed.
+    :return: Repository records as the GitHub API would list them, and
+        the directory to serve ``<org>/<repo>.git`` from.
+    """
+    rng = random.Random(seed)
+    name = f"n{count}-m{median_kb}-s{sigma}-c{commits}-r{seed}"
+    base = os.path.join(root, name)
+    repos = []
+    for i in range(count):
+        size_kb = max(1, round(rng.lognormvariate(math.log(median_kb), sigma)))
+        full_name = f"{ORG}/repo-{i:05d}"
+        path = os.path.join(base, f"{full_name}.git")
+        if not os.path.isdir(path):
+            make_repo(path, size_kb, commits, random.Random(f"{seed}-{i}"))
+        repos.append(
+            {
+                "full_name": full_name,
+                "size": size_kb,
+                "pushed_at": "2026-01-01T00:00:00Z",
+            }
+        )
+    LOG.info(
+        "%d repositories, %d KiB in total, under %s",
+        count,
+        sum(r["size"] for r in repos),
+        base,
+    )
+    return repos, base
+
+
+# ── Stand-in GitHub API ─────────────────────────────────────────
+
+
+class _GitHubHandler(BaseHTTPRequestHandler):
+    """Serves the two GitHub endpoints the runner calls."""
+
+    repos: List[Dict[str, Any]] = []
+
+    def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+        """Keep request logs out of the benchmark output."""
+
+    def _send(self, status: int, body: Any, headers: Dict[str, str] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-RateLimit-Remaining", "5000")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):  # noqa: N802 - stdlib naming
+        """Issue an installation token."""
+        if not self.path.endswith("/access_tokens"):
+            self._send(404, {"message": "Not Found"})
+            return
+        expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        self._send(
+            201,
+            {
+                "token": "bench-token",
+                "expires_at": expires.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+        )
+
+    def do_GET(self):  # noqa: N802 - stdlib naming
+        """List the installation's repositories, 100 per page."""
+        url = urlparse(self.path)
+        if url.path != "/installation/repositories":
+            self._send(404, {"message": "Not Found"})
+            return
+        query = parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["100"])[0])
+        start = (page - 1) * per_page
+        headers = {}
+        if start + per_page < len(self.repos):
+            base = f"http://{self.headers['Host']}/installation/repositories"
+            last = (len(self.repos) - 1) // per_page + 1
+            headers["Link"] = (
+                f'<{base}?page={page + 1}&per_page={per_page}>; rel="next", '
+                f'<{base}?page={last}&per_page={per_page}>; rel="last"'
+            )
+        self._send(
+            200,
+            {
+                "total_count": len(self.repos),
+                "repositories": self.repos[start : start + per_page],
+            },
+            headers,
+        )
+
+
+def start_github_stub(repos: List[Dict[str, Any]]) -> ThreadingHTTPServer:
+    """
+    Start the stand-in GitHub API on a free local port.
+
+    :param repos: Repository records to list.
+    :return: The running server.
+    """
+    _GitHubHandler.repos = repos
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GitHubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ── Measurement ─────────────────────────────────────────────────
+
+
+def free_port() -> int:
+    """Return a TCP port that is free right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def directory_size(path: str) -> int:
+    """
+    Return the total size of the files under a directory.
+
+    :param path: Directory to measure.
+    :return: Size in bytes.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # deleted while walking
+    return total
+
+
+class DiskSampler:
+    """Samples the size of a directory in the background, keeping the peak."""
+
+    def __init__(self, path: str, interval: float = 0.2):
+        """
+        Initialize the sampler.
+
+        :param path: Directory to watch (the runner's TMPDIR).
+        :param interval: Seconds between samples.
+        """
+        self._path = path
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.peak = 0
+
+    def __enter__(self) -> "DiskSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, directory_size(self._path))
+
+
+# ── Benchmark ───────────────────────────────────────────────────
+
+
+def private_key_pem() -> str:
+    """Return a fresh RSA private key in PEM format, for signing JWTs."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Set up the stand-in services, run the backup and collect results.
+
+    :param args: Parsed command-line arguments.
+    :return: Benchmark report.
+    """
+    workdir = os.path.abspath(args.workdir)
+    repos, remotes = generate_repos(
+        os.path.join(workdir, "repos"),
+        args.repos,
+        args.median_kb,
+        args.sigma,
+        args.commits,
+        args.seed,
+    )
+
+    moto_port = free_port()
+    moto = ThreadedMotoServer(ip_address="127.0.0.1", port=moto_port)
+    moto.start()
+    github = start_github_stub(repos)
+    try:
+        aws_endpoint = f"http://127.0.0.1:{moto_port}"
+        s3_endpoint = args.s3_endpoint or aws_endpoint
+        env = {
+            "AWS_ACCESS_KEY_ID": "bench",
+            "AWS_SECRET_ACCESS_KEY": "bench",
+            **os.environ,
+            "AWS_DEFAULT_REGION": REGION,
+            "AWS_ENDPOINT_URL": aws_endpoint,
+            "AWS_ENDPOINT_URL_S3": s3_endpoint,
+        }
+        s3 = boto3.client(
+            "s3",
+            region_name=REGION,
+            endpoint_url=s3_endpoint,
+            aws_access_key_id=env["AWS_ACCESS_KEY_ID"],
+            aws_secret_access_key=env["AWS_SECRET_ACCESS_KEY"],
+        )
+        s3.create_bucket(Bucket=BUCKET)
+        secret = boto3.client(
+            "secretsmanager",
+            region_name=REGION,
+            endpoint_url=aws_endpoint,
+            aws_access_key_id="bench",
+            aws_secret_access_key="bench",
+        ).create_secret(Name="bench-github-app-key", SecretString=private_key_pem())
+
+        with tempfile.TemporaryDirectory(dir=workdir) as run_dir:
+            gitconfig = os.path.join(run_dir, "gitconfig")
+            with open(gitconfig, "w") as fp:
+                fp.write(
+                    f'[url "file://{remotes}/"]\n\tinsteadOf = https://github.com/\n'
+                )
+            tmp = os.path.join(run_dir, "tmp")
+            os.mkdir(tmp)
+            env.update(
+                {
+                    "GITHUB_APP_ID": "1",
+                    "GITHUB_APP_INSTALLATION_ID": INSTALLATION_ID,
+                    "GITHUB_APP_KEY_SECRET_ARN": secret["ARN"],
+                    "GITHUB_API_BASE": f"http://127.0.0.1:{github.server_port}",
+                    "S3_BUCKET": BUCKET,
+                    "GIT_CONFIG_GLOBAL": gitconfig,
+                    "TMPDIR": tmp,
+                }
+            )
+
+            LOG.info("Running %s", RUNNER)
+            start = time.monotonic()
+            with DiskSampler(tmp) as disk:
+                result = subprocess.run([sys.executable, RUNNER], env=env)
+            wall = time.monotonic() - start
+            if result.returncode:
+                raise SystemExit(f"Backup runner exited with {result.returncode}")
+
+        date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        manifest = json.loads(
+            s3.get_object(Bucket=BUCKET, Key=f"github-backup/{date}/manifest.json")[
+                "Body"
+            ].read()
+        )
+    finally:
+        github.shutdown()
+        moto.stop()
+
+    stats = manifest.get("stats", {})
+    uploaded = stats.get("bytes_uploaded", 0)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "parameters": {
+            "repos": args.repos,
+            "median_kb": args.median_kb,
+            "sigma": args.sigma,
+            "commits": args.commits,
+            "seed": args.seed,
+            "s3": "external" if args.s3_endpoint else "moto",
+        },
+        "settings": {
+            k: v for k, v in sorted(os.environ.items()) if k.startswith("BACKUP_")
+        },
+        "wall_seconds": round(wall, 3),
+        "success_count": manifest["success_count"],
+        "failure_count": manifest["failure_count"],
+        "bytes_uploaded": uploaded,
+        "bytes_bundled": stats.get("bytes_bundled", uploaded),
+        "throughput_mib_per_second": round(uploaded / wall / 1024**2, 3),
+        "repos_per_second": round(manifest["success_count"] / wall, 3),
+        # Largest single process (the runner or one of its git children)
+        "peak_rss_mib": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        ),
+        "peak_disk_mib": round(disk.peak / 1024**2, 1),
+        "phases": stats.get("phases", {}),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Print a human-readable summary of a benchmark report.
+
+    :param report: Report from :func:`run_benchmark`.
+    """
+    print()
+    print(
+        f"Repositories:   {report['success_count']} ok, "
+        f"{report['failure_count']} failed"
+    )
+    print(
+        f"Stored:         {report['bytes_uploaded'] / 1024**2:.1f} MiB "
+        f"({report['bytes_bundled'] / 1024**2:.1f} MiB of bundles)"
+    )
+    print(f"Wall time:      {report['wall_seconds']:.1f} s")
+    print(
+        f"Throughput:     {report['throughput_mib_per_second']:.1f} MiB/s, "
+        f"{report['repos_per_second']:.2f} repos/s"
+    )
+    print(f"Peak memory:    {report['peak_rss_mib']:.0f} MiB (largest process)")
+    print(f"Peak disk:      {report['peak_disk_mib']:.0f} MiB")
+    for phase, stats in report["phases"].items():
+        print(
+            f"  {phase:<7} p50 {stats['p50_seconds']:8.3f} s  "
+            f"p95 {stats['p95_seconds']:8.3f} s  total {stats['total_seconds']:9.1f} s"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Parse arguments, run the benchmark and report.
+
+    :param argv: Command-line arguments (default: ``sys.argv``).
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repos", type=int, default=50, help="number of repositories")
+    parser.add_argument(
+        "--median-kb", type=int, default=1024, help="median repository size in KiB"
+    )
+    parser.add_argument(
+        "--sigma",
+        type=float,
+        default=1.0,
+        help="log-normal spread of sizes (0: every repo the median size)",
+    )
+    parser.add_argument("--commits", type=int, default=5, help="commits per repository")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument(
+        "--workdir",
+        default=os.path.join(tempfile.gettempdir(), "github-backup-bench"),
+        help="where generated repositories are cached",
+    )
+    parser.add_argument(
+        "--s3-endpoint",
+        help="S3-compatible endpoint (e.g. MinIO) instead of moto for S3; "
+        "credentials come from the environment",
+    )
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s: %(message)s")
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # moto request log
+    os.makedirs(args.workdir, exist_ok=True)
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -71,3 +71,31 @@ resource "aws_cloudwatch_metric_alarm" "task_not_running" {
 
   tags = local.all_tags
 }
+
+# Alarm: a scheduled check found a stored bundle that does not match
+# the manifest, or a sampled repository that git could not restore.
+resource "aws_cloudwatch_metric_alarm" "verify_failure" {
+  count             = var.verify_schedule_expression == null ? 0 : 1
+  alarm_name        = "${var.service_name}-verify-failure"
+  alarm_description = <<-EOT
+    Verification of the latest GitHub backup found missing or
+    corrupted bundles. See verify.json next to the checked
+    manifest and the CloudWatch log group
+    /ecs/${var.service_name} for details.
+  EOT
+
+  namespace   = "GitHubBackup"
+  metric_name = "VerifyFailure"
+  statistic   = "Sum"
+
+  comparison_operator = "GreaterThanThreshold"
+  threshold           = 0
+  evaluation_periods  = 1
+  period              = 86400 # 24 hours
+  treat_missing_data  = "notBreaching"
+
+  alarm_actions = [aws_sns_topic.alarms.arn]
+  ok_actions    = [aws_sns_topic.alarms.arn]
+
+  tags = local.all_tags
+}
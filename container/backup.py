@@ -10,25 +10,154 @@ Environment variables (set by ECS task definition):
     GITHUB_APP_INSTALLATION_ID - Installation ID on the target org
     GITHUB_APP_KEY_SECRET_ARN  - Secrets Manager ARN for the private key
     S3_BUCKET                  - Target S3 bucket name
+    GITHUB_API_BASE            - GitHub REST API URL (optional, default
+                                 "https://api.github.com")
+    GITHUB_API_CONCURRENCY     - GitHub API requests in flight at once when
+                                 fetching pages or per-repo data (optional,
+                                 default 8)
     AWS_DEFAULT_REGION         - AWS region (auto-set by ECS)
+    BACKUP_CONCURRENCY         - Default worker count of each pipeline
+                                 stage (optional, default 1)
+    BACKUP_CLONE_WORKERS       - Clone stage workers (optional)
+    BACKUP_BUNDLE_WORKERS      - Bundle stage workers (optional)
+    BACKUP_UPLOAD_WORKERS      - Upload stage workers (optional)
+    BACKUP_ADAPTIVE_CONCURRENCY - "true" to adjust the number of repos in
+                                 flight to CPU, memory, disk and network
+                                 usage (optional, default "false")
+    BACKUP_MAX_REPOS_IN_FLIGHT - Upper bound of adaptive concurrency
+                                 (optional, default 16)
+    BACKUP_STORAGE_BUDGET_GB   - Ephemeral storage (GiB) that mirrors and
+                                 bundles in flight may use (optional,
+                                 default 20)
+    BACKUP_INCREMENTAL         - "true" to reuse the previous bundle of
+                                 repos with no pushes since the last run
+                                 (optional, default "false")
+    BACKUP_REUSE_MAX_AGE_DAYS  - Re-bundle unchanged repos once their last
+                                 bundle is this old (optional, default 30)
+    BACKUP_DELTA_BUNDLES       - "true" to upload delta bundles chained to
+                                 the last full one (optional, default
+                                 "false")
+    BACKUP_DELTA_FULL_INTERVAL_DAYS
+                               - Force a full bundle once the chain's full
+                                 bundle is this old (optional, default 7)
+    BACKUP_DELTA_MAX_CHAIN     - Force a full bundle once the chain has
+                                 this many bundles (optional, default 30)
+    BACKUP_MIRROR_CACHE_DIR    - Directory of a persistent mirror cache,
+                                 e.g. an EFS mount (optional; mirrors are
+                                 cloned from scratch when unset)
+    BACKUP_STREAM_BUNDLES      - "true" to pipe bundles straight into an S3
+                                 multipart upload instead of writing them
+                                 to disk (optional, default "false")
+    BACKUP_S3_PART_SIZE_MB     - Minimum multipart part size in MiB
+                                 (optional, default 16)
+    BACKUP_S3_MAX_CONCURRENCY  - Parallel part uploads per object
+                                 (optional, default 8)
+    BACKUP_MAX_ATTEMPTS        - Attempts per repo before it is recorded
+                                 as failed (optional, default 3)
+    BACKUP_RETRY_BASE_SECONDS  - Backoff before the first retry, doubled
+                                 for each further one (optional,
+                                 default 30)
+    BACKUP_CHECKPOINT_INTERVAL_SECONDS
+                               - Minimum interval between checkpoint
+                                 writes (optional, default 10)
+    BACKUP_SHARD_COUNT         - Number of tasks that split the repos
+                                 between them (optional, default 1)
+    BACKUP_SHARD_INDEX         - Shard this task backs up (optional;
+                                 claimed in S3 when unset)
+    BACKUP_SHARD_STRATEGY      - "size" to balance shards by repo size,
+                                 "hash" to assign repos by name hash
+                                 (optional, default "size")
+    BACKUP_HUGE_REPO_GB        - Size from which a repo counts as huge
+                                 (optional, default 5)
+    BACKUP_MAX_HUGE_REPOS      - Huge repos cloned/bundled at once
+                                 (optional, default 2)
+    BACKUP_PACK_THREADS        - git pack.threads (optional; git's
+                                 default is one per CPU)
+    BACKUP_PACK_WINDOW         - git pack.window (optional)
+    BACKUP_PACK_DEPTH          - git pack.depth (optional)
+    BACKUP_PACK_COMPRESSION    - git core.compression, -1..9 (optional)
+    BACKUP_PACK_REUSE          - "false" to repack each mirror with the
+                                 settings above before bundling it
+                                 (optional, default "true")
+    BACKUP_BUNDLE_COMPRESSION  - "zstd" to compress bundles before they
+                                 are stored (optional, default "none")
+    BACKUP_ZSTD_LEVEL          - zstd compression level (optional,
+                                 default 3)
+    BACKUP_DEDUP_BUNDLES       - "true" to store bundles once under a
+                                 content address and point manifests at
+                                 them (optional, default "false")
+    BACKUP_REPO_POLICIES       - JSON list of rules that pick a repo's
+                                 backup strategy: "full", "filtered"
+                                 (large blobs stored separately) or "lfs"
+                                 (Git LFS objects synced too); see
+                                 repo_policy() (optional, default "[]")
+    BACKUP_REF_FINGERPRINTS    - "true" to compare repos by their refs
+                                 (git ls-remote) instead of pushed_at in
+                                 incremental mode (optional, default
+                                 "false")
+    BACKUP_PLAN_WORKERS        - Parallel git ls-remote calls (optional,
+                                 default 64)
+    BACKUP_METADATA            - "true" to also back up issues, pull
+                                 requests, releases and wikis (optional,
+                                 default "false")
+    BACKUP_VERIFY_SAMPLE       - Repos whose bundles --verify downloads and
+                                 checks with git bundle verify (optional,
+                                 default 10)
+
+Usage:
+    backup.py          Run the backup.
+    backup.py --plan   Print which repos the next run would back up,
+                       with estimated bytes and duration, and exit.
+    backup.py --verify [--date YYYY-MM-DD]
+                       Check that the bundles of a backup (the latest
+                       by default) are intact, and exit.
 """
 
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import heapq
 import json
 import logging
 import os
+import queue
+import random
+import shlex
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import jwt
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from infrahouse_core.aws import Secret
 from infrahouse_core.logging import setup_logging
 
+import backup_common
+from backup_common import (
+    backup_dates,
+    blob_key,
+    bundle_objects,
+    chain_objects,
+    iter_manifest_entries,
+    lfs_object_key,
+    materialize_repo,
+    percentile,
+)
+
 LOG = logging.getLogger(__name__)
 setup_logging(LOG)
 
@@ -38,14 +167,225 @@ GITHUB_APP_ID = os.environ["GITHUB_APP_ID"]
 GITHUB_APP_INSTALLATION_ID = os.environ["GITHUB_APP_INSTALLATION_ID"]
 GITHUB_APP_KEY_SECRET_ARN = os.environ["GITHUB_APP_KEY_SECRET_ARN"]
 S3_BUCKET = os.environ["S3_BUCKET"]
-GITHUB_API_BASE = "https://api.github.com"
+GITHUB_API_BASE = os.environ.get("GITHUB_API_BASE", "https://api.github.com")
+GITHUB_API_CONCURRENCY = max(1, int(os.environ.get("GITHUB_API_CONCURRENCY", "8")))
 
 # Token lifetime is 1 hour; refresh when less than 5 minutes remain
 TOKEN_REFRESH_THRESHOLD_SECONDS = 300
 
+# Worker threads per pipeline stage.  Clone is network-bound, bundle is
+# CPU/disk-bound and upload is egress-bound, so each is sized separately;
+# BACKUP_CONCURRENCY is the default for all three.
+BACKUP_CONCURRENCY = max(1, int(os.environ.get("BACKUP_CONCURRENCY", "1")))
+BACKUP_CLONE_WORKERS = max(
+    1, int(os.environ.get("BACKUP_CLONE_WORKERS", BACKUP_CONCURRENCY))
+)
+BACKUP_BUNDLE_WORKERS = max(
+    1, int(os.environ.get("BACKUP_BUNDLE_WORKERS", BACKUP_CONCURRENCY))
+)
+BACKUP_UPLOAD_WORKERS = max(
+    1, int(os.environ.get("BACKUP_UPLOAD_WORKERS", BACKUP_CONCURRENCY))
+)
+
+# Adaptive concurrency: every stage gets BACKUP_MAX_REPOS_IN_FLIGHT
+# workers, and a ConcurrencyController decides how many repos are in
+# flight, starting from the fixed worker counts above.  The stages are
+# not capped separately: all the repos in flight may be in one stage,
+# e.g. all cloning at once.
+BACKUP_ADAPTIVE_CONCURRENCY = (
+    os.environ.get("BACKUP_ADAPTIVE_CONCURRENCY", "false").lower() == "true"
+)
+BACKUP_MAX_REPOS_IN_FLIGHT = max(
+    1, int(os.environ.get("BACKUP_MAX_REPOS_IN_FLIGHT", "16"))
+)
+
+# Upper bound on mirror + bundle bytes on ephemeral storage at once.
+BACKUP_STORAGE_BUDGET_BYTES = int(
+    float(os.environ.get("BACKUP_STORAGE_BUDGET_GB", "20")) * 1024**3
+)
+
+# Incremental mode: repos with no pushes since the previous run point at
+# the bundle that run uploaded instead of getting a new one.  The age cap
+# keeps references inside the bucket's lifecycle retention window.
+BACKUP_INCREMENTAL = os.environ.get("BACKUP_INCREMENTAL", "false").lower() == "true"
+BACKUP_REUSE_MAX_AGE_DAYS = int(os.environ.get("BACKUP_REUSE_MAX_AGE_DAYS", "30"))
+
+# Delta mode: bundles carry only the objects added since the previous run
+# and are chained to the last full bundle.  A restore needs the whole
+# chain, so it is kept short and periodically restarted with a full one.
+BACKUP_DELTA_BUNDLES = os.environ.get("BACKUP_DELTA_BUNDLES", "false").lower() == "true"
+BACKUP_DELTA_FULL_INTERVAL_DAYS = int(
+    os.environ.get("BACKUP_DELTA_FULL_INTERVAL_DAYS", "7")
+)
+BACKUP_DELTA_MAX_CHAIN = int(os.environ.get("BACKUP_DELTA_MAX_CHAIN", "30"))
+
+# Persistent mirror cache: mirrors are kept between runs and only fetched
+# incrementally, so GitHub traffic scales with daily change volume.
+BACKUP_MIRROR_CACHE_DIR = os.environ.get("BACKUP_MIRROR_CACHE_DIR") or None
+
+# Streaming mode: bundles are piped into an S3 multipart upload while git
+# writes them, so they never touch ephemeral storage.  The bundle stage
+# then does the uploading and the upload stage only records results.
+BACKUP_STREAM_BUNDLES = (
+    os.environ.get("BACKUP_STREAM_BUNDLES", "false").lower() == "true"
+)
+
+# S3 multipart tuning.  The part size is a floor: transfer_config() grows
+# it for bundles that would otherwise need more than 10,000 parts.
+BACKUP_S3_PART_SIZE_BYTES = (
+    int(os.environ.get("BACKUP_S3_PART_SIZE_MB", "16")) * 1024**2
+)
+BACKUP_S3_MAX_CONCURRENCY = int(os.environ.get("BACKUP_S3_MAX_CONCURRENCY", "8"))
+
+# Per-repo retries: a repo that fails is retried from the clone stage,
+# waiting BACKUP_RETRY_BASE_SECONDS * 2^n between attempts.  Repos that
+# fail every attempt are recorded as failed; the run carries on.
+BACKUP_MAX_ATTEMPTS = max(1, int(os.environ.get("BACKUP_MAX_ATTEMPTS", "3")))
+BACKUP_RETRY_BASE_SECONDS = float(os.environ.get("BACKUP_RETRY_BASE_SECONDS", "30"))
+
+# Finished repos are checkpointed to S3 at most this often, so a rerun
+# on the same day can skip them.
+BACKUP_CHECKPOINT_INTERVAL_SECONDS = float(
+    os.environ.get("BACKUP_CHECKPOINT_INTERVAL_SECONDS", "10")
+)
+
+# Sharding: BACKUP_SHARD_COUNT tasks run at once and each backs up one
+# shard of the repos.  Tasks started together get identical settings,
+# so unless BACKUP_SHARD_INDEX is given, each claims a shard in S3.
+BACKUP_SHARD_COUNT = max(1, int(os.environ.get("BACKUP_SHARD_COUNT", "1")))
+BACKUP_SHARD_INDEX = (
+    int(os.environ["BACKUP_SHARD_INDEX"])
+    if os.environ.get("BACKUP_SHARD_INDEX")
+    else None
+)
+BACKUP_SHARD_STRATEGY = os.environ.get("BACKUP_SHARD_STRATEGY", "size")
+
+# Scheduling: repos start largest first, so the run doesn't end with
+# one huge repo cloning while every other worker idles.  Huge repos are
+# capped separately, since a few of them at once can exhaust memory
+# (git pack-objects) as well as ephemeral storage.
+BACKUP_HUGE_REPO_BYTES = int(
+    float(os.environ.get("BACKUP_HUGE_REPO_GB", "5")) * 1024**3
+)
+BACKUP_MAX_HUGE_REPOS = max(1, int(os.environ.get("BACKUP_MAX_HUGE_REPOS", "2")))
+
+# Pack tuning, passed to git as -c options; unset ones keep git's
+# defaults.  By default a bundle reuses the deltas and zlib streams of
+# the mirror's packs as they are, so window, depth and compression only
+# apply to objects git has to pack afresh.  With BACKUP_PACK_REUSE=false
+# every mirror is repacked (git repack -a -d -f) first: more CPU, but
+# the settings then apply to the whole bundle.
+BACKUP_PACK_SETTINGS = {
+    key: os.environ[env]
+    for key, env in (
+        ("pack.threads", "BACKUP_PACK_THREADS"),
+        ("pack.window", "BACKUP_PACK_WINDOW"),
+        ("pack.depth", "BACKUP_PACK_DEPTH"),
+        ("core.compression", "BACKUP_PACK_COMPRESSION"),
+    )
+    if os.environ.get(env)
+}
+BACKUP_PACK_REUSE = os.environ.get("BACKUP_PACK_REUSE", "true").lower() == "true"
+
+# Outer compression of the stored bundle ("none" or "zstd").  Packs are
+# already zlib-compressed, so zstd mostly pays off together with
+# BACKUP_PACK_COMPRESSION=0 and BACKUP_PACK_REUSE=false.
+BACKUP_BUNDLE_COMPRESSION = os.environ.get("BACKUP_BUNDLE_COMPRESSION", "none")
+BACKUP_ZSTD_LEVEL = int(os.environ.get("BACKUP_ZSTD_LEVEL", "3"))
+
+# Content-addressed bundles: a bundle is stored once under objects/,
+# keyed by a hash of the refs it holds (and for a delta, the commits it
+# leaves out), and every manifest that needs it points there.  A repo
+# whose refs did not change finds its object already stored and skips
+# bundling and uploading.  Objects older than BACKUP_REUSE_MAX_AGE_DAYS
+# are written again, so the lifecycle rule never expires one in use.
+BACKUP_DEDUP_BUNDLES = os.environ.get("BACKUP_DEDUP_BUNDLES", "false").lower() == "true"
+
+# Per-repo strategies, first matching rule wins (see repo_policy):
+#   {"repos": "org/assets-*", "min_size_gb": 5, "strategy": "filtered",
+#    "blob_limit_mb": 10}
+# "filtered" clones and bundles without blobs above the limit and stores
+# those once per object ID; "lfs" also syncs the repo's Git LFS objects.
+BACKUP_REPO_POLICIES: List[Dict[str, Any]] = json.loads(
+    os.environ.get("BACKUP_REPO_POLICIES") or "[]"
+)
+
+# Ref fingerprints: before anything is cloned, git ls-remote lists the
+# refs of every repo in parallel, and incremental mode compares a hash
+# of them instead of pushed_at.  That also catches ref changes GitHub
+# does not count as pushes, such as refs/pull/* of pull requests.
+BACKUP_REF_FINGERPRINTS = (
+    os.environ.get("BACKUP_REF_FINGERPRINTS", "false").lower() == "true"
+)
+BACKUP_PLAN_WORKERS = max(1, int(os.environ.get("BACKUP_PLAN_WORKERS", "64")))
+
+# Metadata export: issues, pull requests (with reviews), releases (with
+# their assets) and wikis.  Each run only exports what was updated since
+# the previous run's cursor; a full export starts a new chain once the
+# first file of the chain is BACKUP_REUSE_MAX_AGE_DAYS old.
+BACKUP_METADATA = os.environ.get("BACKUP_METADATA", "false").lower() == "true"
+
+# Verification: --verify checks every bundle of a manifest against its
+# recorded size and checksum with HEAD requests, and downloads a random
+# sample of repos to run git bundle verify on them.
+BACKUP_VERIFY_SAMPLE = max(0, int(os.environ.get("BACKUP_VERIFY_SAMPLE", "10")))
+
 
 # ── AWS helpers ─────────────────────────────────────────────────
 
+# S3 allows at most 10,000 parts per multipart upload; leave headroom
+# for size estimates that turn out low.
+_MAX_UPLOAD_PARTS = 9000
+
+
+def get_s3_client() -> Any:
+    """
+    Return the process-wide S3 client (see
+    :func:`backup_common.get_s3_client`).
+
+    Its connection pool is sized for every upload thread of every
+    upload worker (the bundle workers upload in streaming mode).
+
+    :return: boto3 S3 client.
+    """
+    uploaders = max(BACKUP_UPLOAD_WORKERS, BACKUP_BUNDLE_WORKERS)
+    if BACKUP_ADAPTIVE_CONCURRENCY:
+        uploaders = max(uploaders, BACKUP_MAX_REPOS_IN_FLIGHT)
+    return backup_common.get_s3_client(uploaders * BACKUP_S3_MAX_CONCURRENCY + 10)
+
+
+def transfer_config(size: int) -> TransferConfig:
+    """
+    Build the multipart transfer settings for an upload.
+
+    The part size starts at ``BACKUP_S3_PART_SIZE_MB`` and grows with
+    the object so that huge bundles stay under the 10,000-part limit
+    without wasting requests on small parts.
+
+    Streamed uploads hold every part in memory until it is sent, so at
+    most ``BACKUP_S3_MAX_CONCURRENCY`` parts are buffered per upload,
+    plus the next one once read.
+
+    :param size: Object size in bytes (an estimate for streamed uploads).
+    :return: boto3 transfer configuration.
+    """
+    part_size = max(BACKUP_S3_PART_SIZE_BYTES, -(-size // _MAX_UPLOAD_PARTS))
+    # Round up to a whole MiB
+    part_size = -(-part_size // 1024**2) * 1024**2
+    config = TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=BACKUP_S3_MAX_CONCURRENCY,
+        use_threads=True,
+        # The CRT client, which boto3 may otherwise pick, ignores the
+        # in-memory limit below.
+        preferred_transfer_client="classic",
+    )
+    # Not a boto3 constructor argument, but an attribute of the
+    # s3transfer config it extends, which the classic client honours.
+    config.max_in_memory_upload_chunks = BACKUP_S3_MAX_CONCURRENCY
+    return config
+
 
 class _UploadProgress:
     """Callback for boto3 upload_file() to log progress on large uploads."""
@@ -54,15 +394,19 @@ class _UploadProgress:
         self._filepath = filepath
         self._size = os.path.getsize(filepath)
         self._seen = 0
+        # Called from every transfer thread of the upload
+        self._lock = threading.Lock()
 
     def __call__(self, bytes_transferred: int) -> None:
-        self._seen += bytes_transferred
-        pct = (self._seen / self._size) * 100 if self._size else 100
+        with self._lock:
+            self._seen += bytes_transferred
+            seen = self._seen
+        pct = (seen / self._size) * 100 if self._size else 100
         LOG.info(
             "Upload progress: %s — %.1f%% (%d / %d bytes)",
             self._filepath,
             pct,
-            self._seen,
+            seen,
             self._size,
         )
 
@@ -70,6 +414,10 @@ class _UploadProgress:
 # Log upload progress for files larger than 100 MiB
 _PROGRESS_LOG_THRESHOLD = 100 * 1024 * 1024
 
+# Every upload has S3 verify a SHA-256 checksum of each part and keep
+# the result with the object, for --verify to compare later.
+_UPLOAD_ARGS = {"ChecksumAlgorithm": "SHA256"}
+
 
 def upload_to_s3(
     local_path: str,
@@ -79,8 +427,9 @@ def upload_to_s3(
     """
     Upload a local file to S3.
 
-    For files larger than 100 MiB, logs upload progress via
-    a boto3 transfer callback.
+    Uses the shared client and size-scaled multipart settings (see
+    :func:`transfer_config`), with SHA-256 checksums.  For files larger
+    than 100 MiB, logs upload progress via a boto3 transfer callback.
 
     :param local_path: Path to the local file.
     :param bucket: S3 bucket name.
@@ -94,19 +443,107 @@ def upload_to_s3(
         bucket,
         s3_key,
     )
-    client = boto3.client("s3")
     callback = (
         _UploadProgress(local_path) if file_size >= _PROGRESS_LOG_THRESHOLD else None
     )
-    client.upload_file(local_path, bucket, s3_key, Callback=callback)
+    get_s3_client().upload_file(
+        local_path,
+        bucket,
+        s3_key,
+        ExtraArgs=_UPLOAD_ARGS,
+        Callback=callback,
+        Config=transfer_config(file_size),
+    )
+
+
+def upload_json(data: Any, bucket: str, s3_key: str) -> None:
+    """
+    Upload a JSON document (such as a manifest) to S3.
+
+    :param data: JSON-serializable document.
+    :param bucket: S3 bucket name.
+    :param s3_key: S3 object key.
+    """
+    tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False)
+    try:
+        json.dump(data, tmp, indent=2)
+        tmp.close()
+        upload_to_s3(tmp.name, bucket, s3_key)
+    finally:
+        os.unlink(tmp.name)
+
+
+def put_if_absent(bucket: str, s3_key: str, body: bytes) -> bool:
+    """
+    Create an S3 object unless one already exists at that key.
+
+    Uses a conditional write (``If-None-Match: *``), so of several
+    tasks racing for the same key exactly one succeeds.
+
+    :param bucket: S3 bucket name.
+    :param s3_key: S3 object key.
+    :param body: Object content.
+    :return: True if this call created the object.
+    """
+    try:
+        get_s3_client().put_object(
+            Bucket=bucket, Key=s3_key, Body=body, IfNoneMatch="*"
+        )
+    except ClientError as err:
+        code = err.response["Error"]["Code"]
+        if code in ("PreconditionFailed", "ConditionalRequestConflict"):
+            return False
+        raise
+    return True
+
+
+def head_object(bucket: str, s3_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up an S3 object's metadata.
 
+    :param bucket: S3 bucket name.
+    :param s3_key: S3 object key.
+    :return: The ``HeadObject`` response (with the object's checksum,
+        if it has one), or None if there is no object.
+    """
+    try:
+        return get_s3_client().head_object(
+            Bucket=bucket, Key=s3_key, ChecksumMode="ENABLED"
+        )
+    except ClientError as err:
+        if err.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+def stored_checksum(bucket: str, s3_key: str) -> Optional[str]:
+    """
+    Look up the SHA-256 checksum S3 keeps for an object.
 
-def publish_metrics(success_count: int, failure_count: int) -> None:
+    For a multipart upload this is a checksum of the part checksums,
+    suffixed with the part count (``"<base64>-<parts>"``), so it can only
+    be compared with what S3 reports for the same object later.
+
+    :param bucket: S3 bucket name.
+    :param s3_key: S3 object key.
+    :return: The checksum, or None if the object has none.
+    """
+    head = head_object(bucket, s3_key)
+    return head.get("ChecksumSHA256") if head else None
+
+
+def publish_metrics(
+    success_count: int,
+    failure_count: int,
+    extra: Optional[List[Dict[str, Any]]] = None,
+) -> None:
     """
-    Publish backup result metrics to CloudWatch.
+    Publish backup result metrics to CloudWatch in one batched call.
 
     :param success_count: Number of repos backed up successfully.
     :param failure_count: Number of repos that failed.
+    :param extra: Further ``MetricData`` items, e.g. from
+        :meth:`RunStats.metric_data`.
     """
     client = boto3.client("cloudwatch")
     client.put_metric_data(
@@ -122,12 +559,258 @@ def publish_metrics(success_count: int, failure_count: int) -> None:
                 "Value": failure_count,
                 "Unit": "Count",
             },
+            *(extra or []),
         ],
     )
 
 
+# ── GitHub API session ──────────────────────────────────────────
+
+# Transient server errors retried by urllib3 with exponential backoff.
+# Rate limiting (403/429) is handled by GitHubSession itself, because
+# GitHub signals it through its own headers.
+_GITHUB_RETRY = Retry(
+    total=5,
+    backoff_factor=2,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=None,  # also retry POST /access_tokens
+    raise_on_status=False,
+    # Otherwise urllib3 also retries a 429 with Retry-After, multiplying
+    # GitHubSession's own retries
+    respect_retry_after_header=False,
+)
+
+# Longest single sleep on a rate limit; the primary limit resets hourly.
+_MAX_RATE_LIMIT_WAIT_SECONDS = 3600
+
+# Rate-limited requests are retried this many times before giving up
+_MAX_RATE_LIMIT_RETRIES = 5
+
+
+class GitHubSession:
+    """
+    Shared, pooled HTTP session for the GitHub REST API.
+
+    Keeps connections alive across calls and retries transient errors.
+    When GitHub rate-limits a request (primary or secondary limit), it
+    sleeps for as long as ``Retry-After`` or ``X-RateLimit-Reset`` asks
+    and tries again.  The remaining budget from the latest response is
+    exposed so that concurrent workers can throttle themselves with
+    :meth:`wait_for_budget` before they hit the limit.
+    """
+
+    def __init__(self, pool_size: int = 10):
+        """
+        Initialize the session.
+
+        :param pool_size: Maximum number of pooled connections.
+        """
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=_GITHUB_RETRY,
+        )
+        self._session.mount("https://", adapter)
+        self._session.headers["Accept"] = "application/vnd.github+json"
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._reset_at: float = 0
+
+    @property
+    def rate_limit_remaining(self) -> Optional[int]:
+        """
+        Requests left in the current rate-limit window.
+
+        :return: Remaining requests, or None before the first response.
+        """
+        return self._remaining
+
+    @property
+    def rate_limit_reset(self) -> float:
+        """
+        When the current rate-limit window resets.
+
+        :return: Unix timestamp (0 before the first response).
+        """
+        return self._reset_at
+
+    def wait_for_budget(self, needed: int = 1) -> None:
+        """
+        Block until at least ``needed`` requests are left in the window.
+
+        :param needed: Number of requests the caller is about to make.
+        """
+        with self._lock:
+            remaining, reset_at = self._remaining, self._reset_at
+        if remaining is None or remaining >= needed:
+            return
+        delay = min(max(reset_at - time.time(), 0) + 1, _MAX_RATE_LIMIT_WAIT_SECONDS)
+        LOG.warning(
+            "GitHub rate limit nearly exhausted (%d left), waiting %.0f s",
+            remaining,
+            delay,
+        )
+        time.sleep(delay)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a request, waiting out rate limits.
+
+        :param method: HTTP method.
+        :param url: Request URL.
+        :param kwargs: Passed to :meth:`requests.Session.request`.
+        :return: The response; HTTP errors are raised.
+        :raises requests.HTTPError: On a non-retryable error status, or
+            if the request is still rate-limited after all retries.
+        """
+        kwargs.setdefault("timeout", 30)
+        for attempt in range(_MAX_RATE_LIMIT_RETRIES + 1):
+            response = self._session.request(method, url, **kwargs)
+            self._record_rate_limit(response)
+            delay = self._rate_limit_delay(response, attempt)
+            if delay is None or attempt == _MAX_RATE_LIMIT_RETRIES:
+                break
+            LOG.warning(
+                "GitHub rate limit hit on %s %s, retrying in %.0f s",
+                method,
+                response.url,
+                delay,
+            )
+            time.sleep(delay)
+        response.raise_for_status()
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a GET request (see :meth:`request`).
+
+        :param url: Request URL.
+        :param kwargs: Passed to :meth:`requests.Session.request`.
+        :return: The response.
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a POST request (see :meth:`request`).
+
+        :param url: Request URL.
+        :param kwargs: Passed to :meth:`requests.Session.request`.
+        :return: The response.
+        """
+        return self.request("POST", url, **kwargs)
+
+    def _record_rate_limit(self, response: requests.Response) -> None:
+        """
+        Remember the rate-limit budget reported by a response.
+
+        :param response: Any GitHub API response.
+        """
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            self._remaining = int(remaining)
+            self._reset_at = float(reset)
+
+    @staticmethod
+    def _rate_limit_delay(
+        response: requests.Response,
+        attempt: int,
+    ) -> Optional[float]:
+        """
+        Work out how long to wait before retrying a rate-limited request.
+
+        Follows GitHub's guidance: honor ``Retry-After``; if the primary
+        limit is exhausted, wait until ``X-RateLimit-Reset``; otherwise
+        (secondary limit without headers) back off exponentially from
+        one minute.
+
+        :param response: The response to inspect.
+        :param attempt: Zero-based retry attempt.
+        :return: Seconds to wait, or None if not rate-limited.
+        """
+        if response.status_code not in (403, 429):
+            return None
+        headers = response.headers
+        if "Retry-After" in headers:
+            delay = float(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            delay = float(headers.get("X-RateLimit-Reset", 0)) - time.time() + 1
+        elif response.status_code == 429 or "rate limit" in response.text.lower():
+            delay = 60.0 * 2**attempt
+        else:
+            # A plain 403: missing permissions, not worth retrying
+            return None
+        return min(max(delay, 1.0), _MAX_RATE_LIMIT_WAIT_SECONDS)
+
+
+_GITHUB_SESSION: Optional[GitHubSession] = None
+_GITHUB_SESSION_LOCK = threading.Lock()
+
+
+def get_github_session() -> GitHubSession:
+    """
+    Return the process-wide GitHub API session.
+
+    :return: Shared :class:`GitHubSession`.
+    """
+    global _GITHUB_SESSION
+    with _GITHUB_SESSION_LOCK:
+        if _GITHUB_SESSION is None:
+            _GITHUB_SESSION = GitHubSession(
+                pool_size=max(BACKUP_CLONE_WORKERS, GITHUB_API_CONCURRENCY) + 4
+            )
+        return _GITHUB_SESSION
+
+
+def github_map(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    concurrency: int = GITHUB_API_CONCURRENCY,
+) -> Iterator[Any]:
+    """
+    Call ``func`` on every item in worker threads, yielding in order.
+
+    At most ``concurrency`` calls are in flight, and each waits until
+    the rate-limit budget covers all of them (see
+    :meth:`GitHubSession.wait_for_budget`), so the fan-out slows down as
+    the budget runs low instead of running into the limit.  Results are
+    yielded as soon as they are next in order; memory stays bounded
+    however many items there are.
+
+    :param func: Makes one or more GitHub API calls for an item.
+    :param items: Items to call ``func`` on.
+    :param concurrency: Maximum calls in flight.
+    :return: Iterator of ``func`` results, in the order of ``items``.
+    :raises Exception: Whatever ``func`` raised, once its result is due.
+    """
+    session = get_github_session()
+
+    def call(item: Any) -> Any:
+        session.wait_for_budget(concurrency)
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight: deque = deque()
+        for item in items:
+            in_flight.append(pool.submit(call, item))
+            if len(in_flight) >= 2 * concurrency:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
 # ── GitHub App authentication ───────────────────────────────────
 
+# The background renewal (TokenManager.start) checks every 30 seconds
+# and renews 5 minutes before TOKEN_REFRESH_THRESHOLD_SECONDS, so
+# workers do not wait for it
+_TOKEN_RENEW_CHECK_SECONDS = 30
+_TOKEN_RENEW_AHEAD_SECONDS = 300
+
 
 def create_jwt(app_id: str, private_key: str) -> str:
     """
@@ -158,15 +841,10 @@ def get_installation_token(
     :return: Tuple of (access_token, expiry_timestamp).
     """
     url = f"{GITHUB_API_BASE}/app/installations/" f"{installation_id}/access_tokens"
-    response = requests.post(
+    response = get_github_session().post(
         url,
-        headers={
-            "Authorization": f"Bearer {jwt_token}",
-            "Accept": "application/vnd.github+json",
-        },
-        timeout=30,
+        headers={"Authorization": f"Bearer {jwt_token}"},
     )
-    response.raise_for_status()
     data = response.json()
     token = data["token"]
     expires_at = data["expires_at"]  # ISO 8601
@@ -178,7 +856,18 @@ class TokenManager:
     """
     Manages GitHub App installation token lifecycle.
 
-    Automatically refreshes the token when it is close to expiry.
+    Safe to share between worker threads.  Once started, a background
+    thread renews the token well before it is due for refresh, so
+    callers get the cached token without waiting.  A caller that does
+    find it due (e.g. before :meth:`start`, or if renewal failed)
+    refreshes it; the others wait for that refresh instead of asking
+    GitHub for tokens of their own.  The App's JWT is cached too, and
+    only signed again when it nears expiry.
+
+    The current token is also kept in a file in a private directory,
+    which the ``GIT_ASKPASS`` script of :meth:`git_env` reads each time
+    git asks for a password.  git processes therefore always get the
+    latest token, even when it was renewed after they started.
     """
 
     def __init__(self, app_id: str, private_key: str, installation_id: str):
@@ -192,8 +881,35 @@ class TokenManager:
         self._app_id = app_id
         self._private_key = private_key
         self._installation_id = installation_id
-        self._token: Optional[str] = None
-        self._expiry: float = 0
+        # (token, expiry) and (JWT, time to sign a new one), each
+        # replaced as a whole so readers never see a mix
+        self._current: Tuple[Optional[str], float] = (None, 0)
+        self._jwt: Tuple[Optional[str], float] = (None, 0)
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Why GIT_ASKPASS over alternatives:
+        #  - Environment variables are visible via /proc/<pid>/environ.
+        #  - Embedding the token in the clone URL leaks it in logs and
+        #    error messages.
+        #  - GIT_ASKPASS keeps the token out of the process table and
+        #    git's own output.  The token file is only readable by this
+        #    user (mkdtemp creates the directory with mode 0700) and is
+        #    removed by close(); Fargate's ephemeral storage provides
+        #    an additional safety net.
+        self._dir = tempfile.mkdtemp(prefix="ghtoken-")
+        self._token_path = os.path.join(self._dir, "token")
+        self._askpass_path = os.path.join(self._dir, "git-askpass.sh")
+        # git calls the script with a prompt like "Username for ..." or
+        # "Password for ..."; it answers with the matching credential.
+        with open(self._askpass_path, "w") as fp:
+            fp.write("#!/bin/sh\n")
+            fp.write('case "$1" in\n')
+            fp.write('  Username*) echo "x-access-token" ;;\n')
+            fp.write(f"  Password*) cat {shlex.quote(self._token_path)} ;;\n")
+            fp.write("esac\n")
+        os.chmod(self._askpass_path, 0o700)
 
     @property
     def token(self) -> str:
@@ -202,145 +918,348 @@ class TokenManager:
 
         :return: A valid GitHub installation access token.
         """
-        if self._needs_refresh():
-            self._refresh()
-        return self._token
+        token, expiry = self._current
+        if self._due(expiry, TOKEN_REFRESH_THRESHOLD_SECONDS):
+            with self._refresh_lock:
+                # Another thread may have refreshed it while this one
+                # waited for the lock.
+                if self._due(self._current[1], TOKEN_REFRESH_THRESHOLD_SECONDS):
+                    self._refresh()
+                token = self._current[0]
+        return token
+
+    def git_env(self) -> Dict[str, str]:
+        """
+        Return an environment in which git authenticates with the
+        current token.
+
+        :return: ``os.environ`` plus ``GIT_ASKPASS`` (and no terminal
+            prompts).
+        """
+        # Reading the token refreshes it (and the file) if it is due
+        _ = self.token
+        return {
+            **os.environ,
+            "GIT_ASKPASS": self._askpass_path,
+            "GIT_TERMINAL_PROMPT": "0",
+        }
+
+    def start(self) -> None:
+        """Start renewing the token in the background."""
+        self._thread = threading.Thread(target=self._renew_loop, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop renewing the token and delete the token file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    @staticmethod
+    def _due(expiry: float, margin: float) -> bool:
+        """
+        Check whether a token expires within ``margin`` seconds.
+
+        :param expiry: Expiry timestamp (0 for no token yet).
+        :param margin: Seconds before expiry.
+        :return: True if it does.
+        """
+        return time.time() > expiry - margin
+
+    def _renew_loop(self) -> None:
+        """Renew the token ahead of callers, until closed."""
+        margin = TOKEN_REFRESH_THRESHOLD_SECONDS + _TOKEN_RENEW_AHEAD_SECONDS
+        while not self._stop.wait(_TOKEN_RENEW_CHECK_SECONDS):
+            if not self._due(self._current[1], margin):
+                continue
+            try:
+                with self._refresh_lock:
+                    if self._due(self._current[1], margin):
+                        self._refresh()
+            except Exception as err:
+                # Callers refresh it themselves if this keeps failing.
+                LOG.warning("Failed to renew the installation token: %s", err)
 
-    def _needs_refresh(self) -> bool:
+    def _app_jwt(self) -> str:
         """
-        Check whether the token needs refreshing.
+        Return the App's JWT, signing a new one when it nears expiry.
 
-        :return: True if the token is missing or close to expiry.
+        :return: Encoded JWT.
         """
-        if self._token is None:
-            return True
-        return time.time() > (self._expiry - TOKEN_REFRESH_THRESHOLD_SECONDS)
+        jwt_token, renew_at = self._jwt
+        if jwt_token is None or time.time() > renew_at:
+            jwt_token = create_jwt(self._app_id, self._private_key)
+            # create_jwt's tokens are valid for 10 minutes
+            self._jwt = (jwt_token, time.time() + 540)
+        return jwt_token
 
     def _refresh(self) -> None:
-        """Refresh the installation token."""
+        """Refresh the installation token.  Called with the lock held."""
         LOG.info("Refreshing GitHub installation token")
-        jwt_token = create_jwt(self._app_id, self._private_key)
-        self._token, self._expiry = get_installation_token(
-            jwt_token, self._installation_id
-        )
+        token, expiry = get_installation_token(self._app_jwt(), self._installation_id)
+        # Write and rename, so git never reads a half-written token
+        partial_path = f"{self._token_path}.partial"
+        fd = os.open(partial_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as fp:
+            fp.write(f"{token}\n")
+        os.replace(partial_path, self._token_path)
+        self._current = (token, expiry)
 
 
 # ── GitHub API helpers ──────────────────────────────────────────
 
 
-def list_repositories(token: str) -> List[Dict[str, Any]]:
+# Repository fields the backup uses; the API returns dozens more.
+_REPO_FIELDS = ("full_name", "size", "pushed_at", "has_wiki")
+
+
+def compact_repo(repo: Dict[str, Any]) -> Dict[str, Any]:
     """
-    List all repositories accessible to the installation.
+    Strip a repository dict from GitHub API down to the fields in use.
+
+    :param repo: Repository dict from GitHub API.
+    :return: Dict with only the keys in ``_REPO_FIELDS``.
+    """
+    return {field: repo[field] for field in _REPO_FIELDS if field in repo}
+
+
+def parse_link_header(header: str) -> Dict[str, str]:
+    """
+    Parse a GitHub ``Link`` header.
+
+    :param header: Header value, e.g. ``<https://...?page=2>; rel="next"``.
+    :return: URLs keyed by relation (``next``, ``last``, ...).
+    """
+    links = {}
+    for part in header.split(","):
+        if ";" not in part:
+            continue
+        url, rel = part.split(";", 1)
+        rel = rel.strip()
+        if rel.startswith('rel="'):
+            links[rel[len('rel="') : -1]] = url.strip().strip("<>")
+    return links
 
-    Paginates through all pages automatically.
 
+def paginate(
+    url: str,
+    token: str,
+    params: Optional[Dict[str, Any]] = None,
+    items_key: Optional[str] = None,
+    concurrency: int = GITHUB_API_CONCURRENCY,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of every page of a GitHub REST API list.
+
+    The first page's ``Link: rel="last"`` tells how many pages there
+    are, so the rest are fetched concurrently (see :func:`github_map`)
+    and yielded in page order.  Lists without it (GitHub omits it on
+    cursor-paginated endpoints), and every list with ``concurrency``
+    1, are followed page by page via ``rel="next"``; a caller can then
+    stop early without fetching the remaining pages.  Only a bounded
+    number of pages is held at once.
+
+    Pages are numbered, so items added or removed while the pages are
+    fetched can shift between them: an item may be seen twice or not
+    at all.  Callers that cannot tolerate duplicates drop them.
+
+    :param url: API URL of the list.
     :param token: GitHub installation access token.
-    :return: List of repository dicts from the GitHub API.
-    """
-    repos: List[Dict[str, Any]] = []
-    url = f"{GITHUB_API_BASE}/installation/repositories"
-    params: Dict[str, Any] = {"per_page": 100}
-
-    while url:
-        response = requests.get(
-            url,
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/vnd.github+json",
-            },
-            params=params,
-            timeout=30,
-        )
-        response.raise_for_status()
+    :param params: Query parameters of the list.
+    :param items_key: Key of the items in each page's JSON object, for
+        endpoints that wrap them (e.g. ``"repositories"``); None if the
+        page is a JSON array.
+    :param concurrency: Maximum pages fetched at once.
+    :return: Iterator of items, in the API's order.
+    """
+    session = get_github_session()
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"per_page": 100, **(params or {})}
+
+    def fetch(page_params: Dict[str, Any]) -> requests.Response:
+        return session.get(url, headers=headers, params=page_params)
+
+    def page_items(response: requests.Response) -> List[Dict[str, Any]]:
         data = response.json()
-        repos.extend(data.get("repositories", []))
-
-        # Follow pagination via Link header
-        url = None
-        params = {}
-        link_header = response.headers.get("Link", "")
-        for part in link_header.split(","):
-            if 'rel="next"' in part:
-                url = part.split(";")[0].strip().strip("<>")
-                break
+        return data.get(items_key, []) if items_key else data
+
+    session.wait_for_budget()
+    response = fetch(params)
+    yield from page_items(response)
+
+    links = parse_link_header(response.headers.get("Link", ""))
+    last = parse_qs(urlparse(links.get("last", "")).query).get("page")
+    if last and concurrency > 1:
+        pages = ({**params, "page": page} for page in range(2, int(last[0]) + 1))
+        for response in github_map(fetch, pages, concurrency):
+            yield from page_items(response)
+        return
+
+    while "next" in links:
+        session.wait_for_budget()
+        response = session.get(links["next"], headers=headers)
+        yield from page_items(response)
+        links = parse_link_header(response.headers.get("Link", ""))
 
-    LOG.info("Found %d repositories", len(repos))
-    return repos
+
+def list_repositories(token: str) -> Iterator[Dict[str, Any]]:
+    """
+    List all repositories accessible to the installation.
+
+    Pages are fetched concurrently (see :func:`paginate`), and yielded
+    as compact records (see :func:`compact_repo`) page by page, so the
+    full API objects of a large org are never held at once.  Transient
+    errors and rate limits are retried by :class:`GitHubSession`.
+
+    :param token: GitHub installation access token.
+    :return: Iterator of compact repository dicts, each repo once.
+    """
+    seen = set()
+    for repo in paginate(
+        f"{GITHUB_API_BASE}/installation/repositories",
+        token,
+        items_key="repositories",
+    ):
+        if repo["full_name"] not in seen:
+            seen.add(repo["full_name"])
+            yield compact_repo(repo)
 
 
 # ── Git operations ──────────────────────────────────────────────
 
 
+def repo_url(full_name: str) -> str:
+    """
+    Return the HTTPS clone URL of a repository.
+
+    :param full_name: ``org/repo``.
+    :return: Clone URL.
+    """
+    return f"https://github.com/{full_name}.git"
+
+
 def clone_mirror(
     repo: Dict[str, Any],
-    token: str,
+    token_mgr: "TokenManager",
     dest_dir: str,
+    cache_dir: Optional[str] = None,
+    blob_limit: Optional[int] = None,
 ) -> str:
     """
     Clone a repository with --mirror into dest_dir.
 
-    Uses GIT_ASKPASS to supply credentials so that the token never
-    appears in command-line arguments, exception tracebacks, or logs.
+    With ``cache_dir``, the mirror lives in a persistent cache instead
+    and survives the run: if it already exists, only
+    ``git remote update --prune`` is run against it, so the transfer
+    scales with what changed since the last run.  A cached mirror that
+    fails to update (e.g. left half-written by a killed task) is
+    discarded and cloned again.
+
+    With ``blob_limit``, the mirror is a partial clone without blobs
+    larger than that (``--filter=blob:limit``); a cached mirror cloned
+    with a different filter is cloned again.
+
+    Credentials come from :meth:`TokenManager.git_env`.
 
     :param repo: Repository dict from GitHub API.
-    :param token: GitHub installation access token.
-    :param dest_dir: Directory to clone into.
-    :return: Path to the cloned mirror directory.
+    :param token_mgr: Source of GitHub installation tokens.
+    :param dest_dir: Directory for temporary files (and the mirror,
+        without a cache).
+    :param cache_dir: Root of the persistent mirror cache, if any.
+    :param blob_limit: Size in bytes above which blobs are not fetched.
+    :return: Path to the mirror directory.
     """
     full_name = repo["full_name"]
-    clone_url = f"https://github.com/{full_name}.git"
-    mirror_dir = os.path.join(dest_dir, "mirror.git")
-
-    # Write a temporary GIT_ASKPASS script that provides the token.
-    # Git calls this script with a prompt like "Username for ..." or
-    # "Password for ..."; we return the appropriate credential.
-    #
-    # Why GIT_ASKPASS over alternatives:
-    #  - Environment variables are visible via /proc/<pid>/environ.
-    #  - Embedding the token in the clone URL leaks it in logs and
-    #    error messages.
-    #  - GIT_ASKPASS keeps the token out of the process table and
-    #    git's own output.  The file is short-lived and cleaned up
-    #    in the finally block; Fargate's ephemeral storage provides
-    #    an additional safety net.
-    askpass_path = os.path.join(dest_dir, "git-askpass.sh")
-    with open(askpass_path, "w") as fp:
-        fp.write("#!/bin/sh\n")
-        fp.write('case "$1" in\n')
-        fp.write('  Username*) echo "x-access-token" ;;\n')
-        fp.write(f'  Password*) echo "{token}" ;;\n')
-        fp.write("esac\n")
-    os.chmod(askpass_path, 0o700)
-
-    env = {**os.environ, "GIT_ASKPASS": askpass_path, "GIT_TERMINAL_PROMPT": "0"}
+    blob_filter = "" if blob_limit is None else f"blob:limit={blob_limit}"
+    if cache_dir:
+        mirror_dir = os.path.join(cache_dir, f"{full_name}.git")
+    else:
+        mirror_dir = os.path.join(dest_dir, "mirror.git")
 
+    env = token_mgr.git_env()
+    if os.path.isdir(mirror_dir) and mirror_filter(mirror_dir) != blob_filter:
+        LOG.info("Cached mirror of %s has another blob filter, re-cloning", full_name)
+        shutil.rmtree(mirror_dir, ignore_errors=True)
+    if os.path.isdir(mirror_dir):
+        LOG.info("Updating cached mirror of %s", full_name)
+        try:
+            # --git-dir: a broken mirror must fail, not make git
+            # walk up and find some other repository.
+            subprocess.run(
+                ["git", "--git-dir", mirror_dir, "remote", "update", "--prune"],
+                check=True,
+                capture_output=True,
+                timeout=3600,
+                env=env,
+            )
+            return mirror_dir
+        except subprocess.CalledProcessError as err:
+            LOG.warning(
+                "Cached mirror of %s failed to update, re-cloning: %s",
+                full_name,
+                err.stderr.decode(errors="replace").strip(),
+            )
+            shutil.rmtree(mirror_dir, ignore_errors=True)
+
+    # Clone next to the final path and rename, so an interrupted
+    # clone never leaves a half-written mirror in the cache.
     LOG.info("Cloning %s (mirror)", full_name)
-    try:
-        subprocess.run(
-            ["git", "clone", "--mirror", clone_url, mirror_dir],
-            check=True,
-            capture_output=True,
-            timeout=3600,
-            env=env,
-        )
-    finally:
-        os.remove(askpass_path)
+    partial_dir = f"{mirror_dir}.partial"
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    os.makedirs(os.path.dirname(mirror_dir), exist_ok=True)
+    options = [f"--filter={blob_filter}"] if blob_filter else []
+    subprocess.run(
+        ["git", "clone", "--mirror", *options, repo_url(full_name), partial_dir],
+        check=True,
+        capture_output=True,
+        timeout=3600,
+        env=env,
+    )
+    os.rename(partial_dir, mirror_dir)
     return mirror_dir
 
 
-def create_bundle(
-    mirror_dir: str,
-    bundle_path: str,
-) -> None:
+def mirror_filter(mirror_dir: str) -> str:
     """
-    Create a git bundle from a mirror clone.
+    Return the object filter a mirror was cloned with.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :return: The filter spec (e.g. ``"blob:limit=1048576"``), or an
+        empty string for a full mirror.
+    """
+    return subprocess.run(
+        ["git", "--git-dir", mirror_dir, "config", "remote.origin.partialclonefilter"],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    ).stdout.strip()
+
+
+def git_pack_options() -> List[str]:
+    """
+    Return the ``git -c`` options that apply the pack tuning settings.
+
+    :return: Arguments to put between ``git`` and its subcommand.
+    """
+    options = []
+    for key, value in BACKUP_PACK_SETTINGS.items():
+        options += ["-c", f"{key}={value}"]
+    return options
+
+
+def repack_mirror(mirror_dir: str) -> None:
+    """
+    Repack a mirror from scratch with the pack tuning settings.
+
+    ``-f`` makes git recompute every delta instead of reusing the ones
+    it received, so window, depth and compression apply to all objects.
 
     :param mirror_dir: Path to the mirror .git directory.
-    :param bundle_path: Output path for the bundle file.
     """
-    LOG.info("Creating bundle %s", bundle_path)
+    LOG.info("Repacking %s", mirror_dir)
     subprocess.run(
-        ["git", "bundle", "create", bundle_path, "--all"],
+        ["git", *git_pack_options(), "repack", "-a", "-d", "-f", "-q"],
         cwd=mirror_dir,
         check=True,
         capture_output=True,
@@ -348,99 +1267,3761 @@ def create_bundle(
     )
 
 
-# ── Main ────────────────────────────────────────────────────────
-
+def bundle_suffix() -> str:
+    """
+    Return the file name suffix of bundles written with the current
+    compression setting.
 
-def main() -> None:
+    :return: ``".bundle"`` or ``".bundle.zst"``.
     """
-    Run the GitHub backup process.
+    return ".bundle.zst" if BACKUP_BUNDLE_COMPRESSION == "zstd" else ".bundle"
 
-    1. Authenticate via GitHub App.
-    2. List all accessible repositories.
-    3. Clone, bundle, and upload each repo to S3.
-    4. Write a manifest and publish metrics.
 
-    Any exception crashes the process.  The "task not running"
-    CloudWatch alarm (treat_missing_data = "breaching") fires
-    when no BackupSuccess metric is published.
+class _BundleStream:
     """
-    LOG.info("Starting GitHub backup")
-
-    # 1. Read private key from Secrets Manager
-    private_key = Secret(GITHUB_APP_KEY_SECRET_ARN).value
+    File-like reader over ``git bundle create -``, optionally piped
+    through ``zstd``.
 
-    # 2. Set up token manager (handles refresh automatically)
-    token_mgr = TokenManager(GITHUB_APP_ID, private_key, GITHUB_APP_INSTALLATION_ID)
+    With compression, a thread copies git's output into zstd and counts
+    it, so both the bundle size and the stored (compressed) size are
+    known at the end, as is the SHA-256 of the stored bytes.  At end of
+    stream it waits for the processes and raises if one failed, so a
+    truncated bundle is never taken for a complete one.  With
+    ``blob_limit``, blobs larger than that are left out (a filtered
+    bundle).  All processes are killed after an hour.
+    """
 
-    # 3. List all repositories
-    repos = list_repositories(token_mgr.token)
+    def __init__(
+        self,
+        mirror_dir: str,
+        exclude: Optional[List[str]] = None,
+        blob_limit: Optional[int] = None,
+    ):
+        """
+        Start git (and zstd).
 
-    # 4. Back up each repo
-    # Any exception aborts the run — no metrics are published,
-    # which triggers the "task not running" CloudWatch alarm
-    # (treat_missing_data = "breaching").
-    results: List[Dict[str, Any]] = []
-    date_prefix = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        :param mirror_dir: Path to the mirror .git directory.
+        :param exclude: Object IDs whose history to leave out (delta
+            bundle).
+        :param blob_limit: Size in bytes above which blobs are left out.
+        """
+        self.bundle_bytes = 0
+        self.bytes_read = 0
+        self.sha256 = hashlib.sha256()
+        self._procs: List[Tuple[subprocess.Popen, IO[bytes]]] = []
+        self._pump: Optional[threading.Thread] = None
+        # The same hour subprocess.run gets for fetches and repacks
+        # elsewhere.  Killing the processes also unblocks this object:
+        # their pipes close, so a pending stdin write fails and reads
+        # reach end of stream (then the exit status is reported).
+        self._watchdog = threading.Timer(3600, self._kill)
+        try:
+            # stderr goes to temporary files: an unread pipe could fill
+            # up and stall a process while its reader waits on stdout.
+            command = ["git", *git_pack_options(), "bundle", "create", "-", "--all"]
+            if blob_limit is not None:
+                command.append(f"--filter=blob:limit={blob_limit}")
+            git = self._start([*command, "--stdin"], cwd=mirror_dir)
+            self._stdout = git.stdout
+            if BACKUP_BUNDLE_COMPRESSION == "zstd":
+                zstd = self._start(["zstd", "-q", "-T0", f"-{BACKUP_ZSTD_LEVEL}", "-c"])
+                self._stdout = zstd.stdout
+                self._pump = threading.Thread(
+                    target=self._copy, args=(git.stdout, zstd.stdin), daemon=True
+                )
+        except BaseException:
+            self.close()
+            raise
+        self._watchdog.start()
+        # Exclusions go through stdin: an org's tag list easily outgrows
+        # the command-line length limit.  git reads all of stdin before
+        # it writes anything, so this write cannot wait on a full stdout
+        # pipe; it only blocks while git has not read yet, which the
+        # watchdog (started above for that reason) bounds.  The pump
+        # starts afterwards so that nothing is left running if the
+        # write raises.
+        try:
+            git.stdin.write("".join(f"^{oid}\n" for oid in exclude or []).encode())
+            git.stdin.close()
+        except OSError:
+            pass  # git exited early; read() reports its error
+        if self._pump:
+            self._pump.start()
+
+    def _start(self, args: List[str], **kwargs: Any) -> subprocess.Popen:
+        """
+        Start a process of the stream with piped stdin and stdout.
+
+        The process is registered so :meth:`read` checks its exit status
+        and :meth:`close` and the watchdog kill it.
+
+        :param args: Command line.
+        :param kwargs: Further arguments to :class:`subprocess.Popen`.
+        :return: The started process.
+        """
+        stderr_fp = tempfile.TemporaryFile()
+        proc = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr_fp,
+            **kwargs,
+        )
+        self._procs.append((proc, stderr_fp))
+        return proc
+
+    def _copy(self, source: IO[bytes], dest: IO[bytes]) -> None:
+        """
+        Copy git's output into zstd, counting the bundle bytes.
+
+        Runs on the pump thread.  ``dest`` is closed at the end so zstd
+        sees end of input and finishes the frame.
+
+        :param source: stdout of git.
+        :param dest: stdin of zstd.
+        """
+        try:
+            while True:
+                data = source.read(1024**2)
+                if not data:
+                    break
+                self.bundle_bytes += len(data)
+                dest.write(data)
+        except OSError:
+            pass  # zstd died; its exit status reports it
+        finally:
+            try:
+                dest.close()
+            except OSError:
+                pass
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes of the stored bundle.
+
+        :param size: Maximum number of bytes to read; -1 for all.
+        :return: Bundle bytes; empty at the end of the bundle.
+        :raises subprocess.CalledProcessError: If git or zstd exited
+            non-zero.
+        """
+        data = self._stdout.read(size)
+        self.bytes_read += len(data)
+        self.sha256.update(data)
+        if not data:
+            if self._pump:
+                self._pump.join()
+            else:
+                self.bundle_bytes = self.bytes_read
+            for proc, stderr_fp in self._procs:
+                returncode = proc.wait()
+                if returncode:
+                    stderr_fp.seek(0)
+                    raise subprocess.CalledProcessError(
+                        returncode, proc.args, stderr=stderr_fp.read()
+                    )
+        return data
+
+    def _kill(self) -> None:
+        for proc, _ in self._procs:
+            if proc.poll() is None:
+                proc.kill()
+
+    def close(self) -> None:
+        """Kill whatever is still running and release the pipes."""
+        self._watchdog.cancel()
+        self._kill()
+        for proc, _ in self._procs:
+            proc.wait()
+        if self._pump and self._pump.is_alive():
+            self._pump.join()
+        for proc, stderr_fp in self._procs:
+            proc.stdout.close()
+            stderr_fp.close()
+
+
+def create_bundle(
+    mirror_dir: str,
+    bundle_path: str,
+    exclude: Optional[List[str]] = None,
+    blob_limit: Optional[int] = None,
+) -> Optional[Tuple[int, str]]:
+    """
+    Create a git bundle from a mirror clone.
+
+    With ``exclude``, the bundle is a delta: it carries only objects
+    not reachable from those commits, and needs a repository that has
+    them (the previous bundles of the chain) to be unbundled.  With
+    ``BACKUP_BUNDLE_COMPRESSION=zstd`` the file is zstd-compressed.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param bundle_path: Output path for the bundle file.
+    :param exclude: Object IDs whose history to leave out.
+    :param blob_limit: Size in bytes above which blobs are left out.
+    :return: Uncompressed bundle size in bytes and SHA-256 of the file,
+        or None if a delta bundle would be empty and was not written.
+    """
+    LOG.info("Creating %s bundle %s", "delta" if exclude else "full", bundle_path)
+    stream = _BundleStream(mirror_dir, exclude, blob_limit)
+    try:
+        with open(bundle_path, "wb") as fp:
+            shutil.copyfileobj(stream, fp, 1024**2)
+    except subprocess.CalledProcessError as err:
+        os.remove(bundle_path)
+        if exclude and b"empty bundle" in err.stderr:
+            return None
+        raise
+    finally:
+        stream.close()
+    return stream.bundle_bytes, stream.sha256.hexdigest()
+
+
+def stream_bundle_to_s3(
+    mirror_dir: str,
+    bucket: str,
+    s3_key: str,
+    exclude: Optional[List[str]] = None,
+    size_hint: int = 0,
+    blob_limit: Optional[int] = None,
+) -> Optional[Tuple[int, int, str]]:
+    """
+    Create a git bundle and upload it to S3 without writing it to disk.
+
+    ``git bundle create -`` writes to a pipe that boto3 consumes as a
+    multipart upload, so parts go out while git is still packing, and
+    ephemeral storage only has to hold the mirror.  A failed bundle
+    makes boto3 abort the multipart upload instead of completing it.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param bucket: S3 bucket name.
+    :param s3_key: S3 object key.
+    :param exclude: Object IDs whose history to leave out (delta bundle).
+    :param size_hint: Expected bundle size in bytes, used to pick the
+        multipart part size.
+    :param blob_limit: Size in bytes above which blobs are left out.
+    :return: Stored (possibly compressed) and uncompressed bundle size
+        in bytes, and SHA-256 of the stored bytes; None if a delta bundle
+        would be empty and nothing was uploaded.
+    """
+    LOG.info(
+        "Streaming %s bundle of %s -> s3://%s/%s",
+        "delta" if exclude else "full",
+        mirror_dir,
+        bucket,
+        s3_key,
+    )
+    stream = _BundleStream(mirror_dir, exclude, blob_limit)
+    try:
+        get_s3_client().upload_fileobj(
+            stream,
+            bucket,
+            s3_key,
+            ExtraArgs=_UPLOAD_ARGS,
+            Config=transfer_config(2 * size_hint),
+        )
+    except subprocess.CalledProcessError as err:
+        if exclude and b"empty bundle" in err.stderr:
+            return None
+        raise
+    finally:
+        stream.close()
+    return stream.bytes_read, stream.bundle_bytes, stream.sha256.hexdigest()
+
+
+def directory_size(path: str) -> int:
+    """
+    Return the total size of the files under a directory.
+
+    :param path: Directory, e.g. a mirror clone.
+    :return: Size in bytes.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # removed by a concurrent git gc
+    return total
+
+
+def list_refs(mirror_dir: str) -> Dict[str, str]:
+    """
+    List every ref of a mirror clone.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :return: Mapping of ref name to object ID.
+    """
+    result = subprocess.run(
+        ["git", "for-each-ref", "--format=%(objectname) %(refname)"],
+        cwd=mirror_dir,
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=600,
+    )
+    refs = {}
+    for line in result.stdout.splitlines():
+        oid, name = line.split(" ", 1)
+        refs[name] = oid
+    return refs
+
+
+def existing_objects(mirror_dir: str, oids: List[str]) -> List[str]:
+    """
+    Filter object IDs down to those present in a mirror clone.
+
+    Tips of force-pushed or deleted branches are no longer fetched,
+    and git refuses to exclude objects it does not have.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param oids: Object IDs to check.
+    :return: The object IDs from ``oids`` that exist in the mirror.
+    """
+    result = subprocess.run(
+        ["git", "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+        cwd=mirror_dir,
+        input="".join(f"{oid}\n" for oid in oids),
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=600,
+    )
+    return [
+        line.split(" ", 1)[0]
+        for line in result.stdout.splitlines()
+        if not line.endswith(" missing")
+    ]
+
+
+# ── Manifest ────────────────────────────────────────────────────
+
+
+class ManifestWriter:
+    """
+    Manifest entries spooled to a local JSON Lines file as repos finish.
+
+    Entries are therefore in completion order, not listing order, and
+    that order changes from run to run; readers look entries up by
+    ``repo``.  Only counters and the names of failed repos are kept in
+    memory, so memory use stays flat however large the org is.
+    :meth:`upload` writes the entries as ``<name>.jsonl`` and then the
+    summary as ``<name>.json``; the summary goes last, so its presence
+    marks a complete manifest.
+    """
+
+    def __init__(self):
+        """Initialize the writer with an empty spool file."""
+        self._file = tempfile.NamedTemporaryFile(
+            mode="w", suffix=".jsonl", delete=False
+        )
+        self._lock = threading.Lock()
+        self.total = 0
+        self.failed: List[str] = []
+
+    @property
+    def success_count(self) -> int:
+        """Number of entries that are not failures."""
+        return self.total - len(self.failed)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Append a manifest entry after those already added.  Safe to
+        call from any thread.
+
+        :param entry: Manifest entry of one repo.
+        """
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.total += 1
+            if entry.get("status") == "failed":
+                self.failed.append(entry["repo"])
+
+    def upload(self, bucket: str, key_base: str, summary: Dict[str, Any]) -> None:
+        """
+        Upload the entries, then the summary pointing at them.
+
+        :param bucket: S3 bucket name.
+        :param key_base: S3 key without extension, e.g.
+            ``github-backup/<date>/manifest``.
+        :param summary: Top-level manifest fields (counts, date, ...).
+        """
+        repos_key = f"{key_base}.jsonl"
+        self.upload_entries(bucket, repos_key)
+        upload_json({**summary, "repos_key": repos_key}, bucket, f"{key_base}.json")
+
+    def upload_entries(self, bucket: str, s3_key: str) -> None:
+        """
+        Upload the entries alone, for a summary that embeds their key.
+
+        :param bucket: S3 bucket name.
+        :param s3_key: S3 key of the JSON Lines file.
+        """
+        self._file.flush()
+        upload_to_s3(self._file.name, bucket, s3_key)
+
+    def close(self) -> None:
+        """Delete the spool file."""
+        self._file.close()
+        os.unlink(self._file.name)
+
+
+# ── Incremental backups ─────────────────────────────────────────
+
+
+def repo_fingerprint(repo: Dict[str, Any]) -> Optional[str]:
+    """
+    Return a value that changes whenever a repository's refs change.
+
+    That is the hash of its refs if :func:`fingerprint_repos` added
+    one.  Otherwise it is ``pushed_at``: GitHub bumps it on every push,
+    including branch and tag deletions, and it comes for free with
+    ``list_repositories``.
+
+    :param repo: Repository dict from GitHub API.
+    :return: Fingerprint string, or None if none is known.
+    """
+    if "ref_fingerprint" in repo:
+        return repo["ref_fingerprint"]
+    return repo.get("pushed_at")
+
+
+def load_previous_entries(
+    bucket: str, date_prefix: str
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Load the previous run's manifest summary and entries.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: The summary (empty if there is no previous manifest) and
+        the entries keyed by repo full name.
+    """
+    summary = load_previous_manifest(bucket, date_prefix)
+    if summary is None:
+        return {}, {}
+    entries = {e["repo"]: e for e in iter_manifest_entries(bucket, summary)}
+    return summary, entries
+
+
+def load_previous_manifest(bucket: str, date_prefix: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the manifest of the most recent run before ``date_prefix``.
+
+    Dated prefixes are listed newest first, and the first one that has
+    a manifest wins, so a day whose run crashed before writing its
+    manifest is skipped.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: The previous manifest, or None if there is none.
+    """
+    client = get_s3_client()
+    for date in (d for d in backup_dates(bucket) if d < date_prefix):
+        key = f"github-backup/{date}/manifest.json"
+        try:
+            response = client.get_object(Bucket=bucket, Key=key)
+        except client.exceptions.NoSuchKey:
+            continue
+        LOG.info("Loaded previous manifest s3://%s/%s", bucket, key)
+        return json.loads(response["Body"].read())
+
+    LOG.info("No previous manifest found; backing up every repository")
+    return None
+
+
+def find_reusable_entry(
+    repo: Dict[str, Any],
+    previous: Dict[str, Dict[str, Any]],
+    date_prefix: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Return the previous manifest entry of an unchanged repository.
+
+    A bundle is reused only if the repo's fingerprint matches and the
+    bundle is younger than ``BACKUP_REUSE_MAX_AGE_DAYS``, so that no
+    manifest ever points at an object the lifecycle rule has expired.
+
+    :param repo: Repository dict from GitHub API.
+    :param previous: Previous manifest entries keyed by repo full name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: Manifest entry for this run, or None if the repo must be
+        backed up again.
+    """
+    entry = previous.get(repo["full_name"])
+    fingerprint = repo_fingerprint(repo)
+    if entry is None or fingerprint is None:
+        return None
+    if entry.get("fingerprint") != fingerprint:
+        return None
+
+    # A delta bundle is only as young as the full bundle it builds on.
+    bundle_date = chain_base_date(entry)
+    if bundle_date is None:
+        return None
+    if days_between(bundle_date, date_prefix) >= BACKUP_REUSE_MAX_AGE_DAYS:
+        return None
+
+    # Phase timings belong to the run that made the bundle, not this one
+    reused = {k: v for k, v in entry.items() if k != "phases"}
+    return {**reused, "reused": True}
+
+
+def days_between(earlier: str, later: str) -> int:
+    """
+    Count the days between two ``YYYY-MM-DD`` dates.
+
+    :param earlier: The earlier date.
+    :param later: The later date.
+    :return: Number of days from ``earlier`` to ``later``.
+    """
+    return (datetime.fromisoformat(later) - datetime.fromisoformat(earlier)).days
+
+
+# ── Delta bundles ───────────────────────────────────────────────
+
+
+def chain_base_date(entry: Dict[str, Any]) -> Optional[str]:
+    """
+    Return the date of the full bundle a manifest entry depends on.
+
+    :param entry: Manifest entry.
+    :return: ``YYYY-MM-DD`` of the chain's full bundle (or of its
+        oldest bundle, if older), or None for entries written before
+        bundle dates were recorded.
+    """
+    chain = entry.get("chain")
+    if chain:
+        # Content-addressed links may predate the chain's full bundle
+        return min(link["bundle_date"] for link in chain)
+    return entry.get("bundle_date")
+
+
+def delta_chain(
+    entry: Optional[Dict[str, Any]],
+    date_prefix: str,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Return the bundle chain a new delta bundle can extend.
+
+    A full bundle is forced when there is no usable previous entry,
+    when the chain's full bundle is ``BACKUP_DELTA_FULL_INTERVAL_DAYS``
+    old (or would outlive ``BACKUP_REUSE_MAX_AGE_DAYS``), or when the
+    chain already holds ``BACKUP_DELTA_MAX_CHAIN`` bundles.
+
+    :param entry: Previous manifest entry of the repo, if any.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: The previous chain, or None if a full bundle is needed.
+    """
+    if not entry or not entry.get("chain") or not entry.get("refs"):
+        return None
+    chain = entry["chain"]
+    if len(chain) >= BACKUP_DELTA_MAX_CHAIN:
+        return None
+    max_age = min(BACKUP_DELTA_FULL_INTERVAL_DAYS, BACKUP_REUSE_MAX_AGE_DAYS)
+    if days_between(chain_base_date(entry), date_prefix) >= max_age:
+        return None
+    return chain
+
+
+# ── Content-addressed bundles ───────────────────────────────────
+
+
+def bundle_object_key(
+    mirror_dir: str,
+    exclude: Optional[List[str]] = None,
+    blob_limit: Optional[int] = None,
+) -> str:
+    """
+    Return the content address of the bundle a mirror would produce.
+
+    A bundle holds every object reachable from its refs minus those
+    reachable from the excluded commits (and, in a filtered bundle, the
+    blobs above the limit), so the refs, ``HEAD``, the exclusions and
+    the limit identify its content without creating it.  Pack settings
+    only change how the same objects are encoded and are left out.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param exclude: Object IDs whose history the bundle leaves out.
+    :param blob_limit: Size in bytes above which the bundle leaves out
+        blobs.
+    :return: S3 key under ``github-backup/objects/``.
+    """
+    head = subprocess.run(
+        ["git", "symbolic-ref", "-q", "HEAD"],
+        cwd=mirror_dir,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    ).stdout.strip()
+    digest = hashlib.sha256(f"HEAD {head}\n".encode())
+    for name, oid in sorted(list_refs(mirror_dir).items()):
+        digest.update(f"{oid} {name}\n".encode())
+    for oid in sorted(exclude or []):
+        digest.update(f"^{oid}\n".encode())
+    if blob_limit is not None:
+        digest.update(f"filter blob:limit={blob_limit}\n".encode())
+    object_id = digest.hexdigest()
+    return f"github-backup/objects/{object_id[:2]}/{object_id}{bundle_suffix()}"
+
+
+def find_stored_object(
+    bucket: str, s3_key: str, date_prefix: str
+) -> Optional[Tuple[int, str, Optional[str]]]:
+    """
+    Check whether an immutable stored object can be referenced as is.
+
+    Used for deduplicated bundles, large blobs, LFS objects and release
+    assets, all of which are stored once under keys that identify their
+    content.
+
+    :param bucket: S3 bucket name.
+    :param s3_key: Key from :func:`bundle_object_key`, :func:`blob_key`,
+        :func:`lfs_object_key` or :func:`asset_key`.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: Size, ``YYYY-MM-DD`` write date and S3 checksum (see
+        :func:`stored_checksum`) of the object, or None if it is missing
+        or too old to reference (see ``BACKUP_REUSE_MAX_AGE_DAYS``).
+    """
+    response = head_object(bucket, s3_key)
+    if response is None:
+        return None
+    # Capped at the run's date: a run that crosses midnight must not
+    # record objects from the future.
+    written = min(response["LastModified"].strftime("%Y-%m-%d"), date_prefix)
+    if days_between(written, date_prefix) >= BACKUP_REUSE_MAX_AGE_DAYS:
+        return None
+    return response["ContentLength"], written, response.get("ChecksumSHA256")
+
+
+# ── Repository policies ─────────────────────────────────────────
+
+# Blob size limit of "filtered" rules that do not set blob_limit_mb
+_DEFAULT_BLOB_LIMIT_MB = 1
+
+# Parallel S3 lookups and uploads of one repo's blobs or LFS objects
+_OBJECT_SYNC_WORKERS = 8
+
+# Large blobs fetched from GitHub (and held on disk) at a time
+_BLOB_FETCH_BATCH = 32
+
+# Git LFS pointer files are smaller than this, and the LFS batch API
+# takes at most this many objects per request
+_LFS_POINTER_MAX_BYTES = 1024
+_LFS_BATCH_SIZE = 100
+
+_LFS_POINTER_VERSION = "version https://git-lfs.github.com/spec/"
+
+
+def repo_policy(repo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pick the backup strategy of a repository.
+
+    ``BACKUP_REPO_POLICIES`` rules are tried in order; a rule matches if
+    the repo's full name matches its ``repos`` glob and the repo is at
+    least ``min_size_gb`` large (either may be left out).  Repos that no
+    rule matches get the ``"full"`` strategy.
+
+    :param repo: Repository dict from GitHub API.
+    :return: ``strategy`` (``"full"``, ``"filtered"`` or ``"lfs"``) and,
+        for ``"filtered"``, ``blob_limit`` in bytes (else None).
+    """
+    for rule in BACKUP_REPO_POLICIES:
+        if "repos" in rule and not fnmatch.fnmatchcase(
+            repo["full_name"], rule["repos"]
+        ):
+            continue
+        if repo.get("size", 0) * 1024 < rule.get("min_size_gb", 0) * 1024**3:
+            continue
+        strategy = rule.get("strategy", "full")
+        blob_limit = None
+        if strategy == "filtered":
+            blob_limit = int(
+                rule.get("blob_limit_mb", _DEFAULT_BLOB_LIMIT_MB) * 1024**2
+            )
+        return {"strategy": strategy, "blob_limit": blob_limit}
+    return {"strategy": "full", "blob_limit": None}
+
+
+class _DigestReader:
+    """
+    File-like reader that hashes what is read through it and raises at
+    the end unless the content matches its object ID (and size, if
+    known).
+
+    boto3 then aborts the upload reading from it instead of completing
+    it, so a truncated or altered object is never stored under its ID.
+    """
+
+    def __init__(
+        self, raw: IO[bytes], digest: Any, oid: str, size: Optional[int] = None
+    ):
+        """
+        :param raw: Source stream.
+        :param digest: ``hashlib`` object, primed with any header.
+        :param oid: Hex digest the content must have.
+        :param size: Number of bytes the content must have, if known.
+        """
+        self._raw = raw
+        self._digest = digest
+        self._oid = oid
+        self._size = size
+        self._length = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes.
+
+        :param size: Maximum number of bytes to read; -1 for all.
+        :return: Content bytes; empty at the end.
+        :raises RuntimeError: Once the content is longer than expected,
+            or at the end if it does not match.
+        """
+        data = self._raw.read(size)
+        self._digest.update(data)
+        self._length += len(data)
+        if self._size is not None and self._length > self._size:
+            raise RuntimeError(f"{self._oid} is larger than {self._size} bytes")
+        # A read of everything ends the content as much as an empty one
+        if not data or size < 0:
+            if self._size is not None and self._length != self._size:
+                raise RuntimeError(
+                    f"{self._oid} is {self._length} bytes, not {self._size}"
+                )
+            if self._digest.hexdigest() != self._oid:
+                raise RuntimeError(f"Content of {self._oid} does not match its ID")
+        return data
+
+
+def store_git_blob(git_dir: str, oid: str, bucket: str) -> int:
+    """
+    Stream a blob from a repository to its key in S3.
+
+    :param git_dir: Repository that has the blob.
+    :param oid: Object ID of the blob.
+    :param bucket: S3 bucket name.
+    :return: Size of the blob in bytes.
+    """
+    size = int(
+        subprocess.run(
+            ["git", "cat-file", "-s", oid],
+            cwd=git_dir,
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        ).stdout
+    )
+    with subprocess.Popen(
+        ["git", "cat-file", "blob", oid],
+        cwd=git_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ) as proc:
+        get_s3_client().upload_fileobj(
+            _DigestReader(proc.stdout, hashlib.sha1(b"blob %d\0" % size), oid, size),
+            bucket,
+            blob_key(oid),
+            ExtraArgs=_UPLOAD_ARGS,
+            Config=transfer_config(size),
+        )
+    return size
+
+
+def large_blobs(
+    mirror_dir: str, blob_limit: int, exclude: Optional[List[str]] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    List the blobs a filtered bundle leaves out.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param blob_limit: Size in bytes above which blobs are left out.
+    :param exclude: Object IDs whose history the bundle leaves out.
+    :return: Object IDs of those the mirror has (e.g. from before it
+        was filtered) and of those it was cloned without.
+    """
+    output = subprocess.run(
+        [
+            "git",
+            "rev-list",
+            "--objects",
+            "--all",
+            f"--filter=blob:limit={blob_limit}",
+            "--filter-print-omitted",
+            "--missing=print",
+            "--stdin",
+        ],
+        cwd=mirror_dir,
+        input="".join(f"^{oid}\n" for oid in exclude or []),
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=3600,
+    ).stdout
+    present, missing = [], []
+    for line in output.splitlines():
+        if line.startswith("~"):
+            present.append(line[1:])
+        elif line.startswith("?"):
+            missing.append(line[1:])
+    return present, missing
+
+
+def sync_large_blobs(
+    mirror_dir: str,
+    full_name: str,
+    blob_limit: int,
+    token_mgr: "TokenManager",
+    bucket: str,
+    date_prefix: str,
+    exclude: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Store the blobs a filtered bundle leaves out, once per object ID.
+
+    Blobs already stored are skipped unless they are too old to rely on
+    (see :func:`find_stored_object`).  Those the partial mirror was
+    cloned without are fetched from GitHub into a scratch repository,
+    ``_BLOB_FETCH_BATCH`` at a time so only one batch is on disk.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param full_name: ``org/repo``.
+    :param blob_limit: Size in bytes above which blobs are left out.
+    :param token_mgr: Source of GitHub installation tokens.
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param exclude: Object IDs whose history the bundle leaves out.
+    :return: ``oid`` and ``size`` of every blob the bundle leaves out
+        (what a restore needs), and the number of bytes uploaded.
+    """
+    present, missing = large_blobs(mirror_dir, blob_limit, exclude)
+    sizes: Dict[str, int] = {}
+    uploaded = 0
+    with ThreadPoolExecutor(max_workers=_OBJECT_SYNC_WORKERS) as pool:
+
+        def store(git_dir: str, oids: List[str]) -> None:
+            nonlocal uploaded
+            for oid, size in zip(
+                oids, pool.map(lambda oid: store_git_blob(git_dir, oid, bucket), oids)
+            ):
+                sizes[oid] = size
+                uploaded += size
+
+        for oid, found in zip(
+            present + missing,
+            pool.map(
+                lambda oid: find_stored_object(bucket, blob_key(oid), date_prefix),
+                present + missing,
+            ),
+        ):
+            if found:
+                sizes[oid] = found[0]
+        store(mirror_dir, [oid for oid in present if oid not in sizes])
+
+        to_fetch = [oid for oid in missing if oid not in sizes]
+        if to_fetch:
+            scratch = tempfile.mkdtemp(prefix="ghblobs-")
+            git_dir = os.path.join(scratch, "blobs.git")
+            try:
+                for i in range(0, len(to_fetch), _BLOB_FETCH_BATCH):
+                    batch = to_fetch[i : i + _BLOB_FETCH_BATCH]
+                    subprocess.run(
+                        ["git", "init", "-q", "--bare", git_dir],
+                        check=True,
+                        capture_output=True,
+                        timeout=60,
+                    )
+                    subprocess.run(
+                        [
+                            "git",
+                            "fetch",
+                            "-q",
+                            "--no-tags",
+                            "--no-write-fetch-head",
+                            repo_url(full_name),
+                            *batch,
+                        ],
+                        cwd=git_dir,
+                        check=True,
+                        capture_output=True,
+                        timeout=3600,
+                        env=token_mgr.git_env(),
+                    )
+                    store(git_dir, batch)
+                    shutil.rmtree(git_dir)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+    LOG.info("%s: %d large blobs, %d bytes uploaded", full_name, len(sizes), uploaded)
+    return [{"oid": oid, "size": size} for oid, size in sorted(sizes.items())], uploaded
+
+
+def parse_lfs_pointer(data: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Parse a Git LFS pointer file.
+
+    :param data: Blob content.
+    :return: ``oid`` and ``size`` of the LFS object, or None if the blob
+        is not a pointer.
+    """
+    try:
+        text = data.decode("ascii")
+    except UnicodeDecodeError:
+        return None
+    if not text.startswith(_LFS_POINTER_VERSION):
+        return None
+    fields = dict(line.split(" ", 1) for line in text.splitlines() if " " in line)
+    oid = fields.get("oid", "")
+    if not oid.startswith("sha256:") or not fields.get("size", "").isdigit():
+        return None
+    return {"oid": oid[len("sha256:") :], "size": int(fields["size"])}
+
+
+def lfs_pointers(
+    mirror_dir: str, exclude: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    List the LFS objects a mirror's history points at.
+
+    Small blobs are streamed through ``git cat-file --batch`` and
+    parsed as pointers, so memory stays flat however many there are.
+
+    :param mirror_dir: Path to the mirror .git directory.
+    :param exclude: Object IDs whose history to leave out.
+    :return: ``oid`` and ``size`` of each LFS object, sorted by ``oid``.
+    """
+    rev_list = subprocess.Popen(
+        [
+            "git",
+            "rev-list",
+            "--objects",
+            "--no-object-names",
+            "--all",
+            f"--filter=blob:limit={_LFS_POINTER_MAX_BYTES}",
+            "--stdin",
+        ],
+        cwd=mirror_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    rev_list.stdin.write("".join(f"^{oid}\n" for oid in exclude or []).encode())
+    rev_list.stdin.close()
+    check = subprocess.Popen(
+        ["git", "cat-file", "--batch-check=%(objecttype) %(objectname)"],
+        cwd=mirror_dir,
+        stdin=rev_list.stdout,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    rev_list.stdout.close()
+    batch = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        cwd=mirror_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def feed() -> None:
+        # Pass blob IDs on as the first cat-file reports them; the
+        # main thread reads their content meanwhile.
+        try:
+            for line in check.stdout:
+                object_type, oid = line.split()
+                if object_type == b"blob":
+                    batch.stdin.write(oid + b"\n")
+        finally:
+            batch.stdin.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    pointers = {}
+    for header in batch.stdout:
+        size = int(header.split()[2])
+        pointer = parse_lfs_pointer(batch.stdout.read(size + 1)[:size])
+        if pointer:
+            pointers[pointer["oid"]] = pointer
+    feeder.join()
+    for proc in (rev_list, check, batch):
+        if proc.wait():
+            raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    return [pointers[oid] for oid in sorted(pointers)]
+
+
+_LFS_SESSION: Optional[requests.Session] = None
+_LFS_SESSION_LOCK = threading.Lock()
+
+
+def get_lfs_session() -> requests.Session:
+    """
+    Return the process-wide session for LFS object downloads.
+
+    The download URLs point at GitHub's LFS storage rather than the API,
+    so they skip :class:`GitHubSession`'s rate-limit handling, but keep
+    connections alive and retry transient errors like it does.
+
+    :return: Shared, pooled :class:`requests.Session`.
+    """
+    global _LFS_SESSION
+    with _LFS_SESSION_LOCK:
+        if _LFS_SESSION is None:
+            _LFS_SESSION = requests.Session()
+            _LFS_SESSION.mount(
+                "https://",
+                HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=BACKUP_BUNDLE_WORKERS * _OBJECT_SYNC_WORKERS,
+                    max_retries=_GITHUB_RETRY,
+                ),
+            )
+        return _LFS_SESSION
+
+
+def store_lfs_object(obj: Dict[str, Any], action: Dict[str, Any], bucket: str) -> None:
+    """
+    Stream an LFS object from its download URL to its key in S3.
+
+    The content is checked against the object's SHA-256 and size as it
+    streams; on a mismatch the upload is aborted, so nothing is stored
+    under :func:`lfs_object_key`.
+
+    :param obj: ``oid`` and ``size`` of the object.
+    :param action: ``download`` action from the LFS batch API.
+    :param bucket: S3 bucket name.
+    :raises RuntimeError: If the content does not match the object.
+    """
+    with get_lfs_session().get(
+        action["href"], headers=action.get("header", {}), stream=True, timeout=60
+    ) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        get_s3_client().upload_fileobj(
+            _DigestReader(response.raw, hashlib.sha256(), obj["oid"], obj["size"]),
+            bucket,
+            lfs_object_key(obj["oid"]),
+            ExtraArgs=_UPLOAD_ARGS,
+            Config=transfer_config(obj["size"]),
+        )
+
+
+def sync_lfs_objects(
+    full_name: str,
+    pointers: List[Dict[str, Any]],
+    token_mgr: "TokenManager",
+    bucket: str,
+    date_prefix: str,
+) -> Tuple[int, int]:
+    """
+    Copy a repository's LFS objects from GitHub to S3, once per OID.
+
+    Objects already stored are skipped unless they are too old to rely
+    on (see :func:`find_stored_object`); the rest are downloaded through
+    the LFS batch API and streamed to S3.
+
+    :param full_name: ``org/repo``.
+    :param pointers: Objects from :func:`lfs_pointers`.
+    :param token_mgr: Source of GitHub installation tokens.
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: Number of bytes uploaded and number of objects GitHub
+        could not provide.
+    """
+    with ThreadPoolExecutor(max_workers=_OBJECT_SYNC_WORKERS) as pool:
+        found = pool.map(
+            lambda obj: find_stored_object(
+                bucket, lfs_object_key(obj["oid"]), date_prefix
+            ),
+            pointers,
+        )
+        wanted = [obj for obj, stored in zip(pointers, found) if not stored]
+        uploaded = missing = 0
+        for i in range(0, len(wanted), _LFS_BATCH_SIZE):
+            response = get_github_session().post(
+                f"{repo_url(full_name)}/info/lfs/objects/batch",
+                auth=("x-access-token", token_mgr.token),
+                headers={
+                    "Accept": "application/vnd.git-lfs+json",
+                    "Content-Type": "application/vnd.git-lfs+json",
+                },
+                json={
+                    "operation": "download",
+                    "transfers": ["basic"],
+                    "objects": wanted[i : i + _LFS_BATCH_SIZE],
+                },
+                timeout=60,
+            )
+            downloads = []
+            for obj in response.json()["objects"]:
+                action = obj.get("actions", {}).get("download")
+                if action is None:
+                    LOG.warning(
+                        "%s: LFS object %s is not available: %s",
+                        full_name,
+                        obj["oid"],
+                        obj.get("error", {}).get("message", "no download action"),
+                    )
+                    missing += 1
+                    continue
+                downloads.append((obj, action))
+            list(
+                pool.map(
+                    lambda item: store_lfs_object(item[0], item[1], bucket), downloads
+                )
+            )
+            uploaded += sum(obj["size"] for obj, _ in downloads)
+
+    LOG.info(
+        "%s: %d LFS objects, %d bytes uploaded, %d missing",
+        full_name,
+        len(pointers),
+        uploaded,
+        missing,
+    )
+    return uploaded, missing
+
+
+# ── Planning ────────────────────────────────────────────────────
+
+
+def ls_remote_fingerprint(
+    full_name: str, env: Dict[str, str], missing_ok: bool = False
+) -> Optional[str]:
+    """
+    Hash the refs of a repository as ``git ls-remote`` lists them.
+
+    :param full_name: ``org/repo``.
+    :param env: Environment from :meth:`TokenManager.git_env`.
+    :param missing_ok: Don't warn if ls-remote fails, e.g. for a repo
+        that may not exist.
+    :return: Fingerprint, or None if ls-remote failed.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", repo_url(full_name)],
+            check=True,
+            capture_output=True,
+            timeout=120,
+            env=env,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as err:
+        log = LOG.debug if missing_ok else LOG.warning
+        log("git ls-remote failed for %s: %s", full_name, describe_error(err))
+        return None
+    lines = sorted(result.stdout.splitlines())
+    return "refs:" + hashlib.sha256(b"\n".join(lines)).hexdigest()
+
+
+def fingerprint_repos(
+    repos: List[Dict[str, Any]], token_mgr: "TokenManager", missing_ok: bool = False
+) -> None:
+    """
+    Add a ``ref_fingerprint`` to every repo, from parallel ls-remotes.
+
+    Only ref advertisements are transferred, so this takes seconds
+    even for thousands of repos.  A repo whose ls-remote fails gets
+    None, which makes it count as changed.
+
+    :param repos: Repository dicts; updated in place.
+    :param token_mgr: Source of GitHub installation tokens.
+    :param missing_ok: Don't warn about repos that ls-remote can't
+        find (see :func:`ls_remote_fingerprint`).
+    """
+    start = time.monotonic()
+    env = token_mgr.git_env()
+    with ThreadPoolExecutor(max_workers=BACKUP_PLAN_WORKERS) as pool:
+        fingerprints = pool.map(
+            lambda repo: ls_remote_fingerprint(repo["full_name"], env, missing_ok),
+            repos,
+        )
+        for repo, fingerprint in zip(repos, fingerprints):
+            repo["ref_fingerprint"] = fingerprint
+    LOG.info(
+        "Fingerprinted the refs of %d repositories in %.1f s",
+        len(repos),
+        time.monotonic() - start,
+    )
+
+
+def change_reason(
+    repo: Dict[str, Any], previous: Dict[str, Dict[str, Any]], date_prefix: str
+) -> Optional[str]:
+    """
+    Explain why a repo has to be backed up again.
+
+    :param repo: Repository dict from GitHub API.
+    :param previous: Previous manifest entries keyed by repo full name.
+    :param date_prefix: ``YYYY-MM-DD`` of the run.
+    :return: "new", "failed", "unknown" (no fingerprint), "changed" or
+        "expired" (bundle too old to reuse); None if it is unchanged.
+    """
+    if find_reusable_entry(repo, previous, date_prefix) is not None:
+        return None
+    entry = previous.get(repo["full_name"])
+    if entry is None:
+        return "new"
+    if entry.get("status") == "failed":
+        return "failed"
+    if repo_fingerprint(repo) is None:
+        return "unknown"
+    if entry.get("fingerprint") != repo_fingerprint(repo):
+        return "changed"
+    return "expired"
+
+
+def estimate_plan(
+    changed: List[Dict[str, Any]],
+    previous: Dict[str, Dict[str, Any]],
+    previous_summary: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], int, Optional[float]]:
+    """
+    Estimate the bytes and time of backing up ``changed``.
+
+    A repo's phases are expected to take as long as they did in the
+    previous run; repos without timings are scaled by their GitHub
+    size from the previous run's totals.  The run takes as long as its
+    busiest stage.
+
+    :param changed: Repos to back up.
+    :param previous: Previous manifest entries keyed by repo full name.
+    :param previous_summary: Previous manifest summary (for ``stats``).
+    :return: Per-repo estimates (``repo``, ``bytes``, ``seconds``), the
+        total bytes, and the estimated duration in seconds (None
+        without any previous timings).
+    """
+    stats = previous_summary.get("stats", {})
+    rates = {
+        phase: totals["total_seconds"] / stats["bytes_cloned"]
+        for phase, totals in stats.get("phases", {}).items()
+        if stats.get("bytes_cloned")
+    }
+    workers = {
+        "clone": BACKUP_CLONE_WORKERS,
+        "bundle": BACKUP_BUNDLE_WORKERS,
+        "upload": BACKUP_UPLOAD_WORKERS,
+    }
+    # Stage that runs each phase: large blobs and LFS objects are synced
+    # by the bundle workers
+    stages = {
+        "clone": "clone",
+        "bundle": "bundle",
+        "upload": "upload",
+        "objects": "bundle",
+    }
+    stage_seconds = dict.fromkeys(workers, 0.0)
+    known = False
+    estimates = []
+    for repo in changed:
+        entry = previous.get(repo["full_name"], {})
+        nbytes = entry.get("size_bytes") or repo.get("size", 0) * 1024
+        phases = entry.get("phases", {})
+        seconds = 0.0
+        for phase in _PHASES:
+            if phases:
+                if phase not in phases:
+                    continue
+                phase_seconds = phases[phase]["seconds"]
+            elif phase in rates:
+                phase_seconds = rates[phase] * repo.get("size", 0) * 1024
+            else:
+                continue
+            known = True
+            seconds += phase_seconds
+            stage_seconds[stages[phase]] += phase_seconds
+        estimates.append(
+            {"repo": repo["full_name"], "bytes": nbytes, "seconds": round(seconds, 1)}
+        )
+    duration = None
+    if known:
+        duration = max(stage_seconds[stage] / workers[stage] for stage in workers)
+    return estimates, sum(e["bytes"] for e in estimates), duration
+
+
+def format_bytes(nbytes: float) -> str:
+    """
+    Format a byte count for humans.
+
+    :param nbytes: Number of bytes.
+    :return: E.g. ``"1.5 GiB"``.
+    """
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if nbytes < 1024:
+            return f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} TiB"
+
+
+# ── Metadata export ─────────────────────────────────────────────
+
+# Repository lists that accept a ``since`` cursor: record type, API path
+# under /repos/<org>/<repo>/, and query parameters.  Issues include the
+# conversation of every pull request.
+_METADATA_LISTS = (
+    ("issue", "issues", {"state": "all", "sort": "updated", "direction": "asc"}),
+    ("issue_comment", "issues/comments", {"sort": "updated", "direction": "asc"}),
+    ("review_comment", "pulls/comments", {"sort": "updated", "direction": "asc"}),
+)
+
+# Counters of a metadata export, in the manifest
+_METADATA_COUNTS = (
+    "issue",
+    "issue_comment",
+    "pull",
+    "review",
+    "review_comment",
+    "release",
+    "asset",
+    "asset_bytes",
+)
+
+
+def github_list(
+    full_name: str,
+    path: str,
+    token: str,
+    params: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of a list under a repository, page by page.
+
+    Pages are fetched one at a time: repos are exported in parallel
+    instead (see :func:`export_metadata`).  The list of a feature the
+    repo has turned off (404 or 410, e.g. issues) is empty.
+
+    :param full_name: ``org/repo``.
+    :param path: API path under ``/repos/<org>/<repo>/``.
+    :param token: GitHub installation access token.
+    :param params: Query parameters of the list.
+    :return: Iterator of items.
+    """
+    try:
+        yield from paginate(
+            f"{GITHUB_API_BASE}/repos/{full_name}/{path}",
+            token,
+            params,
+            concurrency=1,
+        )
+    except requests.HTTPError as err:
+        if err.response is None or err.response.status_code not in (404, 410):
+            raise
+
+
+def metadata_records(
+    full_name: str,
+    token_mgr: "TokenManager",
+    since: Optional[str],
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield the issues and pull requests of a repo updated since a time.
+
+    Issues and comments are listed with ``since``.  Pull requests have
+    no such filter, so they are listed most recently updated first
+    until one predates ``since``; each of them comes with its reviews.
+
+    :param full_name: ``org/repo``.
+    :param token_mgr: Token manager for API calls.
+    :param since: ISO 8601 cursor of the previous export, or None for
+        everything.
+    :return: Iterator of ``(record type, API object)``.
+    """
+    cursor = {"since": since} if since else {}
+    for record_type, path, params in _METADATA_LISTS:
+        for item in github_list(full_name, path, token_mgr.token, {**params, **cursor}):
+            yield record_type, item
+    pulls = github_list(
+        full_name,
+        "pulls",
+        token_mgr.token,
+        {"state": "all", "sort": "updated", "direction": "desc"},
+    )
+    for pull in pulls:
+        if since and pull["updated_at"] < since:
+            break
+        yield "pull", pull
+        reviews = f"pulls/{pull['number']}/reviews"
+        for review in github_list(full_name, reviews, token_mgr.token):
+            yield "review", review
+
+
+def asset_key(full_name: str, asset: Dict[str, Any]) -> str:
+    """
+    Return the S3 key of a release asset.
+
+    Assets are immutable (replacing one gives it a new ID), so each is
+    stored once, outside the dated prefixes.
+
+    :param full_name: ``org/repo``.
+    :param asset: Asset object of a release.
+    :return: Key under ``github-backup/assets/``.
+    """
+    return f"github-backup/assets/{full_name}/{asset['id']}/{asset['name']}"
+
+
+def backup_release_assets(
+    full_name: str,
+    releases: List[Dict[str, Any]],
+    token_mgr: "TokenManager",
+    bucket: str,
+    date_prefix: str,
+) -> Tuple[int, int]:
+    """
+    Stream the release assets that are not stored yet into S3.
+
+    An asset already stored is skipped unless it is too old to rely on
+    (see :func:`find_stored_object`); then it is written again so the
+    lifecycle rule does not expire it.
+
+    :param full_name: ``org/repo``.
+    :param releases: Release objects of the repo.
+    :param token_mgr: Token manager for API calls.
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: Number and total size of the assets uploaded.
+    """
+    session = get_github_session()
+    count = nbytes = 0
+    for release in releases:
+        for asset in release.get("assets", []):
+            key = asset_key(full_name, asset)
+            if find_stored_object(bucket, key, date_prefix) is not None:
+                continue
+            session.wait_for_budget()
+            response = session.get(
+                asset["url"],
+                headers={
+                    "Authorization": f"Bearer {token_mgr.token}",
+                    "Accept": "application/octet-stream",
+                },
+                stream=True,
+            )
+            with response:
+                response.raw.decode_content = True
+                get_s3_client().upload_fileobj(
+                    response.raw,
+                    bucket,
+                    key,
+                    ExtraArgs=_UPLOAD_ARGS,
+                    Config=transfer_config(asset["size"]),
+                )
+            count += 1
+            nbytes += asset["size"]
+    return count, nbytes
+
+
+def export_repo_metadata(
+    repo: Dict[str, Any],
+    token_mgr: "TokenManager",
+    bucket: str,
+    date_prefix: str,
+    previous_entry: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Export a repo's metadata to a gzip-compressed JSON Lines file.
+
+    Each line is ``{"type": ..., "data": <API object>}``.  The export
+    continues the previous entry's chain with the records updated since
+    its cursor.  Without a usable previous entry, or once the chain's
+    first file is ``BACKUP_REUSE_MAX_AGE_DAYS`` old, it starts a new
+    chain with a full export.  Releases cannot be filtered by time, so
+    they are listed every run but only written when they differ from
+    the previous export.  A delta without records uploads nothing.
+
+    :param repo: Repository dict from GitHub API.
+    :param token_mgr: Token manager for API calls.
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param previous_entry: The repo's entry in the previous run's
+        metadata manifest, if any.
+    :return: Metadata manifest entry.  ``chain`` lists the files a
+        restore reads in order; ``cursor`` is when this export started.
+    """
+    full_name = repo["full_name"]
+    cursor = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    since = None
+    chain: List[Dict[str, str]] = []
+    releases_digest = None
+    if previous_entry is not None and previous_entry.get("status") == "ok":
+        try:
+            first_date = previous_entry["chain"][0]["date"]
+            if days_between(first_date, date_prefix) < BACKUP_REUSE_MAX_AGE_DAYS:
+                since = previous_entry["cursor"]
+                chain = list(previous_entry["chain"])
+                releases_digest = previous_entry.get("releases_digest")
+        except (KeyError, IndexError, TypeError, ValueError) as err:
+            LOG.warning(
+                "Previous metadata entry of %s is unusable (%s); exporting in full",
+                full_name,
+                describe_error(err),
+            )
+            since, chain, releases_digest = None, [], None
+
+    counts = dict.fromkeys(_METADATA_COUNTS, 0)
+    with tempfile.TemporaryDirectory(prefix="ghbackup-") as tmp_dir:
+        path = os.path.join(tmp_dir, "metadata.jsonl.gz")
+        with gzip.open(path, "wt") as out:
+
+            def write(record_type: str, item: Dict[str, Any]) -> None:
+                out.write(json.dumps({"type": record_type, "data": item}) + "\n")
+                counts[record_type] += 1
+
+            for record_type, item in metadata_records(full_name, token_mgr, since):
+                write(record_type, item)
+
+            releases = list(github_list(full_name, "releases", token_mgr.token))
+            digest = hashlib.sha256(
+                json.dumps(releases, sort_keys=True).encode()
+            ).hexdigest()
+            if digest != releases_digest:
+                for release in releases:
+                    write("release", release)
+                counts["asset"], counts["asset_bytes"] = backup_release_assets(
+                    full_name, releases, token_mgr, bucket, date_prefix
+                )
+
+        if since is None or any(counts.values()):
+            key = f"github-backup/{date_prefix}/{full_name}.metadata.jsonl.gz"
+            upload_to_s3(path, bucket, key)
+            chain = [*chain, {"s3_key": key, "date": date_prefix}]
+
+    return {
+        "repo": full_name,
+        "status": "ok",
+        "cursor": cursor,
+        "since": since,
+        "chain": chain,
+        "releases_digest": digest,
+        "counts": counts,
+    }
+
+
+def export_metadata(
+    repos: List[Dict[str, Any]],
+    token_mgr: "TokenManager",
+    bucket: str,
+    date_prefix: str,
+    previous: Dict[str, Dict[str, Any]],
+    writer: "ManifestWriter",
+) -> Dict[str, int]:
+    """
+    Export the metadata of every repo, several repos at a time.
+
+    Runs ``GITHUB_API_CONCURRENCY`` repos at once (see
+    :func:`github_map`) and adds each entry to ``writer`` as it is
+    ready.  A repo whose export fails is recorded as failed, and the
+    next run exports it in full.
+
+    :param repos: Repository dicts from GitHub API.
+    :param token_mgr: Token manager for API calls.
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param previous: Previous metadata entries keyed by repo full name.
+    :param writer: Spool of the metadata manifest.
+    :return: Counters summed over all repos.
+    """
+
+    def export(repo: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return export_repo_metadata(
+                repo, token_mgr, bucket, date_prefix, previous.get(repo["full_name"])
+            )
+        except (requests.RequestException, ClientError, OSError) as err:
+            LOG.error(
+                "Metadata export of %s failed: %s",
+                repo["full_name"],
+                describe_error(err),
+            )
+            return {
+                "repo": repo["full_name"],
+                "status": "failed",
+                "error": describe_error(err),
+            }
+
+    start = time.monotonic()
+    totals = dict.fromkeys(_METADATA_COUNTS, 0)
+    for entry in github_map(export, repos):
+        writer.add(entry)
+        for name, count in entry.get("counts", {}).items():
+            totals[name] += count
+    LOG.info(
+        "Exported the metadata of %d repositories in %.1f s (%d failed): %s",
+        writer.total,
+        time.monotonic() - start,
+        len(writer.failed),
+        ", ".join(f"{count} {name}" for name, count in totals.items()),
+    )
+    return totals
+
+
+def load_previous_metadata(
+    bucket: str, summary: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the metadata entries of the previous run.
+
+    :param bucket: S3 bucket name.
+    :param summary: Previous manifest summary.
+    :return: Metadata entries keyed by repo full name; empty if that
+        run exported no metadata.
+    """
+    if "metadata" not in summary:
+        return {}
+    return {e["repo"]: e for e in iter_manifest_entries(bucket, summary["metadata"])}
+
+
+def wiki_repos(
+    repos: List[Dict[str, Any]], token_mgr: "TokenManager"
+) -> List[Dict[str, Any]]:
+    """
+    Return the wikis of repositories as repositories of their own.
+
+    A wiki is the git repo ``<repo>.wiki``, so it goes through the same
+    clone and bundle path as any other.  GitHub reports ``has_wiki`` for
+    every repo with wikis turned on, including those without a single
+    page, whose wiki repo does not exist; only wikis that ``git
+    ls-remote`` finds are returned, with their ref fingerprint.
+
+    :param repos: Repository dicts from GitHub API.
+    :param token_mgr: Source of GitHub installation tokens, whose
+        ``git_env`` the ls-remotes authenticate with.
+    :return: Repository dicts of the wikis.
+    """
+    wikis = [
+        {"full_name": f"{r['full_name']}.wiki", "size": 0}
+        for r in repos
+        if r.get("has_wiki")
+    ]
+    fingerprint_repos(wikis, token_mgr, missing_ok=True)
+    found = [w for w in wikis if w["ref_fingerprint"] is not None]
+    LOG.info("Found %d wikis (%d repos have wikis turned on)", len(found), len(wikis))
+    return found
+
+
+# ── Verification ────────────────────────────────────────────────
+
+# HEAD requests in flight at once when checking stored bundles
+_VERIFY_HEAD_WORKERS = 32
+
+
+def check_object(bucket: str, obj: Dict[str, Any]) -> Optional[str]:
+    """
+    Compare a stored bundle with its manifest record, without
+    downloading it.
+
+    :param bucket: S3 bucket name.
+    :param obj: Bundle from :func:`bundle_objects`.
+    :return: What is wrong with it, or None if its size and S3 checksum
+        (when one was recorded) match.
+    """
+    head = head_object(bucket, obj["s3_key"])
+    if head is None:
+        return "missing"
+    if head["ContentLength"] != obj["size_bytes"]:
+        return f"size is {head['ContentLength']}, expected {obj['size_bytes']}"
+    expected = obj.get("checksum_sha256")
+    if expected and head.get("ChecksumSHA256") != expected:
+        return f"checksum is {head.get('ChecksumSHA256')}, expected {expected}"
+    return None
+
+
+def verify_repo(bucket: str, entry: Dict[str, Any]) -> None:
+    """
+    Download a repo's bundles and check that git can restore them.
+
+    The repo is rebuilt in a scratch directory the way ``restore.py``
+    does it (see :func:`backup_common.materialize_repo`), except that
+    each bundle must also pass ``git bundle verify``.  The repository
+    must then have the objects of every ref the manifest recorded.
+    LFS objects must be stored at their recorded size.
+
+    :param bucket: S3 bucket name.
+    :param entry: Manifest entry of a backed-up repo.
+    :raises RuntimeError: If a bundle or stored object does not match
+        the manifest.
+    :raises subprocess.CalledProcessError: If git rejects a bundle.
+    """
+    chain = bundle_objects(entry)
+    lfs_objects = chain_objects(bucket, entry, "lfs_key")
+    with ThreadPoolExecutor(max_workers=_VERIFY_HEAD_WORKERS) as pool:
+        problems = pool.map(
+            lambda obj: check_object(
+                bucket,
+                {"s3_key": lfs_object_key(obj["oid"]), "size_bytes": obj["size"]},
+            ),
+            lfs_objects,
+        )
+        bad = [obj["oid"] for obj, problem in zip(lfs_objects, problems) if problem]
+    if bad:
+        raise RuntimeError(f"{len(bad)} LFS objects are missing or changed")
+
+    tmp_dir = tempfile.mkdtemp(prefix="verify-")
+    try:
+        repo_dir = os.path.join(tmp_dir, "repo.git")
+        config = transfer_config(max(obj["size_bytes"] for obj in chain))
+        materialize_repo(bucket, entry, repo_dir, tmp_dir, config, verify_bundles=True)
+        oids = sorted(set((entry.get("refs") or {}).values()))
+        missing = set(oids) - set(existing_objects(repo_dir, oids))
+        if missing:
+            raise RuntimeError(f"{len(missing)} recorded refs point at missing objects")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# ── Checkpointing ───────────────────────────────────────────────
+
+# A running task rewrites its checkpoint at least this often, even with
+# no repo finished since, so the object's age tells whether it is alive
+_CHECKPOINT_HEARTBEAT_SECONDS = 300
+
+
+class Checkpoint:
+    """
+    Manifest entries of the repos finished so far today, kept in S3.
+
+    Entries are added as repos finish and written to
+    ``github-backup/<date>/checkpoint.json`` by a background thread, at
+    most every ``BACKUP_CHECKPOINT_INTERVAL_SECONDS``.  If the task is
+    killed, a rerun on the same day loads the checkpoint and skips the
+    repos in it.  A repo finished after the last write is simply backed
+    up again.  Unchanged, the checkpoint is still rewritten every
+    ``_CHECKPOINT_HEARTBEAT_SECONDS`` while the task runs, which is how
+    a stalled shard is told apart from a slow one (see
+    :func:`shard_stalled`).
+    """
+
+    def __init__(self, bucket: str, date_prefix: str, name: str = "checkpoint.json"):
+        """
+        Initialize the checkpoint.
+
+        :param bucket: S3 bucket name.
+        :param date_prefix: ``YYYY-MM-DD`` prefix of this run's S3 keys.
+        :param name: Object name under the dated prefix (each shard
+            keeps its own checkpoint).
+        """
+        self._bucket = bucket
+        self._date_prefix = date_prefix
+        self._key = f"github-backup/{date_prefix}/{name}"
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._written = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="checkpoint")
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the entries an earlier run of the same day checkpointed.
+
+        An entry whose bundle was written today only counts if that
+        object exists in S3 with the recorded size; the others are
+        dropped and their repos backed up again.
+
+        :return: Verified manifest entries keyed by repo full name.
+        """
+        client = get_s3_client()
+        try:
+            response = client.get_object(Bucket=self._bucket, Key=self._key)
+        except client.exceptions.NoSuchKey:
+            return {}
+        entries = json.loads(response["Body"].read())
+
+        sizes: Dict[str, int] = {}
+        paginator = client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self._bucket, Prefix=f"github-backup/{self._date_prefix}/"
+        ):
+            for obj in page.get("Contents", []):
+                sizes[obj["Key"]] = obj["Size"]
+
+        verified = {}
+        for entry in entries:
+            written_today = entry.get("bundle_date") == self._date_prefix
+            key = entry.get("s3_key")
+            if written_today and key not in sizes:
+                # Content-addressed bundles live outside the day's prefix
+                response = head_object(self._bucket, key)
+                if response is not None:
+                    sizes[key] = response["ContentLength"]
+            if written_today and sizes.get(key) != entry["size_bytes"]:
+                LOG.warning(
+                    "Checkpointed bundle of %s is missing or incomplete; "
+                    "backing it up again",
+                    entry["repo"],
+                )
+                continue
+            verified[entry["repo"]] = entry
+
+        LOG.info(
+            "Loaded checkpoint s3://%s/%s: %d repositories already backed up",
+            self._bucket,
+            self._key,
+            len(verified),
+        )
+        with self._lock:
+            self._entries.update(verified)
+        return verified
+
+    def start(self) -> None:
+        """Start writing the checkpoint in the background."""
+        self._thread.start()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Record a finished repo.
+
+        :param entry: Its manifest entry.
+        """
+        with self._lock:
+            self._entries[entry["repo"]] = entry
+            self._dirty = True
+
+    def close(self) -> None:
+        """Stop the background thread after a final write."""
+        self._stop.set()
+        self._thread.join()
+
+    def _flush_loop(self) -> None:
+        """Write the checkpoint whenever it changed, until closed."""
+        while not self._stop.wait(BACKUP_CHECKPOINT_INTERVAL_SECONDS):
+            self._flush()
+        self._flush()
+
+    def _flush(self) -> None:
+        """Write the checkpoint to S3 if it changed or a heartbeat is due."""
+        with self._lock:
+            heartbeat_due = (
+                time.monotonic() - self._written >= _CHECKPOINT_HEARTBEAT_SECONDS
+            )
+            if not self._dirty and not heartbeat_due:
+                return
+            body = json.dumps(list(self._entries.values()))
+            self._dirty = False
+        try:
+            get_s3_client().put_object(
+                Bucket=self._bucket, Key=self._key, Body=body.encode()
+            )
+        except Exception as err:
+            # Best effort: a lost write only means redoing some repos.
+            LOG.warning("Failed to write checkpoint: %s", err)
+            with self._lock:
+                self._dirty = True
+        else:
+            with self._lock:
+                self._written = time.monotonic()
+
+
+# ── Sharding ────────────────────────────────────────────────────
+
+# Fixed cost of a repo in the size-balanced plan, in KiB: API calls,
+# clone setup and upload latency don't shrink with the repo.
+_SHARD_REPO_OVERHEAD_KB = 1024
+
+# A shard without a manifest whose claim and checkpoint are both older
+# than this has stopped: its task died or was killed
+_SHARD_STALE_SECONDS = 6 * _CHECKPOINT_HEARTBEAT_SECONDS
+
+
+def shard_key(shard: int, shard_count: int, suffix: str) -> str:
+    """
+    Return the name of a per-shard object under the dated prefix.
+
+    :param shard: Shard index.
+    :param shard_count: Number of shards.
+    :param suffix: Object type, e.g. ``"manifest.json"``.
+    :return: Name such as ``shards/2-of-4.manifest.json``.
+    """
+    return f"shards/{shard}-of-{shard_count}.{suffix}"
+
+
+def hash_shard(full_name: str, shard_count: int) -> int:
+    """
+    Return the shard a repository hashes to.
+
+    :param full_name: Repository ``owner/name``.
+    :param shard_count: Number of shards.
+    :return: Shard index.
+    """
+    digest = hashlib.sha256(full_name.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def plan_shards(
+    repos: List[Dict[str, Any]],
+    shard_count: int,
+    strategy: str,
+) -> Dict[str, int]:
+    """
+    Assign every repository to a shard.
+
+    ``"hash"`` assigns by :func:`hash_shard`, so a repo stays on the
+    same shard from day to day.  ``"size"`` balances the shards'
+    total size: largest repos first, each to the lightest shard.
+
+    :param repos: Repository dicts from GitHub API.
+    :param shard_count: Number of shards.
+    :param strategy: ``"size"`` or ``"hash"``.
+    :return: Shard index keyed by repo full name.
+    """
+    if strategy == "hash":
+        return {r["full_name"]: hash_shard(r["full_name"], shard_count) for r in repos}
+
+    plan = {}
+    loads = [(0, shard) for shard in range(shard_count)]
+    for repo in sorted(repos, key=lambda r: (-r.get("size", 0), r["full_name"])):
+        load, shard = heapq.heappop(loads)
+        plan[repo["full_name"]] = shard
+        load += repo.get("size", 0) + _SHARD_REPO_OVERHEAD_KB
+        heapq.heappush(loads, (load, shard))
+    return plan
+
+
+def load_shard_plan(
+    bucket: str,
+    date_prefix: str,
+    repos: List[Dict[str, Any]],
+) -> Dict[str, int]:
+    """
+    Return the shard plan all of today's tasks agree on.
+
+    Each task lists the repositories itself, and sizes can change
+    between two listings, so the tasks could compute different
+    size-balanced plans.  Instead the first task stores its plan in S3
+    and the others use that one.  Repos it doesn't know (created in
+    between) are placed by :func:`hash_shard`.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param repos: Repository dicts from GitHub API.
+    :return: Shard index keyed by repo full name.
+    """
+    key = f"github-backup/{date_prefix}/shards/plan-of-{BACKUP_SHARD_COUNT}.json"
+    plan = plan_shards(repos, BACKUP_SHARD_COUNT, BACKUP_SHARD_STRATEGY)
+    if not put_if_absent(bucket, key, json.dumps(plan).encode()):
+        response = get_s3_client().get_object(Bucket=bucket, Key=key)
+        plan = json.loads(response["Body"].read())
+        LOG.info("Using shard plan s3://%s/%s", bucket, key)
+    return {
+        r["full_name"]: plan.get(
+            r["full_name"], hash_shard(r["full_name"], BACKUP_SHARD_COUNT)
+        )
+        for r in repos
+    }
+
+
+def shard_stalled(
+    bucket: str,
+    date_prefix: str,
+    shard: int,
+    claim: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """
+    Tell whether a shard's task has stopped before finishing.
+
+    A running task keeps rewriting its checkpoint (see
+    :class:`Checkpoint`), so a shard whose claim and checkpoint have
+    both gone unwritten for ``_SHARD_STALE_SECONDS`` is not coming
+    back.  A shard nobody claimed or checkpointed counts as stalled
+    too.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param shard: Shard index.
+    :param claim: ``HeadObject`` response of the shard's claim, if the
+        caller already has it.
+    :return: True if the shard is stalled.
+    """
+    prefix = f"github-backup/{date_prefix}/"
+    if claim is None:
+        claim = head_object(
+            bucket, prefix + shard_key(shard, BACKUP_SHARD_COUNT, "claim")
+        )
+    checkpoint = head_object(
+        bucket, prefix + shard_key(shard, BACKUP_SHARD_COUNT, "checkpoint.json")
+    )
+    seen = [r["LastModified"] for r in (claim, checkpoint) if r is not None]
+    if not seen:
+        return True
+    age = datetime.now(timezone.utc) - max(seen)
+    return age.total_seconds() >= _SHARD_STALE_SECONDS
+
+
+def shard_manifest(
+    bucket: str, date_prefix: str, shard: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Load the partial manifest summary a shard wrote when it finished.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param shard: Shard index.
+    :return: The summary, or None if the shard has not finished.
+    """
+    client = get_s3_client()
+    key = shard_key(shard, BACKUP_SHARD_COUNT, "manifest") + ".json"
+    try:
+        response = client.get_object(
+            Bucket=bucket, Key=f"github-backup/{date_prefix}/{key}"
+        )
+    except client.exceptions.NoSuchKey:
+        return None
+    return json.loads(response["Body"].read())
+
+
+def claim_shard(bucket: str, date_prefix: str) -> Optional[int]:
+    """
+    Claim the first shard no other task has claimed today.
+
+    If every shard is claimed, take over the first one that stalled
+    before finishing (see :func:`shard_stalled`).  The claim is then
+    replaced by a conditional write on its ETag, so of several reruns
+    only one takes the shard over.  It resumes from the shard's
+    checkpoint.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: Shard index, or None if every shard is finished or still
+        running.
+    """
+    body = json.dumps({"claimed_at": datetime.now(timezone.utc).isoformat()}).encode()
+    for shard in range(BACKUP_SHARD_COUNT):
+        key = shard_key(shard, BACKUP_SHARD_COUNT, "claim")
+        if put_if_absent(bucket, f"github-backup/{date_prefix}/{key}", body):
+            return shard
+
+    for shard in range(BACKUP_SHARD_COUNT):
+        key = f"github-backup/{date_prefix}/" + shard_key(
+            shard, BACKUP_SHARD_COUNT, "claim"
+        )
+        claim = head_object(bucket, key)
+        if claim is None or shard_manifest(bucket, date_prefix, shard) is not None:
+            continue
+        if not shard_stalled(bucket, date_prefix, shard, claim):
+            continue
+        try:
+            get_s3_client().put_object(
+                Bucket=bucket, Key=key, Body=body, IfMatch=claim["ETag"]
+            )
+        except ClientError as err:
+            code = err.response["Error"]["Code"]
+            if code in ("PreconditionFailed", "ConditionalRequestConflict"):
+                continue
+            raise
+        LOG.warning("Shard %d stalled before finishing; taking it over", shard)
+        return shard
+    return None
+
+
+def stalled_shard_entries(
+    bucket: str, date_prefix: str, shard: int
+) -> List[Dict[str, Any]]:
+    """
+    Return manifest entries for the repos of a stalled shard.
+
+    Repos in the shard's checkpoint were backed up before it stalled
+    and keep their entries.  The rest of the shard's repos, by the
+    stored plan, are recorded as failed.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param shard: Shard index.
+    :return: Manifest entries.
+    """
+    client = get_s3_client()
+    key = f"github-backup/{date_prefix}/shards/plan-of-{BACKUP_SHARD_COUNT}.json"
+    try:
+        response = client.get_object(Bucket=bucket, Key=key)
+        shard_plan = json.loads(response["Body"].read())
+    except client.exceptions.NoSuchKey:
+        shard_plan = {}
+    done = Checkpoint(
+        bucket,
+        date_prefix,
+        shard_key(shard, BACKUP_SHARD_COUNT, "checkpoint.json"),
+    ).load()
+    entries = list(done.values())
+    for repo in sorted(r for r, s in shard_plan.items() if s == shard):
+        if repo not in done:
+            entries.append(
+                {
+                    "repo": repo,
+                    "status": "failed",
+                    "error": f"shard {shard} stalled before backing it up",
+                    "attempts": 0,
+                }
+            )
+    return entries
+
+
+def merge_shard_manifests(bucket: str, date_prefix: str) -> Optional[Dict[str, Any]]:
+    """
+    Write ``manifest.json`` once every shard has finished or stalled.
+
+    Every task calls this after writing its partial manifest, and a
+    rerun that finds no shard left to claim calls it too; whichever
+    finds no shard still running merges the partial manifests.  A
+    stalled shard (see :func:`shard_stalled`) doesn't hold the day's
+    manifest back: its checkpointed repos are merged, its other repos
+    recorded as failed, and the shard listed in ``missing_shards``.
+    Taking the shard over later (see :func:`claim_shard`) merges again
+    and replaces that manifest.  If two tasks finish at once both
+    write the same merged manifest.  Entries are streamed shard by
+    shard into the merged JSON Lines file, not sorted.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :return: Summary of the merged manifest, or None if a shard is
+        still running.
+    """
+    partials = []
+    missing = []
+    for shard in range(BACKUP_SHARD_COUNT):
+        partial = shard_manifest(bucket, date_prefix, shard)
+        if partial is not None:
+            partials.append(partial)
+        elif shard_stalled(bucket, date_prefix, shard):
+            missing.append(shard)
+        else:
+            LOG.info("Shard %d has not finished yet; not merging manifests", shard)
+            return None
+
+    counts = [
+        "total_repos",
+        "success_count",
+        "failure_count",
+        "reused_count",
+        "resumed_count",
+    ]
+    summary: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "date": date_prefix,
+        **{name: sum(p[name] for p in partials) for name in counts},
+        "shard_count": BACKUP_SHARD_COUNT,
+    }
+    metadata = [p["metadata"] for p in partials if "metadata" in p]
+    if metadata:
+        summary["metadata"] = merge_metadata_manifests(bucket, date_prefix, metadata)
+    writer = ManifestWriter()
+    try:
+        for partial in partials:
+            for entry in iter_manifest_entries(bucket, partial):
+                writer.add(entry)
+        if missing:
+            before = len(writer.failed)
+            for shard in missing:
+                for entry in stalled_shard_entries(bucket, date_prefix, shard):
+                    writer.add(entry)
+                    summary["total_repos"] += 1
+            unfinished = len(writer.failed) - before
+            summary["success_count"] = writer.success_count
+            summary["failure_count"] += unfinished
+            summary["missing_shards"] = missing
+            summary["unfinished_count"] = unfinished
+            LOG.error(
+                "Stalled shards %s left %d repositories not backed up; rerun "
+                "them with BACKUP_SHARD_INDEX",
+                ", ".join(str(s) for s in missing),
+                unfinished,
+            )
+        writer.upload(bucket, f"github-backup/{date_prefix}/manifest", summary)
+    finally:
+        writer.close()
+    LOG.info("Merged %d of %d shard manifests", len(partials), BACKUP_SHARD_COUNT)
+    return summary
+
+
+def merge_metadata_manifests(
+    bucket: str, date_prefix: str, partials: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Merge the shards' metadata manifests into ``metadata.jsonl``.
+
+    :param bucket: S3 bucket name.
+    :param date_prefix: ``YYYY-MM-DD`` of the current run.
+    :param partials: ``metadata`` blocks of the shard manifests.
+    :return: ``metadata`` block of the merged manifest.
+    """
+    repos_key = f"github-backup/{date_prefix}/metadata.jsonl"
+    writer = ManifestWriter()
+    try:
+        for partial in partials:
+            for entry in iter_manifest_entries(bucket, partial):
+                writer.add(entry)
+        writer.upload_entries(bucket, repos_key)
+    finally:
+        writer.close()
+    return {
+        "repos_key": repos_key,
+        "success_count": sum(p["success_count"] for p in partials),
+        "failure_count": sum(p["failure_count"] for p in partials),
+        "counts": {
+            name: sum(p["counts"].get(name, 0) for p in partials)
+            for name in _METADATA_COUNTS
+        },
+    }
+
+
+# ── Adaptive concurrency ────────────────────────────────────────
+
+_CGROUP_ROOT = "/sys/fs/cgroup"
+
+# How often the controller samples resource usage, and how long it
+# watches throughput before it changes the limit by one
+_ADAPTIVE_SAMPLE_SECONDS = 5
+_ADAPTIVE_WINDOW_SECONDS = 60
+
+# Pressure thresholds: back off above this share of the memory limit in
+# use or below this share of ephemeral storage free, and stop adding
+# repos above this CPU utilization
+_MEMORY_HIGH = 0.85
+_DISK_FREE_LOW = 0.10
+_CPU_HIGH = 0.90
+
+# An extra repo in flight must raise throughput by this much to stay;
+# otherwise the limit goes back down and holds for a while.
+_THROUGHPUT_GAIN = 0.05
+_PLATEAU_HOLD_SECONDS = 600
+
+
+def _read_file(*paths: str) -> Optional[str]:
+    """
+    Read the first of ``paths`` that exists.
+
+    :param paths: Candidate file paths, e.g. for cgroup v2 and v1.
+    :return: Its contents, stripped, or None if none can be read.
+    """
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def _read_stat(text: Optional[str]) -> Dict[str, int]:
+    """
+    Parse ``key value`` lines, as in cgroup ``*.stat`` files.
+
+    :param text: File contents, or None.
+    :return: Mapping of key to integer value.
+    """
+    stats = {}
+    for line in (text or "").splitlines():
+        fields = line.split()
+        if len(fields) == 2 and fields[1].isdigit():
+            stats[fields[0]] = int(fields[1])
+    return stats
+
+
+def cpu_limit() -> float:
+    """
+    Return the number of CPUs the container may use.
+
+    :return: The cgroup CPU quota (v2 or v1) in CPUs, or the number of
+        CPUs the process may run on if there is no quota.
+    """
+    text = _read_file(f"{_CGROUP_ROOT}/cpu.max")
+    if text and not text.startswith("max"):
+        quota, period = text.split()
+        return int(quota) / int(period)
+    quota = _read_file(f"{_CGROUP_ROOT}/cpu/cpu.cfs_quota_us")
+    period = _read_file(f"{_CGROUP_ROOT}/cpu/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return float(len(os.sched_getaffinity(0)))
+
+
+def cpu_seconds() -> Optional[float]:
+    """
+    Return the CPU time the container has used.
+
+    :return: Seconds of CPU time from the cgroup (v2 or v1), or None if
+        it cannot be read.
+    """
+    usage = _read_stat(_read_file(f"{_CGROUP_ROOT}/cpu.stat")).get("usage_usec")
+    if usage is not None:
+        return usage / 1e6
+    text = _read_file(
+        f"{_CGROUP_ROOT}/cpuacct/cpuacct.usage",
+        f"{_CGROUP_ROOT}/cpu,cpuacct/cpuacct.usage",
+    )
+    return int(text) / 1e9 if text else None
+
+
+def memory_in_use() -> Optional[float]:
+    """
+    Return the share of the container's memory limit in use.
+
+    Inactive page cache is left out: git fills the cache with pack
+    files, but the kernel drops it before it runs out of memory.
+    Without a cgroup limit, the machine's memory is the limit.
+
+    :return: Fraction between 0 and 1, or None if it cannot be read.
+    """
+    meminfo = {}
+    for line in (_read_file("/proc/meminfo") or "").splitlines():
+        name, _, value = line.partition(":")
+        meminfo[name] = int(value.split()[0]) * 1024
+    total = meminfo.get("MemTotal")
+
+    for current, limit, stat, inactive in (
+        ("memory.current", "memory.max", "memory.stat", "inactive_file"),
+        (
+            "memory/memory.usage_in_bytes",
+            "memory/memory.limit_in_bytes",
+            "memory/memory.stat",
+            "total_inactive_file",
+        ),
+    ):
+        used = _read_file(f"{_CGROUP_ROOT}/{current}")
+        cap = _read_file(f"{_CGROUP_ROOT}/{limit}")
+        if not used or not cap or not cap.isdigit():
+            continue
+        # An unlimited v1 cgroup reports a huge number as its limit
+        if total and int(cap) >= total:
+            break
+        cache = _read_stat(_read_file(f"{_CGROUP_ROOT}/{stat}")).get(inactive, 0)
+        return max(0, int(used) - cache) / int(cap)
+
+    if total and "MemAvailable" in meminfo:
+        return 1 - meminfo["MemAvailable"] / total
+    return None
+
+
+def network_bytes() -> Optional[int]:
+    """
+    Return the bytes received and sent over the network so far.
+
+    On Fargate the network namespace is the task's, so this counts
+    every clone and upload.
+
+    :return: Total bytes of all interfaces but loopback, or None if it
+        cannot be read.
+    """
+    text = _read_file("/proc/net/dev")
+    if text is None:
+        return None
+    total = 0
+    for line in text.splitlines()[2:]:
+        name, _, counters = line.partition(":")
+        if name.strip() != "lo":
+            fields = counters.split()
+            total += int(fields[0]) + int(fields[8])
+    return total
+
+
+def sample_resources(path: str) -> Dict[str, Any]:
+    """
+    Take a snapshot of the container's resource usage.
+
+    :param path: Directory on the storage that bundles are written to.
+    :return: ``time`` (monotonic), ``cpu_seconds``, ``memory`` (share in
+        use), ``disk_free`` (share free) and ``network_bytes``; values
+        that cannot be read are None.
+    """
+    disk = shutil.disk_usage(path)
+    return {
+        "time": time.monotonic(),
+        "cpu_seconds": cpu_seconds(),
+        "memory": memory_in_use(),
+        "disk_free": disk.free / disk.total,
+        "network_bytes": network_bytes(),
+    }
+
+
+class ConcurrencyController:
+    """
+    Limit on the repos in flight that follows the task's resource usage.
+
+    Every repo takes a slot before it is cloned and gives it back once
+    its files are deleted, like :class:`StorageBudget`.  A background
+    thread samples CPU and memory (from the container's cgroup), free
+    ephemeral storage and network throughput, and moves the limit:
+
+    - Memory or disk short: no new repos start until fewer than the
+      limit are in flight, and the limit drops to one below the repos
+      in flight, down to ``minimum``.
+    - Otherwise, after each window in which every slot was busy and the
+      CPUs were not saturated, the limit goes up by one, as long as the
+      previous step raised throughput.  Once a step does not, it is
+      taken back and the limit holds for a while before probing again.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        """
+        Initialize the controller.
+
+        :param initial: Repos in flight to start with.
+        :param maximum: Upper bound of the limit.
+        :param minimum: Lower bound of the limit.
+        """
+        self._minimum = minimum
+        self._maximum = maximum
+        self._limit = max(minimum, min(initial, maximum))
+        self._initial = self._limit
+        self._peak = self._limit
+        self._backoffs = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._cpus = cpu_limit()
+        self._path = tempfile.gettempdir()
+        # Throughput window: the sample it started with, whether every
+        # slot stayed busy, the rate of the previous window, and
+        # whether the limit was raised after it
+        self._window: Optional[Dict[str, Any]] = None
+        self._busy = True
+        self._rate: Optional[float] = None
+        self._raised = False
+        self._hold_until = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name="concurrency")
+
+    @property
+    def limit(self) -> int:
+        """Current number of repos allowed in flight."""
+        return self._limit
+
+    def acquire(self) -> None:
+        """Block until fewer repos than the limit are in flight, then take a slot."""
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        """Give back a slot."""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def start(self) -> None:
+        """Start sampling resource usage in the background."""
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Describe how the limit moved during the run.
+
+        :return: ``initial``, ``final`` and ``peak`` limit, and the
+            number of ``backoffs`` under memory or disk pressure.
+        """
+        with self._cond:
+            return {
+                "initial": self._initial,
+                "final": self._limit,
+                "peak": self._peak,
+                "backoffs": self._backoffs,
+            }
 
-    for repo in repos:
-        full_name = repo["full_name"]
-        org_name, repo_name = full_name.split("/", 1)
-        tmp_dir = tempfile.mkdtemp(prefix="ghbackup-")
+    def _sample_loop(self) -> None:
+        """Sample resource usage and adjust the limit, until closed."""
+        previous = sample_resources(self._path)
+        while not self._stop.wait(_ADAPTIVE_SAMPLE_SECONDS):
+            try:
+                current = sample_resources(self._path)
+                self._adjust(previous, current)
+            except Exception as err:
+                # Best effort: the limit just stays where it is.
+                LOG.warning("Failed to sample resource usage: %s", err)
+                continue
+            previous = current
 
-        try:
-            # Use fresh token (auto-refreshes if near expiry)
-            current_token = token_mgr.token
+    def _adjust(self, previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+        """
+        Move the limit according to the latest sample.
+
+        :param previous: Sample from :func:`sample_resources`.
+        :param current: Next sample.
+        """
+        pressure = None
+        if current["memory"] is not None and current["memory"] >= _MEMORY_HIGH:
+            pressure = f"{current['memory']:.0%} of memory in use"
+        elif current["disk_free"] < _DISK_FREE_LOW:
+            pressure = f"{current['disk_free']:.0%} of ephemeral storage free"
+        cpu = None
+        if current["cpu_seconds"] is not None and previous["cpu_seconds"] is not None:
+            elapsed = current["time"] - previous["time"]
+            cpu = (current["cpu_seconds"] - previous["cpu_seconds"]) / (
+                elapsed * self._cpus
+            )
+
+        with self._cond:
+            if pressure:
+                limit = max(self._minimum, min(self._limit, self._in_flight - 1))
+                if limit < self._limit:
+                    LOG.warning(
+                        "Lowering repos in flight from %d to %d: %s",
+                        self._limit,
+                        limit,
+                        pressure,
+                    )
+                    self._limit = limit
+                    self._backoffs += 1
+                self._window, self._rate, self._raised = None, None, False
+                return
+            if self._window is None:
+                self._window, self._busy = current, True
+                return
+            if self._in_flight < self._limit or (cpu is not None and cpu >= _CPU_HIGH):
+                self._busy = False
+            elapsed = current["time"] - self._window["time"]
+            if elapsed < _ADAPTIVE_WINDOW_SECONDS:
+                return
+
+            rate = None
+            if current["network_bytes"] is not None:
+                rate = (
+                    current["network_bytes"] - self._window["network_bytes"]
+                ) / elapsed
+            busy = self._busy
+            self._window, self._busy = current, True
+            if not busy or rate is None:
+                # Not comparable with a window that used every slot
+                self._rate, self._raised = None, False
+                return
+            if (
+                self._raised
+                and self._rate
+                and rate < self._rate * (1 + _THROUGHPUT_GAIN)
+            ):
+                self._limit = max(self._minimum, self._limit - 1)
+                self._hold_until = current["time"] + _PLATEAU_HOLD_SECONDS
+                LOG.info(
+                    "Throughput levels off at %s/s; holding %d repos in flight",
+                    format_bytes(self._rate),
+                    self._limit,
+                )
+                self._rate, self._raised = None, False
+            elif self._limit < self._maximum and current["time"] >= self._hold_until:
+                self._rate, self._raised = rate, True
+                self._limit += 1
+                self._peak = max(self._peak, self._limit)
+                LOG.info(
+                    "Raising repos in flight to %d (%s/s)",
+                    self._limit,
+                    format_bytes(rate),
+                )
+                self._cond.notify_all()
+            else:
+                self._rate, self._raised = rate, False
+
+
+# ── Backup pipeline ─────────────────────────────────────────────
+
+
+def describe_error(err: Exception) -> str:
+    """
+    Summarize an exception for logs and the manifest.
+
+    git's own message only reaches the exception via captured stderr,
+    so for failed git commands its last line is appended.
+
+    :param err: Exception raised while backing up a repo.
+    :return: One-line description.
+    """
+    message = f"{type(err).__name__}: {err}"
+    if isinstance(err, subprocess.CalledProcessError) and err.stderr:
+        lines = err.stderr.decode(errors="replace").strip().splitlines()
+        if lines:
+            message += f" ({lines[-1]})"
+    return message
+
+
+class StorageBudget:
+    """
+    Byte-counting semaphore for ephemeral storage.
+
+    Every repo reserves its estimated on-disk footprint before it is
+    cloned and gives it back as its files are deleted, so the mirrors
+    and bundles in flight never outgrow the task's ephemeral storage.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize the budget.
+
+        :param capacity: Number of bytes that may be in use at once.
+        """
+        self._capacity = capacity
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int) -> int:
+        """
+        Block until ``nbytes`` fit in the budget, then reserve them.
+
+        A request larger than the whole budget is capped to it and
+        admitted once nothing else is in flight, so one huge repo
+        cannot stall the run forever.
+
+        :param nbytes: Estimated number of bytes needed.
+        :return: Number of bytes actually reserved.
+        """
+        nbytes = min(nbytes, self._capacity)
+        with self._cond:
+            while self._in_use and self._in_use + nbytes > self._capacity:
+                self._cond.wait()
+            self._in_use += nbytes
+            return nbytes
+
+    def release(self, nbytes: int) -> None:
+        """
+        Return previously reserved bytes to the budget.
+
+        :param nbytes: Number of bytes to release.
+        """
+        with self._cond:
+            self._in_use -= nbytes
+            self._cond.notify_all()
+
+
+def estimate_footprint(repo: Dict[str, Any]) -> int:
+    """
+    Estimate the ephemeral storage a repo needs while it is backed up.
+
+    The GitHub API reports ``size`` in KiB of packed objects.  The
+    mirror and the bundle each take roughly that much, and both exist
+    at the same time while the bundle is being written.  A mirror in
+    the persistent cache does not count: it is not on ephemeral storage,
+    and neither does a bundle streamed straight to S3.
+
+    :param repo: Repository dict from GitHub API.
+    :return: Estimated footprint in bytes.
+    """
+    copies = (0 if BACKUP_MIRROR_CACHE_DIR else 1) + (0 if BACKUP_STREAM_BUNDLES else 1)
+    return max(copies * repo.get("size", 0) * 1024, _MIN_REPO_FOOTPRINT)
+
+
+# Floor for repos that report size 0 (empty or freshly pushed)
+_MIN_REPO_FOOTPRINT = 1024 * 1024
+
+# Queue sentinel that tells a stage worker to exit
+_STOP = object()
+
+
+class _RepoJob:
+    """State of one repository as it moves through the pipeline."""
+
+    def __init__(self, index: int, repo: Dict[str, Any], attempt: int = 1):
+        self.index = index
+        self.repo = repo
+        self.attempt = attempt
+        self.full_name: str = repo["full_name"]
+        self.tmp_dir: Optional[str] = None
+        self.mirror_dir: Optional[str] = None
+        self.bundle_path: Optional[str] = None
+        self.reserved = 0
+        # Seconds and bytes of each phase ("clone", "bundle", "upload")
+        self.phases: Dict[str, Dict[str, float]] = {}
+        # Holds one of the scheduler's huge-repo slots
+        self.huge_slot = False
+        # Holds one of the concurrency controller's slots
+        self.slot = False
+        # Set by the bundle stage when it streamed the bundle straight
+        # to S3, or found nothing new to bundle (delta mode).
+        self.s3_key: Optional[str] = None
+        self.bundle_size: Optional[int] = None
+        # Size before outer compression (same as bundle_size without it)
+        self.uncompressed_size: Optional[int] = None
+        # SHA-256 (hex) of the stored bundle, and the checksum S3 keeps
+        # for it (see stored_checksum)
+        self.sha256: Optional[str] = None
+        self.checksum: Optional[str] = None
+        # Content-addressed mode: the bundle was already stored, by the
+        # run of bundle_date
+        self.deduplicated = False
+        self.bundle_date: Optional[str] = None
+        self.unchanged = False
+        # Delta mode only: refs bundled this run and the chain of
+        # earlier bundles the new one extends (empty for a full bundle).
+        self.refs: Dict[str, str] = {}
+        self.chain: List[Dict[str, Any]] = []
+        # From repo_policy, and where the list of large blobs or LFS
+        # objects the bundle needs went (see _sync_objects)
+        self.policy: Dict[str, Any] = {"strategy": "full", "blob_limit": None}
+        self.objects_key: Optional[str] = None
+        self.lfs_missing = 0
+
+
+class RepoScheduler:
+    """
+    Input queue of the clone stage that hands out the largest repo first.
+
+    Repos of ``BACKUP_HUGE_REPO_GB`` or more wait in a separate heap and
+    at most ``max_huge`` of them are out at once; while the cap is
+    reached, workers get the largest of the other repos instead of
+    blocking.  A huge repo's slot is given back with :meth:`release`.
+
+    Implements the ``put``/``get`` subset of :class:`queue.Queue` used by
+    the pipeline's workers, including the stop sentinel.
+    """
+
+    def __init__(self, max_huge: int):
+        """
+        Initialize the scheduler.
+
+        :param max_huge: Number of huge repos allowed out at once.
+        """
+        self._max_huge = max_huge
+        self._huge_out = 0
+        self._huge: List[Tuple[int, int, int, _RepoJob]] = []
+        self._other: List[Tuple[int, int, int, _RepoJob]] = []
+        self._stops = 0
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def put(self, job: Any) -> None:
+        """
+        Add a job, or the stop sentinel.
+
+        :param job: :class:`_RepoJob` or ``_STOP``.
+        """
+        with self._cond:
+            if job is _STOP:
+                self._stops += 1
+            else:
+                size = job.repo.get("size", 0) * 1024
+                heap = self._huge if size >= BACKUP_HUGE_REPO_BYTES else self._other
+                # seq keeps equal sizes in arrival order
+                self._seq += 1
+                heapq.heappush(heap, (-size, job.index, self._seq, job))
+            self._cond.notify_all()
+
+    def get(self) -> Any:
+        """
+        Block until a job may start and return it.
+
+        :return: The largest eligible :class:`_RepoJob`, or ``_STOP``
+            once no jobs are left.
+        """
+        with self._cond:
+            while True:
+                if self._huge and self._huge_out < self._max_huge:
+                    job = heapq.heappop(self._huge)[-1]
+                    job.huge_slot = True
+                    self._huge_out += 1
+                    return job
+                if self._other:
+                    return heapq.heappop(self._other)[-1]
+                if self._stops and not self._huge:
+                    self._stops -= 1
+                    return _STOP
+                self._cond.wait()
+
+    def release(self, job: _RepoJob) -> None:
+        """
+        Give back a huge repo's slot once it no longer needs much disk
+        or memory.
+
+        :param job: Job that may hold a slot.
+        """
+        if not job.huge_slot:
+            return
+        job.huge_slot = False
+        with self._cond:
+            self._huge_out -= 1
+            self._cond.notify_all()
+
+
+class BackupPipeline:
+    """
+    Producer/consumer pipeline that overlaps clone, bundle and upload.
+
+    Each stage has its own queue and pool of worker threads, so while
+    repo N+1 is cloning (network-bound), repo N can be bundling
+    (CPU/disk-bound) and repo N-1 uploading (egress-bound).  Repos
+    enter the clone stage largest first through a
+    :class:`RepoScheduler`, and are admitted once their footprint fits
+    in a :class:`StorageBudget` (and, with adaptive concurrency, once
+    a :class:`ConcurrencyController` has a slot for it).
+
+    A repo that fails in any stage is cleaned up and, after an
+    exponential backoff, sent through the pipeline again from the
+    clone stage.  After ``BACKUP_MAX_ATTEMPTS`` failures it is recorded
+    as failed and the other repos carry on.
+    """
+
+    def __init__(
+        self,
+        token_mgr: TokenManager,
+        date_prefix: str,
+        storage_budget: StorageBudget,
+        previous: Dict[str, Dict[str, Any]],
+        clone_workers: int,
+        bundle_workers: int,
+        upload_workers: int,
+        checkpoint: Optional[Checkpoint] = None,
+        controller: Optional[ConcurrencyController] = None,
+    ):
+        """
+        Initialize the pipeline.
+
+        :param token_mgr: Shared token manager.
+        :param date_prefix: ``YYYY-MM-DD`` prefix of this run's S3 keys.
+        :param storage_budget: Budget for ephemeral storage in flight.
+        :param previous: Previous manifest entries keyed by repo full name.
+        :param clone_workers: Number of clone threads.
+        :param bundle_workers: Number of bundle threads.
+        :param upload_workers: Number of upload threads.
+        :param checkpoint: Checkpoint that successful repos are added to.
+        :param controller: Limit on the repos in flight, if adaptive.
+        """
+        self._token_mgr = token_mgr
+        self._date_prefix = date_prefix
+        self._budget = storage_budget
+        self._previous = previous
+        self._checkpoint = checkpoint
+        self._controller = controller
+        self._workers = {
+            "clone": clone_workers,
+            "bundle": bundle_workers,
+            "upload": upload_workers,
+        }
+        self._on_result: Callable[[Dict[str, Any]], None] = lambda entry: None
+        self._lock = threading.Lock()
+        self._clone_q = RepoScheduler(BACKUP_MAX_HUGE_REPOS)
+        # Repos without a result yet, including those waiting to retry.
+        self._pending = 0
+        self._settled = threading.Condition(self._lock)
+
+    def run(
+        self,
+        repos: List[Dict[str, Any]],
+        on_result: Callable[[Dict[str, Any]], None],
+    ) -> None:
+        """
+        Back up every repository in ``repos``.
+
+        Results are not collected: each repo's manifest entry is passed
+        to ``on_result`` (from a worker thread) as soon as it is final.
+
+        :param repos: Repository dicts from GitHub API.
+        :param on_result: Receives every manifest entry.  Entries of
+            repos that failed every attempt have ``"status": "failed"``.
+        """
+        self._on_result = on_result
+        clone_q = self._clone_q
+        bundle_q: "queue.Queue[Any]" = queue.Queue()
+        upload_q: "queue.Queue[Any]" = queue.Queue()
+        stages = [
+            ("clone", clone_q, self._clone, bundle_q),
+            ("bundle", bundle_q, self._bundle, upload_q),
+            ("upload", upload_q, self._upload, None),
+        ]
+
+        # Queue everything before the clone workers start, so the
+        # first repo they take really is the largest.
+        with self._lock:
+            self._pending = len(repos)
+        for index, repo in enumerate(repos):
+            clone_q.put(_RepoJob(index, repo))
+
+        pools = []
+        for name, in_q, handler, out_q in stages:
+            threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(in_q, handler, out_q),
+                    name=f"{name}-{i}",
+                )
+                for i in range(self._workers[name])
+            ]
+            for thread in threads:
+                thread.start()
+            pools.append((in_q, threads))
+
+        # Retries re-enter the clone queue, so it can only be closed
+        # once every repo has a result.  After that the stages are
+        # drained in order: once every clone worker has exited,
+        # nothing else can reach the bundle queue, and so on.
+        with self._settled:
+            while self._pending:
+                self._settled.wait()
+        for in_q, threads in pools:
+            for _ in threads:
+                in_q.put(_STOP)
+            for thread in threads:
+                thread.join()
+
+    def _worker(
+        self,
+        in_q: "queue.Queue[Any]",
+        handler: Callable[[_RepoJob], None],
+        out_q: "Optional[queue.Queue[Any]]",
+    ) -> None:
+        """
+        Take jobs off ``in_q``, process them, and pass them on.
+
+        :param in_q: Queue this stage consumes.
+        :param handler: Stage function applied to each job.
+        :param out_q: Queue of the next stage, or None for the last one.
+        """
+        while True:
+            job = in_q.get()
+            if job is _STOP:
+                return
+            try:
+                handler(job)
+            except Exception as err:
+                self._discard(job)
+                self._retry_or_fail(job, err)
+                continue
+            if out_q is not None:
+                out_q.put(job)
+
+    def _retry_or_fail(self, job: _RepoJob, err: Exception) -> None:
+        """
+        Schedule another attempt of a failed job, or record the failure.
+
+        :param job: Job that raised.
+        :param err: The exception it raised.
+        """
+        error = describe_error(err)
+        if job.attempt < BACKUP_MAX_ATTEMPTS:
+            delay = BACKUP_RETRY_BASE_SECONDS * 2 ** (job.attempt - 1)
+            LOG.warning(
+                "Backup of %s failed (attempt %d/%d), retrying in %.0fs: %s",
+                job.full_name,
+                job.attempt,
+                BACKUP_MAX_ATTEMPTS,
+                delay,
+                error,
+            )
+            timer = threading.Timer(
+                delay,
+                self._clone_q.put,
+                args=(_RepoJob(job.index, job.repo, job.attempt + 1),),
+            )
+            timer.daemon = True
+            timer.start()
+            return
+
+        LOG.error(
+            "Backup of %s failed after %d attempts: %s",
+            job.full_name,
+            job.attempt,
+            error,
+        )
+        self._record(
+            job,
+            {
+                "repo": job.full_name,
+                "status": "failed",
+                "error": error,
+                "attempts": job.attempt,
+            },
+        )
+
+    def _record(self, job: _RepoJob, entry: Dict[str, Any]) -> None:
+        """
+        Store a job's final manifest entry.
+
+        :param job: Job that finished.
+        :param entry: Its manifest entry.
+        """
+        if self._checkpoint is not None and entry.get("status") != "failed":
+            self._checkpoint.add(entry)
+        self._on_result(entry)
+        with self._settled:
+            self._pending -= 1
+            self._settled.notify_all()
+
+    def _discard(self, job: _RepoJob) -> None:
+        """
+        Delete a job's temporary files and release its storage.
+
+        :param job: Job to clean up.
+        """
+        if job.tmp_dir:
+            shutil.rmtree(job.tmp_dir, ignore_errors=True)
+            job.tmp_dir = None
+        if job.reserved:
+            self._budget.release(job.reserved)
+            job.reserved = 0
+        if job.slot:
+            self._controller.release()
+            job.slot = False
+        self._clone_q.release(job)
+
+    def _clone(self, job: _RepoJob) -> None:
+        """
+        Reserve storage for a repo and clone its mirror.
+
+        :param job: Job to process.
+        """
+        if self._controller is not None:
+            self._controller.acquire()
+            job.slot = True
+        job.reserved = self._budget.acquire(estimate_footprint(job.repo))
+        start = time.monotonic()
+        job.tmp_dir = tempfile.mkdtemp(prefix="ghbackup-")
+        job.policy = repo_policy(job.repo)
+        job.mirror_dir = clone_mirror(
+            job.repo,
+            self._token_mgr,
+            job.tmp_dir,
+            BACKUP_MIRROR_CACHE_DIR,
+            job.policy["blob_limit"],
+        )
+        job.phases["clone"] = {
+            "seconds": round(time.monotonic() - start, 3),
+            "bytes": directory_size(job.mirror_dir),
+        }
+
+    def _bundle(self, job: _RepoJob) -> None:
+        """
+        Bundle the mirror, then delete it to free space for the next clone
+        (unless it lives in the persistent mirror cache).
+
+        In delta mode the bundle only holds objects that are new since
+        the previous run, unless :func:`delta_chain` calls for a full
+        one.  If nothing is new, no bundle is written at all.  With
+        content-addressed bundles, a bundle that is already stored is
+        not created again.  In streaming mode the bundle goes straight
+        to S3 instead of disk, and the bundle phase's timing includes
+        the upload.  Repos whose policy is ``"filtered"`` or ``"lfs"``
+        then have their large blobs or LFS objects synced to S3 while
+        the mirror is still around.
+
+        :param job: Job to process.
+        """
+        start = time.monotonic()
+        org_name, repo_name = job.full_name.split("/", 1)
+        file_name = f"{repo_name}{bundle_suffix()}"
+        s3_key = f"github-backup/{self._date_prefix}/{org_name}/{file_name}"
+        exclude = None
+        if BACKUP_DELTA_BUNDLES:
+            job.refs = list_refs(job.mirror_dir)
+            previous = self._previous.get(job.full_name)
+            chain = delta_chain(previous, self._date_prefix)
+            if chain is not None:
+                job.chain = chain
+                exclude = existing_objects(
+                    job.mirror_dir, sorted(set(previous["refs"].values()))
+                )
+
+        blob_limit = job.policy["blob_limit"]
+        found = None
+        if BACKUP_DEDUP_BUNDLES:
+            s3_key = bundle_object_key(job.mirror_dir, exclude, blob_limit)
+            found = find_stored_object(S3_BUCKET, s3_key, self._date_prefix)
+        if found:
+            LOG.info("Bundle of %s is already stored as %s", job.full_name, s3_key)
+            job.s3_key = s3_key
+            job.bundle_size, job.bundle_date, job.checksum = found
+            job.deduplicated = True
+            previous = self._previous.get(job.full_name)
+            if previous and previous.get("s3_key") == s3_key:
+                job.uncompressed_size = previous.get("uncompressed_size_bytes")
+                job.sha256 = previous.get("sha256")
+        elif BACKUP_STREAM_BUNDLES:
+            if not BACKUP_PACK_REUSE:
+                repack_mirror(job.mirror_dir)
+            sizes = stream_bundle_to_s3(
+                job.mirror_dir,
+                S3_BUCKET,
+                s3_key,
+                exclude,
+                size_hint=job.repo.get("size", 0) * 1024,
+                blob_limit=blob_limit,
+            )
+            if sizes is not None:
+                job.s3_key = s3_key
+                job.bundle_size, job.uncompressed_size, job.sha256 = sizes
+                job.checksum = stored_checksum(S3_BUCKET, s3_key)
+        else:
+            if not BACKUP_PACK_REUSE:
+                repack_mirror(job.mirror_dir)
+            job.bundle_path = os.path.join(job.tmp_dir, file_name)
+            created = create_bundle(
+                job.mirror_dir, job.bundle_path, exclude, blob_limit
+            )
+            if created is not None:
+                job.s3_key = s3_key
+                job.uncompressed_size, job.sha256 = created
+            else:
+                job.bundle_path = None
+        job.unchanged = job.s3_key is None
+        if job.unchanged:
+            LOG.info("No new objects in %s since the last run", job.full_name)
+        elif job.bundle_size is None:
+            job.bundle_size = os.path.getsize(job.bundle_path)
+        job.phases["bundle"] = {
+            "seconds": round(time.monotonic() - start, 3),
+            "bytes": 0 if job.deduplicated else job.bundle_size or 0,
+        }
+        if job.s3_key and job.policy["strategy"] != "full":
+            self._sync_objects(job, exclude)
+
+        if not BACKUP_MIRROR_CACHE_DIR:
+            shutil.rmtree(job.mirror_dir, ignore_errors=True)
+        keep = 0
+        if job.bundle_path:
+            keep = min(job.reserved, os.path.getsize(job.bundle_path))
+        self._budget.release(job.reserved - keep)
+        job.reserved = keep
+        self._clone_q.release(job)
+
+    def _sync_objects(self, job: _RepoJob, exclude: Optional[List[str]]) -> None:
+        """
+        Store the large blobs a filtered bundle leaves out, or the LFS
+        objects the bundle's history points at, and next to the bundle
+        the list of them a restore needs.
+
+        :param job: Job to process.
+        :param exclude: Object IDs whose history the bundle leaves out.
+        """
+        start = time.monotonic()
+        if job.policy["strategy"] == "filtered":
+            objects, uploaded = sync_large_blobs(
+                job.mirror_dir,
+                job.full_name,
+                job.policy["blob_limit"],
+                self._token_mgr,
+                S3_BUCKET,
+                self._date_prefix,
+                exclude,
+            )
+            job.objects_key = f"{job.s3_key}.blobs.json"
+        else:
+            objects = lfs_pointers(job.mirror_dir, exclude)
+            uploaded, job.lfs_missing = sync_lfs_objects(
+                job.full_name, objects, self._token_mgr, S3_BUCKET, self._date_prefix
+            )
+            job.objects_key = f"{job.s3_key}.lfs.json"
+        upload_json(objects, S3_BUCKET, job.objects_key)
+        job.phases["objects"] = {
+            "seconds": round(time.monotonic() - start, 3),
+            "bytes": uploaded,
+        }
 
-            # Clone
-            mirror_dir = clone_mirror(repo, current_token, tmp_dir)
+    def _upload(self, job: _RepoJob) -> None:
+        """
+        Upload the bundle (unless streamed), record the manifest entry,
+        and clean up.
 
-            # Bundle
-            bundle_path = os.path.join(tmp_dir, f"{repo_name}.bundle")
-            create_bundle(mirror_dir, bundle_path)
+        :param job: Job to process.
+        """
+        if job.unchanged:
+            # Delta mode, no new objects: keep the previous chain, but
+            # record the current refs (branches may have moved or been
+            # deleted without adding objects).
+            self._discard(job)
+            entry = {
+                **self._previous[job.full_name],
+                "fingerprint": repo_fingerprint(job.repo),
+                "refs": job.refs,
+                "reused": True,
+                "phases": job.phases,
+            }
+            self._record(job, entry)
+            return
 
-            # Upload
-            s3_key = f"github-backup/{date_prefix}/{org_name}/{repo_name}.bundle"
-            upload_to_s3(bundle_path, S3_BUCKET, s3_key)
+        try:
+            if job.bundle_path:
+                start = time.monotonic()
+                upload_to_s3(job.bundle_path, S3_BUCKET, job.s3_key)
+                job.checksum = stored_checksum(S3_BUCKET, job.s3_key)
+                job.phases["upload"] = {
+                    "seconds": round(time.monotonic() - start, 3),
+                    "bytes": job.bundle_size,
+                }
+        finally:
+            self._discard(job)
 
-            bundle_size = os.path.getsize(bundle_path)
-            results.append(
+        LOG.info("Backed up %s (%d bytes)", job.full_name, job.bundle_size)
+        entry = {
+            "repo": job.full_name,
+            "size_bytes": job.bundle_size,
+            "uncompressed_size_bytes": job.uncompressed_size,
+            "compression": BACKUP_BUNDLE_COMPRESSION,
+            "sha256": job.sha256,
+            "checksum_sha256": job.checksum,
+            "s3_key": job.s3_key,
+            "bundle_date": job.bundle_date or self._date_prefix,
+            "fingerprint": repo_fingerprint(job.repo),
+            "reused": False,
+            "phases": job.phases,
+        }
+        # Where a restore finds the blobs or LFS objects the bundle needs
+        objects = {}
+        if job.policy["strategy"] == "filtered":
+            objects = {"blobs_key": job.objects_key}
+            entry["blob_limit_bytes"] = job.policy["blob_limit"]
+        elif job.policy["strategy"] == "lfs":
+            objects = {"lfs_key": job.objects_key}
+            entry["lfs_missing"] = job.lfs_missing
+        if objects:
+            entry["strategy"] = job.policy["strategy"]
+            entry.update(objects)
+        if BACKUP_DEDUP_BUNDLES:
+            entry["deduplicated"] = job.deduplicated
+        if BACKUP_DELTA_BUNDLES:
+            entry["bundle_type"] = "delta" if job.chain else "full"
+            entry["refs"] = job.refs
+            entry["chain"] = job.chain + [
                 {
-                    "repo": full_name,
-                    "size_bytes": bundle_size,
-                    "s3_key": s3_key,
+                    "s3_key": job.s3_key,
+                    "bundle_date": entry["bundle_date"],
+                    "bundle_type": entry["bundle_type"],
+                    "size_bytes": job.bundle_size,
+                    "compression": BACKUP_BUNDLE_COMPRESSION,
+                    "sha256": job.sha256,
+                    "checksum_sha256": job.checksum,
+                    **objects,
                 }
+            ]
+        self._record(job, entry)
+
+
+# ── Run metrics ─────────────────────────────────────────────────
+
+_PHASES = ("clone", "bundle", "upload", "objects")
+
+
+class RunStats:
+    """
+    Aggregate timings and byte counts of the repos backed up this run.
+
+    Fed with the manifest entries the pipeline produces; entries reused
+    or resumed from earlier runs are not added.
+    """
+
+    def __init__(self):
+        """Start the run clock."""
+        self._start = time.monotonic()
+        self._seconds: Dict[str, List[float]] = {phase: [] for phase in _PHASES}
+        self._bytes_cloned = 0
+        self._bytes_uploaded = 0
+        self._bytes_bundled = 0
+        self._deduplicated = 0
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Account for one repo.  Safe to call from any thread.
+
+        :param entry: Manifest entry written by the pipeline.
+        """
+        phases = entry.get("phases", {})
+        with self._lock:
+            for phase, timing in phases.items():
+                self._seconds[phase].append(timing["seconds"])
+            self._bytes_cloned += phases.get("clone", {}).get("bytes", 0)
+            self._deduplicated += bool(entry.get("deduplicated"))
+            skipped = entry.get("reused") or entry.get("deduplicated")
+            # Large blobs and LFS objects (uploaded even when the
+            # bundle itself was already stored)
+            self._bytes_uploaded += phases.get("objects", {}).get("bytes", 0)
+            if entry.get("status") != "failed" and not skipped:
+                self._bytes_uploaded += entry["size_bytes"]
+                self._bytes_bundled += entry.get(
+                    "uncompressed_size_bytes", entry["size_bytes"]
+                )
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the run's statistics for the manifest summary.
+
+        :return: Duration, byte counts (``bytes_bundled`` is what
+            ``bytes_uploaded`` was before outer compression), the
+            number of repos whose bundle was already stored, and per
+            phase the number of repos and the total, p50 and p95
+            seconds.
+        """
+        with self._lock:
+            return {
+                "duration_seconds": round(time.monotonic() - self._start, 3),
+                "bytes_cloned": self._bytes_cloned,
+                "bytes_uploaded": self._bytes_uploaded,
+                "bytes_bundled": self._bytes_bundled,
+                "deduplicated_count": self._deduplicated,
+                "phases": {
+                    phase: {
+                        "count": len(seconds),
+                        "total_seconds": round(sum(seconds), 3),
+                        "p50_seconds": percentile(seconds, 0.5),
+                        "p95_seconds": percentile(seconds, 0.95),
+                    }
+                    for phase, seconds in self._seconds.items()
+                    if seconds
+                },
+            }
+
+    def metric_data(self) -> List[Dict[str, Any]]:
+        """
+        Return CloudWatch ``MetricData`` items for :func:`publish_metrics`.
+
+        :return: RunDuration, BytesUploaded, UploadThroughput, and
+            PhaseDurationP50 / PhaseDurationP95 per ``Phase`` dimension.
+        """
+        summary = self.summary()
+        duration = summary["duration_seconds"]
+        data: List[Dict[str, Any]] = [
+            {"MetricName": "RunDuration", "Value": duration, "Unit": "Seconds"},
+            {
+                "MetricName": "BytesUploaded",
+                "Value": summary["bytes_uploaded"],
+                "Unit": "Bytes",
+            },
+            {
+                "MetricName": "UploadThroughput",
+                "Value": summary["bytes_uploaded"] / duration if duration else 0,
+                "Unit": "Bytes/Second",
+            },
+        ]
+        for phase, stats in summary["phases"].items():
+            for name, key in (
+                ("PhaseDurationP50", "p50_seconds"),
+                ("PhaseDurationP95", "p95_seconds"),
+            ):
+                data.append(
+                    {
+                        "MetricName": name,
+                        "Dimensions": [{"Name": "Phase", "Value": phase}],
+                        "Value": stats[key],
+                        "Unit": "Seconds",
+                    }
+                )
+        return data
+
+
+# ── Main ────────────────────────────────────────────────────────
+
+
+def plan() -> None:
+    """
+    Print what the next run would back up, and back up nothing.
+
+    Lists the repos, fingerprints their refs with ``git ls-remote`` and
+    compares them with the latest manifest, as an incremental run with
+    ``BACKUP_REF_FINGERPRINTS`` does.  For every repo to back up, the
+    plan shows why, its estimated size and time (see
+    :func:`estimate_plan`).  Nothing is cloned or written to S3.
+    """
+    private_key = Secret(GITHUB_APP_KEY_SECRET_ARN).value
+    token_mgr = TokenManager(GITHUB_APP_ID, private_key, GITHUB_APP_INSTALLATION_ID)
+    try:
+        repos = list(list_repositories(token_mgr.token))
+        fingerprint_repos(repos, token_mgr)
+    finally:
+        token_mgr.close()
+    date_prefix = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    previous_summary, previous = load_previous_entries(S3_BUCKET, date_prefix)
+
+    reasons = {r["full_name"]: change_reason(r, previous, date_prefix) for r in repos}
+    changed = [r for r in repos if reasons[r["full_name"]]]
+    estimates, total_bytes, duration = estimate_plan(
+        changed, previous, previous_summary
+    )
+
+    print(
+        f"Backup plan for {date_prefix}: {len(repos)} repositories, "
+        f"{len(changed)} to back up, {len(repos) - len(changed)} unchanged"
+    )
+    for estimate in sorted(estimates, key=lambda e: e["bytes"], reverse=True):
+        print(
+            f"  {estimate['repo']:<60} {reasons[estimate['repo']]:<8} "
+            f"{format_bytes(estimate['bytes']):>10} {estimate['seconds']:>9.1f} s"
+        )
+    print(
+        f"Estimated: {format_bytes(total_bytes)}, "
+        + ("unknown duration" if duration is None else f"{duration:.0f} s")
+        + f" with {BACKUP_CLONE_WORKERS}/{BACKUP_BUNDLE_WORKERS}/"
+        f"{BACKUP_UPLOAD_WORKERS} clone/bundle/upload workers"
+    )
+    if not (BACKUP_INCREMENTAL and BACKUP_REF_FINGERPRINTS):
+        print(
+            "Note: runs reuse unchanged repos only with BACKUP_INCREMENTAL and "
+            "BACKUP_REF_FINGERPRINTS set to true."
+        )
+
+
+def verify(date_prefix: Optional[str] = None) -> int:
+    """
+    Check that a backup is intact, and report the result.
+
+    1. Every bundle the manifest references gets a HEAD request, and its
+       size and S3 checksum are compared with the manifest (see
+       :func:`check_object`).  Nothing is downloaded.
+    2. ``BACKUP_VERIFY_SAMPLE`` random repos are downloaded and checked
+       with git, ``BACKUP_BUNDLE_WORKERS`` at a time (see
+       :func:`verify_repo`).
+    3. The findings are written to ``verify.json`` next to the manifest
+       and published as the ``VerifiedBundles`` and ``VerifyFailure``
+       metrics.
+
+    :param date_prefix: ``YYYY-MM-DD`` of the backup; the latest one by
+        default.
+    :return: Number of failures (bad bundles and failed repos).
+    :raises RuntimeError: If there is no backup to verify.
+    """
+    if date_prefix:
+        key = f"github-backup/{date_prefix}/manifest.json"
+        response = get_s3_client().get_object(Bucket=S3_BUCKET, Key=key)
+        summary = json.loads(response["Body"].read())
+    else:
+        tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+        summary = load_previous_manifest(S3_BUCKET, tomorrow.strftime("%Y-%m-%d"))
+        if summary is None:
+            raise RuntimeError(f"No backup to verify in s3://{S3_BUCKET}")
+        date_prefix = summary["date"]
+    entries = [e for e in iter_manifest_entries(S3_BUCKET, summary) if e.get("s3_key")]
+
+    # Chains share their base bundles, and with BACKUP_DEDUP_BUNDLES
+    # repos can share a bundle; each is checked once.
+    objects: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for entry in entries:
+        for obj in bundle_objects(entry):
+            objects.setdefault(obj["s3_key"], (entry["repo"], obj))
+    LOG.info("Checking %d bundles of the %s backup", len(objects), date_prefix)
+    with ThreadPoolExecutor(max_workers=_VERIFY_HEAD_WORKERS) as pool:
+        problems = pool.map(
+            lambda item: check_object(S3_BUCKET, item[1]), objects.values()
+        )
+        object_failures = [
+            {"s3_key": obj["s3_key"], "repo": repo, "problem": problem}
+            for (repo, obj), problem in zip(objects.values(), problems)
+            if problem
+        ]
+    for failure in object_failures:
+        LOG.error(
+            "Bundle %s of %s: %s",
+            failure["s3_key"],
+            failure["repo"],
+            failure["problem"],
+        )
+
+    sample = random.sample(entries, min(BACKUP_VERIFY_SAMPLE, len(entries)))
+
+    def check_repo(entry: Dict[str, Any]) -> Optional[str]:
+        LOG.info("Verifying the bundles of %s", entry["repo"])
+        try:
+            verify_repo(S3_BUCKET, entry)
+        except Exception as err:
+            LOG.error(
+                "Verification of %s failed: %s", entry["repo"], describe_error(err)
             )
-            LOG.info("Backed up %s (%d bytes)", full_name, bundle_size)
+            return describe_error(err)
+        return None
 
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+    with ThreadPoolExecutor(max_workers=BACKUP_BUNDLE_WORKERS) as pool:
+        sample_failures = [
+            {"repo": entry["repo"], "error": error}
+            for entry, error in zip(sample, pool.map(check_repo, sample))
+            if error
+        ]
 
-    # 5. Write manifest
-    manifest = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "date": date_prefix,
-        "total_repos": len(repos),
-        "success_count": len(results),
-        "repos": results,
+    upload_json(
+        {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "date": date_prefix,
+            "bundles_checked": len(objects),
+            "bundle_failures": object_failures,
+            "sampled_repos": [e["repo"] for e in sample],
+            "sample_failures": sample_failures,
+        },
+        S3_BUCKET,
+        f"github-backup/{date_prefix}/verify.json",
+    )
+    failures = len(object_failures) + len(sample_failures)
+    boto3.client("cloudwatch").put_metric_data(
+        Namespace="GitHubBackup",
+        MetricData=[
+            {"MetricName": "VerifiedBundles", "Value": len(objects), "Unit": "Count"},
+            {"MetricName": "VerifyFailure", "Value": failures, "Unit": "Count"},
+        ],
+    )
+    LOG.info(
+        "Verified the %s backup: %d bundles checked, %d repos restored, %d failures",
+        date_prefix,
+        len(objects),
+        len(sample),
+        failures,
+    )
+    return failures
+
+
+def main() -> None:
+    """
+    Run the GitHub backup process.
+
+    1. Authenticate via GitHub App.
+    2. List all accessible repositories.  In sharded mode, keep only
+       this task's shard of them.
+    3. Clone, bundle, and upload each repo to S3 through a staged
+       pipeline (see :class:`BackupPipeline`).  In incremental mode,
+       repos unchanged since the previous run reuse its bundle (with
+       ``BACKUP_REF_FINGERPRINTS``, judged by ``git ls-remote``); in
+       delta mode, new bundles only hold objects added since then.
+       Finished repos are checkpointed, so a rerun on the same day
+       skips them (see :class:`Checkpoint`).
+    4. With ``BACKUP_METADATA``, export issues, pull requests and
+       releases alongside the pipeline (see :func:`export_metadata`),
+       and back up wikis as repos of their own.
+    5. Write a manifest and publish metrics.  In sharded mode, write a
+       partial manifest, and merge all of them into the manifest once
+       every shard has finished or stalled (see
+       :func:`merge_shard_manifests`).
+
+    A repo that keeps failing after ``BACKUP_MAX_ATTEMPTS`` is recorded
+    as failed in the manifest and counted in the BackupFailure metric,
+    which trips the "backup failure" alarm.  Any other exception
+    crashes the process; the "task not running" CloudWatch alarm
+    (treat_missing_data = "breaching") fires when no BackupSuccess
+    metric is published.
+    """
+    LOG.info("Starting GitHub backup")
+    stats = RunStats()
+
+    # 1. Read private key from Secrets Manager
+    private_key = Secret(GITHUB_APP_KEY_SECRET_ARN).value
+
+    # 2. Set up token manager (renews the token in the background)
+    token_mgr = TokenManager(GITHUB_APP_ID, private_key, GITHUB_APP_INSTALLATION_ID)
+    token_mgr.start()
+
+    # 3. List all repositories.  Scheduling and sharding need the
+    # whole list, so it is collected, but only as compact records.
+    repos = list(list_repositories(token_mgr.token))
+    LOG.info("Found %d repositories", len(repos))
+    date_prefix = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    shard = None
+    if BACKUP_SHARD_COUNT > 1:
+        shard = BACKUP_SHARD_INDEX
+        if shard is None:
+            shard = claim_shard(S3_BUCKET, date_prefix)
+        if shard is None:
+            LOG.warning(
+                "All %d shards were already claimed today and none has "
+                "stalled; merging the finished ones",
+                BACKUP_SHARD_COUNT,
+            )
+            token_mgr.close()
+            merged = merge_shard_manifests(S3_BUCKET, date_prefix)
+            if merged is not None and merged.get("unfinished_count"):
+                publish_metrics(0, merged["unfinished_count"])
+            return
+        shard_plan = load_shard_plan(S3_BUCKET, date_prefix, repos)
+        repos = [r for r in repos if shard_plan[r["full_name"]] == shard]
+        LOG.info(
+            "Shard %d of %d: %d repositories", shard, BACKUP_SHARD_COUNT, len(repos)
+        )
+
+    if BACKUP_INCREMENTAL and BACKUP_REF_FINGERPRINTS:
+        fingerprint_repos(repos, token_mgr)
+    metadata_repos = repos
+    if BACKUP_METADATA:
+        repos = repos + wiki_repos(repos, token_mgr)
+
+    # 4. Back up each repo
+    # Failures are isolated per repo: the pipeline retries them with
+    # backoff and records the ones that never succeed.
+
+    previous_summary: Dict[str, Any] = {}
+    previous: Dict[str, Dict[str, Any]] = {}
+    if BACKUP_INCREMENTAL or BACKUP_DELTA_BUNDLES or BACKUP_METADATA:
+        previous_summary, previous = load_previous_entries(S3_BUCKET, date_prefix)
+
+    if shard is None:
+        checkpoint = Checkpoint(S3_BUCKET, date_prefix)
+    else:
+        checkpoint = Checkpoint(
+            S3_BUCKET,
+            date_prefix,
+            shard_key(shard, BACKUP_SHARD_COUNT, "checkpoint.json"),
+        )
+    resumed = checkpoint.load()
+
+    reused: Dict[str, Dict[str, Any]] = {}
+    if BACKUP_INCREMENTAL:
+        for repo in repos:
+            if repo["full_name"] in resumed:
+                continue
+            entry = find_reusable_entry(repo, previous, date_prefix)
+            if entry is not None:
+                reused[repo["full_name"]] = entry
+        LOG.info("%d repositories unchanged since the last run", len(reused))
+    done = {**resumed, **reused}
+    changed = [r for r in repos if r["full_name"] not in done]
+    _, total_bytes, duration = estimate_plan(changed, previous, previous_summary)
+    LOG.info(
+        "%d repositories to back up, about %s, estimated %s",
+        len(changed),
+        format_bytes(total_bytes),
+        "unknown" if duration is None else f"{duration:.0f} s",
+    )
+
+    workers = {
+        "clone_workers": BACKUP_CLONE_WORKERS,
+        "bundle_workers": BACKUP_BUNDLE_WORKERS,
+        "upload_workers": BACKUP_UPLOAD_WORKERS,
     }
-    manifest_tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False)
+    controller = None
+    if BACKUP_ADAPTIVE_CONCURRENCY:
+        # Start with as many repos in flight as the fixed workers allow
+        controller = ConcurrencyController(
+            sum(workers.values()), BACKUP_MAX_REPOS_IN_FLIGHT
+        )
+        workers = dict.fromkeys(workers, BACKUP_MAX_REPOS_IN_FLIGHT)
+        LOG.info(
+            "Adaptive concurrency: %d repos in flight to start with, at most %d",
+            controller.limit,
+            BACKUP_MAX_REPOS_IN_FLIGHT,
+        )
+    LOG.info(
+        "Pipeline workers: clone=%d bundle=%d upload=%d, storage budget %d bytes",
+        workers["clone_workers"],
+        workers["bundle_workers"],
+        workers["upload_workers"],
+        BACKUP_STORAGE_BUDGET_BYTES,
+    )
+    LOG.info(
+        "Scheduling largest repos first; %d huge (>= %d bytes), at most %d at once",
+        sum(1 for r in changed if r.get("size", 0) * 1024 >= BACKUP_HUGE_REPO_BYTES),
+        BACKUP_HUGE_REPO_BYTES,
+        BACKUP_MAX_HUGE_REPOS,
+    )
+    pipeline = BackupPipeline(
+        token_mgr,
+        date_prefix,
+        StorageBudget(BACKUP_STORAGE_BUDGET_BYTES),
+        previous,
+        checkpoint=checkpoint,
+        controller=controller,
+        **workers,
+    )
+    # Entries go to the manifest spool as they are known, not into
+    # an in-memory list.
+    writer = ManifestWriter()
+    metadata_writer = ManifestWriter()
+    # Metadata comes from the GitHub API, not git, so it is exported
+    # while the pipeline runs.
+    exporter = ThreadPoolExecutor(max_workers=1)
+
+    def on_result(entry: Dict[str, Any]) -> None:
+        writer.add(entry)
+        stats.add(entry)
+
     try:
-        json.dump(manifest, manifest_tmp, indent=2)
-        manifest_tmp.close()
-        upload_to_s3(
-            manifest_tmp.name,
-            S3_BUCKET,
-            f"github-backup/{date_prefix}/manifest.json",
+        for entry in done.values():
+            writer.add(entry)
+        metadata_export = None
+        if BACKUP_METADATA:
+            metadata_export = exporter.submit(
+                export_metadata,
+                metadata_repos,
+                token_mgr,
+                S3_BUCKET,
+                date_prefix,
+                load_previous_metadata(S3_BUCKET, previous_summary),
+                metadata_writer,
+            )
+        checkpoint.start()
+        if controller is not None:
+            controller.start()
+        try:
+            pipeline.run(changed, on_result)
+        finally:
+            checkpoint.close()
+            if controller is not None:
+                controller.close()
+        failed = writer.failed
+        success_count = writer.success_count
+
+        # 5. Write manifest: the JSON Lines entries, then the summary
+        summary: Dict[str, Any] = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "date": date_prefix,
+            "total_repos": len(repos),
+            "success_count": success_count,
+            "failure_count": len(failed),
+            "reused_count": len(reused),
+            "resumed_count": len(resumed),
+            "stats": stats.summary(),
+        }
+        if controller is not None:
+            summary["concurrency"] = controller.summary()
+        manifest_name, metadata_name = "manifest", "metadata.jsonl"
+        if shard is not None:
+            summary["shard"] = shard
+            manifest_name = shard_key(shard, BACKUP_SHARD_COUNT, manifest_name)
+            metadata_name = shard_key(shard, BACKUP_SHARD_COUNT, metadata_name)
+        if metadata_export is not None:
+            counts = metadata_export.result()
+            metadata_key = f"github-backup/{date_prefix}/{metadata_name}"
+            metadata_writer.upload_entries(S3_BUCKET, metadata_key)
+            summary["metadata"] = {
+                "repos_key": metadata_key,
+                "success_count": metadata_writer.success_count,
+                "failure_count": len(metadata_writer.failed),
+                "counts": counts,
+            }
+        writer.upload(
+            S3_BUCKET, f"github-backup/{date_prefix}/{manifest_name}", summary
         )
     finally:
-        os.unlink(manifest_tmp.name)
+        exporter.shutdown(cancel_futures=True)
+        writer.close()
+        metadata_writer.close()
+        token_mgr.close()
+    unfinished = 0
+    if shard is not None:
+        merged = merge_shard_manifests(S3_BUCKET, date_prefix)
+        if merged is not None:
+            unfinished = merged.get("unfinished_count", 0)
 
-    # 6. Publish CloudWatch metrics
-    publish_metrics(len(results), 0)
+    # 6. Publish CloudWatch metrics.  A failed metadata export counts as
+    # a failure too: that repo's issues or releases are not backed up,
+    # and so do the repos of shards that stalled.
+    publish_metrics(
+        success_count,
+        len(failed) + len(metadata_writer.failed) + unfinished,
+        stats.metric_data(),
+    )
 
     # 7. Report
-    LOG.info("Backup complete: %d repos backed up", len(results))
+    LOG.info(
+        "Backup complete: %d repos backed up (%d unchanged, bundle reused; "
+        "%d from an earlier run today), %d failed",
+        success_count,
+        len(reused),
+        len(resumed),
+        len(failed),
+    )
+    if failed:
+        LOG.error("Failed repositories: %s", ", ".join(failed))
+    if metadata_writer.failed:
+        LOG.error("Failed metadata exports: %s", ", ".join(metadata_writer.failed))
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="GitHub organization backup runner.")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="print which repos would be backed up, and exit",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check that a backup's bundles are intact, and exit",
+    )
+    parser.add_argument(
+        "--date",
+        metavar="YYYY-MM-DD",
+        help="backup to check with --verify (default: the latest)",
+    )
+    args = parser.parse_args()
+    if args.plan:
+        plan()
+    elif args.verify:
+        if verify(args.date):
+            raise SystemExit(1)
+    else:
+        main()
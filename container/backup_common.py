@@ -0,0 +1,398 @@
+"""
+Code shared by the backup runner and the restore tool.
+
+Everything that reads what ``backup.py`` writes lives here, so that
+``backup.py --verify`` and ``restore.py`` agree with it on the bucket
+layout and the manifest format, and rebuild a repository from its
+bundles the same way.  Unlike ``backup.py``, importing this module
+needs no environment variables.
+"""
+
+import hashlib
+import json
+import math
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+# Prefixes under github-backup/ that are not backup dates
+UNDATED_PREFIXES = ("objects", "assets", "blobs", "lfs")
+
+# Large blobs downloaded into a repository at once
+_BLOB_WRITE_WORKERS = 8
+
+_S3_CLIENT = None
+_S3_CLIENT_LOCK = threading.Lock()
+
+
+# ── S3 ──────────────────────────────────────────────────────────
+
+
+def get_s3_client(pool_size: int = 10) -> Any:
+    """
+    Return the process-wide S3 client.
+
+    Created on first use; botocore clients are thread-safe once built,
+    so every worker shares one client and its HTTPS connection pool.
+
+    :param pool_size: Connections the client may keep open; set by the
+        first call.
+    :return: boto3 S3 client.
+    """
+    global _S3_CLIENT
+    with _S3_CLIENT_LOCK:
+        if _S3_CLIENT is None:
+            _S3_CLIENT = boto3.session.Session().client(
+                "s3",
+                config=Config(
+                    max_pool_connections=pool_size,
+                    retries={"max_attempts": 10, "mode": "adaptive"},
+                ),
+            )
+        return _S3_CLIENT
+
+
+def backup_dates(bucket: str) -> List[str]:
+    """
+    List the dated prefixes under ``github-backup/``.
+
+    A date is listed whether or not its run wrote a manifest.
+
+    :param bucket: S3 bucket name.
+    :return: ``YYYY-MM-DD`` dates, newest first.
+    """
+    dates = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix="github-backup/", Delimiter="/"
+    ):
+        for prefix in page.get("CommonPrefixes", []):
+            name = prefix["Prefix"].split("/")[1]
+            if name not in UNDATED_PREFIXES:
+                dates.append(name)
+    return sorted(dates, reverse=True)
+
+
+def blob_key(oid: str) -> str:
+    """
+    Return the S3 key of a large blob stored apart from its bundle.
+
+    :param oid: Git object ID of the blob.
+    :return: Key under ``github-backup/blobs/``.
+    """
+    return f"github-backup/blobs/{oid[:2]}/{oid}"
+
+
+def lfs_object_key(oid: str) -> str:
+    """
+    Return the S3 key of a Git LFS object.
+
+    :param oid: LFS object ID (SHA-256 of the content).
+    :return: Key under ``github-backup/lfs/``.
+    """
+    return f"github-backup/lfs/{oid[:2]}/{oid}"
+
+
+# ── Manifests ───────────────────────────────────────────────────
+
+
+def iter_manifest_entries(
+    bucket: str,
+    manifest: Dict[str, Any],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the repo entries of a manifest, streaming them from S3.
+
+    :param bucket: S3 bucket name.
+    :param manifest: Manifest summary (``manifest.json``).  Manifests
+        written before entries moved to JSON Lines embed them as
+        ``repos``.
+    :return: Iterator of manifest entries.
+    """
+    if "repos" in manifest:
+        yield from manifest["repos"]
+        return
+    response = get_s3_client().get_object(Bucket=bucket, Key=manifest["repos_key"])
+    for line in response["Body"].iter_lines():
+        if line:
+            yield json.loads(line)
+
+
+def bundle_objects(entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    List the stored bundles a restore of a manifest entry needs.
+
+    :param entry: Manifest entry of a backed-up repo.
+    :return: Its delta chain, oldest first, or its single bundle; each
+        with ``s3_key``, ``size_bytes`` and the recorded ``sha256`` and
+        ``checksum_sha256`` (None for bundles written before they were
+        recorded), plus ``blobs_key`` or ``lfs_key`` if its policy
+        stored objects apart from it.
+    """
+    if entry.get("chain"):
+        return entry["chain"]
+    keys = ("s3_key", "size_bytes", "sha256", "checksum_sha256")
+    return [
+        {
+            **{key: entry.get(key) for key in keys},
+            **{key: entry[key] for key in ("blobs_key", "lfs_key") if key in entry},
+        }
+    ]
+
+
+def load_object_lists(bucket: str, keys: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Merge the blob or LFS object lists stored next to a chain's bundles.
+
+    :param bucket: S3 bucket name.
+    :param keys: ``blobs_key`` or ``lfs_key`` values of the chain.
+    :return: ``oid`` and ``size`` of each object, once per ``oid``.
+    """
+    objects = {}
+    for key in keys:
+        response = get_s3_client().get_object(Bucket=bucket, Key=key)
+        for obj in json.loads(response["Body"].read()):
+            objects[obj["oid"]] = obj
+    return [objects[oid] for oid in sorted(objects)]
+
+
+def chain_objects(bucket: str, entry: Dict[str, Any], key: str) -> List[Dict[str, Any]]:
+    """
+    Load the objects a repo's policy stored apart from its bundles.
+
+    :param bucket: S3 bucket name.
+    :param entry: Manifest entry.
+    :param key: ``blobs_key`` (large blobs) or ``lfs_key`` (LFS objects).
+    :return: ``oid`` and ``size`` of each object, once per ``oid``.
+    """
+    chain = bundle_objects(entry)
+    return load_object_lists(bucket, [obj[key] for obj in chain if obj.get(key)])
+
+
+# ── Rebuilding a repository ─────────────────────────────────────
+
+
+def git(*args: str, cwd: Optional[str] = None) -> str:
+    """
+    Run a git command.
+
+    :param args: git arguments.
+    :param cwd: Working directory.
+    :return: Standard output.
+    :raises subprocess.CalledProcessError: If git fails.
+    """
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def write_stored_blobs(bucket: str, repo_dir: str, blobs: List[Dict[str, Any]]) -> None:
+    """
+    Download large blobs into a repository, checking each one's ID.
+
+    A filtered bundle can only be fetched into a repository that
+    already has the blobs it leaves out.
+
+    :param bucket: S3 bucket name.
+    :param repo_dir: Repository to write the blobs to.
+    :param blobs: Blobs from :func:`load_object_lists`.
+    :raises RuntimeError: If a stored blob does not match its ID.
+    """
+
+    def write(blob: Dict[str, Any]) -> None:
+        body = get_s3_client().get_object(Bucket=bucket, Key=blob_key(blob["oid"]))[
+            "Body"
+        ]
+        with subprocess.Popen(
+            ["git", "hash-object", "-w", "--stdin"],
+            cwd=repo_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        ) as proc:
+            for chunk in body.iter_chunks(1024 * 1024):
+                proc.stdin.write(chunk)
+            proc.stdin.close()
+            oid = proc.stdout.read().decode().strip()
+        if proc.returncode or oid != blob["oid"]:
+            raise RuntimeError(f"Stored blob {blob['oid']} does not match its ID")
+
+    with ThreadPoolExecutor(max_workers=_BLOB_WRITE_WORKERS) as pool:
+        list(pool.map(write, blobs))
+
+
+def file_sha256(path: str) -> str:
+    """
+    Hash a file.
+
+    :param path: File path.
+    :return: SHA-256 of its contents, in hex.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_bundle(
+    bucket: str, obj: Dict[str, Any], path: str, config: TransferConfig
+) -> int:
+    """
+    Download a bundle, decompressing it if it is stored with zstd.
+
+    :param bucket: S3 bucket name.
+    :param obj: Bundle from :func:`bundle_objects`.
+    :param path: Where to write the (uncompressed) bundle.
+    :param config: Ranged-GET settings of the download.
+    :return: Bytes downloaded.
+    :raises RuntimeError: If the bundle does not match its recorded
+        SHA-256.
+    """
+    s3_key = obj["s3_key"]
+    target = f"{path}.zst" if s3_key.endswith(".zst") else path
+    get_s3_client().download_file(bucket, s3_key, target, Config=config)
+    nbytes = os.path.getsize(target)
+    if obj.get("sha256") and file_sha256(target) != obj["sha256"]:
+        raise RuntimeError(f"SHA-256 of {s3_key} does not match")
+    if target != path:
+        subprocess.run(
+            ["zstd", "-d", "-q", "-f", "--rm", "-o", path, target],
+            check=True,
+            capture_output=True,
+        )
+    return nbytes
+
+
+def set_refs(mirror_dir: str, refs: Dict[str, str]) -> None:
+    """
+    Make a mirror's refs exactly those recorded in the manifest.
+
+    Delta bundles leave out refs that did not change and cannot carry
+    deletions, so after applying a chain the refs are set explicitly.
+
+    :param mirror_dir: Path to the bare mirror.
+    :param refs: Ref name to object ID.
+    """
+    current = git("for-each-ref", "--format=%(refname)", cwd=mirror_dir).split()
+    commands = [f"delete {name}" for name in current if name not in refs]
+    commands += [f"update {name} {oid}" for name, oid in sorted(refs.items())]
+    subprocess.run(
+        ["git", "update-ref", "--stdin"],
+        cwd=mirror_dir,
+        input="\n".join(commands) + "\n",
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def set_head(mirror_dir: str, bundle: str) -> None:
+    """
+    Point ``HEAD`` at the branch a bundle's ``HEAD`` is on, as ``git
+    clone`` would.
+
+    :param mirror_dir: Path to the bare mirror.
+    :param bundle: Path to the (full) bundle.
+    """
+    heads = dict(
+        reversed(line.split(" ", 1))
+        for line in git("bundle", "list-heads", bundle).splitlines()
+    )
+    branches = sorted(
+        name
+        for name, oid in heads.items()
+        if name.startswith("refs/heads/") and oid == heads.get("HEAD")
+    )
+    for name in ("refs/heads/main", "refs/heads/master", *branches):
+        if name in branches:
+            git("symbolic-ref", "HEAD", name, cwd=mirror_dir)
+            return
+
+
+def materialize_repo(
+    bucket: str,
+    entry: Dict[str, Any],
+    repo_dir: str,
+    work_dir: str,
+    config: TransferConfig,
+    verify_bundles: bool = False,
+) -> Dict[str, Any]:
+    """
+    Rebuild a bare repository from a manifest entry's bundles.
+
+    The repository is created empty, the large blobs a filtered
+    bundle leaves out are written to it, and the full bundle and its
+    deltas are fetched in order.  ``HEAD`` follows the full bundle's,
+    and after a delta chain the refs are set to those the manifest
+    recorded.  Each bundle is checked against its recorded SHA-256
+    and deleted once applied.  LFS objects are left to the caller.
+
+    :param bucket: S3 bucket name.
+    :param entry: Manifest entry of a backed-up repo.
+    :param repo_dir: Path of the new bare repository.
+    :param work_dir: Directory for the downloaded bundles.
+    :param config: Ranged-GET settings of the downloads.
+    :param verify_bundles: Also run ``git bundle verify`` on each
+        bundle before fetching it.
+    :return: ``bytes`` downloaded and the seconds spent in each
+        ``phases`` (``download`` and ``restore``).
+    :raises RuntimeError: If a bundle or blob does not match the
+        manifest.
+    :raises subprocess.CalledProcessError: If git rejects a bundle.
+    """
+    result: Dict[str, Any] = {"bytes": 0, "phases": {"download": 0.0, "restore": 0.0}}
+
+    def add_phase(phase: str, start: float) -> None:
+        result["phases"][phase] += time.monotonic() - start
+
+    git("init", "--quiet", "--bare", repo_dir)
+    blobs = chain_objects(bucket, entry, "blobs_key")
+    if blobs:
+        start = time.monotonic()
+        write_stored_blobs(bucket, repo_dir, blobs)
+        result["bytes"] += sum(blob["size"] for blob in blobs)
+        add_phase("download", start)
+
+    for index, obj in enumerate(bundle_objects(entry)):
+        bundle = os.path.join(work_dir, f"{index}.bundle")
+        start = time.monotonic()
+        result["bytes"] += download_bundle(bucket, obj, bundle, config)
+        add_phase("download", start)
+
+        start = time.monotonic()
+        if verify_bundles:
+            git("bundle", "verify", "--quiet", bundle, cwd=repo_dir)
+        git("fetch", "--quiet", bundle, "+refs/*:refs/*", cwd=repo_dir)
+        if index == 0:
+            set_head(repo_dir, bundle)
+        os.unlink(bundle)
+        add_phase("restore", start)
+
+    if entry.get("chain") and entry.get("refs"):
+        set_refs(repo_dir, entry["refs"])
+    return result
+
+
+# ── Statistics ──────────────────────────────────────────────────
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return a nearest-rank percentile.
+
+    :param values: Sample values (need not be sorted).
+    :param fraction: Percentile as a fraction, e.g. 0.95.
+    :return: The percentile, or 0.0 for no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
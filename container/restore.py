@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Restore GitHub repositories from a dated backup.
+
+Reads the manifest of one day (the latest by default), downloads the
+bundles of the selected repos and turns each into a bare mirror under
+the destination directory, several repos at a time.  Optionally pushes
+every restored mirror to a new remote.  Handles everything the backup
+runner writes: bundles reused from earlier days, content-addressed
+bundles, delta chains, zstd-compressed bundles, and the large blobs and
+LFS objects that repo policies store apart from the bundles.
+
+Each bundle is downloaded with parallel ranged GETs (boto3's managed
+transfer), so one large repo is not limited to a single connection's
+throughput.  A repo whose destination already exists is skipped, so an
+interrupted restore can simply be run again.
+
+The report gives per-phase timings and throughput; ``--report`` saves
+it, with every repo's result, as JSON.
+
+Requires git and, for compressed bundles, zstd on the PATH (and git-lfs
+to push LFS objects).  AWS
+credentials and region come from the environment, as for the AWS CLI.
+
+Usage::
+
+    python restore.py --bucket BUCKET --dest ./restored
+    python restore.py --bucket BUCKET --date 2026-04-16 --repo 'your-org/api-*' \\
+        --push-url 'git@github.com:new-org/{name}.git' --workers 16
+"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+from infrahouse_core.logging import setup_logging
+
+from backup_common import (
+    backup_dates,
+    chain_objects,
+    file_sha256,
+    get_s3_client,
+    git,
+    iter_manifest_entries,
+    lfs_object_key,
+    materialize_repo,
+    percentile,
+)
+
+LOG = logging.getLogger(__name__)
+setup_logging(LOG)
+
+_PHASES = ("download", "restore", "push")
+
+# LFS objects of one repo downloaded at a time
+_LFS_DOWNLOAD_WORKERS = 8
+
+
+def latest_backup_date(bucket: str) -> str:
+    """
+    Return the most recent date that has a complete manifest.
+
+    :param bucket: S3 bucket name.
+    :return: ``YYYY-MM-DD``.
+    :raises RuntimeError: If the bucket holds no complete backup.
+    """
+    client = get_s3_client()
+    for date in backup_dates(bucket):
+        try:
+            client.head_object(Bucket=bucket, Key=f"github-backup/{date}/manifest.json")
+        except ClientError:
+            continue
+        return date
+    raise RuntimeError(f"No complete backup in s3://{bucket}/github-backup/")
+
+
+def load_manifest(bucket: str, date: str) -> Dict[str, Any]:
+    """
+    Load the manifest summary of a backup date.
+
+    :param bucket: S3 bucket name.
+    :param date: ``YYYY-MM-DD`` of the backup.
+    :return: Contents of ``manifest.json``.
+    """
+    key = f"github-backup/{date}/manifest.json"
+    response = get_s3_client().get_object(Bucket=bucket, Key=key)
+    return json.loads(response["Body"].read())
+
+
+def select_entries(
+    entries: Iterator[Dict[str, Any]], patterns: Optional[List[str]]
+) -> List[Dict[str, Any]]:
+    """
+    Keep the entries of the repos matching any of the glob patterns.
+
+    :param entries: Manifest entries.
+    :param patterns: ``fnmatch`` patterns on ``org/repo``; None for all.
+    :return: Matching entries, largest repo first.
+    """
+    selected = [
+        entry
+        for entry in entries
+        if not patterns
+        or any(fnmatch.fnmatchcase(entry["repo"], pattern) for pattern in patterns)
+    ]
+    return sorted(selected, key=lambda e: -e.get("size_bytes", 0))
+
+
+def download_lfs_objects(
+    bucket: str, repo_dir: str, objects: List[Dict[str, Any]], config: TransferConfig
+) -> int:
+    """
+    Download LFS objects to where git-lfs keeps them in a bare repo.
+
+    Each object is checked against its pointer's size and SHA-256
+    before it is moved into place, so git-lfs never pushes a corrupt
+    one.
+
+    :param bucket: S3 bucket name.
+    :param repo_dir: Path to the bare repository.
+    :param objects: Objects from :func:`backup_common.chain_objects`.
+    :param config: Ranged-GET settings of the downloads.
+    :return: Bytes downloaded.
+    :raises RuntimeError: If a stored object does not match its pointer.
+    """
+
+    def download(obj: Dict[str, Any]) -> int:
+        oid = obj["oid"]
+        path = os.path.join(repo_dir, "lfs", "objects", oid[:2], oid[2:4], oid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.partial"
+        get_s3_client().download_file(
+            bucket, lfs_object_key(oid), partial_path, Config=config
+        )
+        size = os.path.getsize(partial_path)
+        if size != obj["size"] or file_sha256(partial_path) != oid:
+            os.unlink(partial_path)
+            raise RuntimeError(f"Stored LFS object {oid} does not match its pointer")
+        os.replace(partial_path, path)
+        return size
+
+    with ThreadPoolExecutor(max_workers=_LFS_DOWNLOAD_WORKERS) as pool:
+        return sum(pool.map(download, objects))
+
+
+def push_url(template: str, full_name: str) -> str:
+    """
+    Expand a ``--push-url`` template for a repository.
+
+    :param template: URL with ``{repo}`` (``org/repo``), ``{org}`` and
+        ``{name}`` placeholders.
+    :param full_name: ``org/repo``.
+    :return: Remote URL.
+    """
+    org, name = full_name.split("/", 1)
+    return template.format(repo=full_name, org=org, name=name)
+
+
+def add_phase(result: Dict[str, Any], phase: str, start: float) -> None:
+    """
+    Add the time since ``start`` to a phase of a restore result.
+
+    :param result: Result of :func:`restore_repo`.
+    :param phase: One of ``_PHASES``.
+    :param start: ``time.monotonic()`` when the phase started.
+    """
+    seconds = result["phases"].get(phase, 0) + time.monotonic() - start
+    result["phases"][phase] = round(seconds, 3)
+
+
+def restore_repo(entry: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Restore one repository into ``<dest>/<org>/<repo>.git``.
+
+    The mirror is rebuilt from its bundles the way ``--verify`` checks
+    them (see :func:`backup_common.materialize_repo`): large blobs
+    first, then the full bundle and its deltas, with ``HEAD`` as it was
+    backed up.  LFS objects go where git-lfs looks for them, and are
+    pushed before the refs.  A failed restore leaves no destination
+    behind.
+
+    :param entry: Manifest entry.
+    :param args: Command-line arguments.
+    :return: Result with status, bytes and per-phase seconds.
+    """
+    full_name = entry["repo"]
+    dest = os.path.join(args.dest, f"{full_name}.git")
+    result: Dict[str, Any] = {"repo": full_name, "bytes": 0, "phases": {}}
+    if os.path.exists(dest):
+        LOG.info("%s is already restored in %s, skipping", full_name, dest)
+        return {**result, "status": "skipped"}
+
+    config = TransferConfig(
+        multipart_threshold=args.part_size_mb * 1024**2,
+        multipart_chunksize=args.part_size_mb * 1024**2,
+        max_concurrency=args.download_concurrency,
+    )
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        with tempfile.TemporaryDirectory(dir=args.dest, prefix=".restore-") as tmp:
+            rebuilt = materialize_repo(args.bucket, entry, dest, tmp, config)
+        result["bytes"] += rebuilt["bytes"]
+        result["phases"] = {
+            phase: round(seconds, 3) for phase, seconds in rebuilt["phases"].items()
+        }
+        lfs_objects = chain_objects(args.bucket, entry, "lfs_key")
+        if lfs_objects:
+            start = time.monotonic()
+            result["bytes"] += download_lfs_objects(
+                args.bucket, dest, lfs_objects, config
+            )
+            add_phase(result, "download", start)
+
+        if args.push_url:
+            start = time.monotonic()
+            if lfs_objects:
+                git(
+                    "lfs", "push", "--all", push_url(args.push_url, full_name), cwd=dest
+                )
+            git(
+                "push",
+                "--mirror",
+                "--quiet",
+                push_url(args.push_url, full_name),
+                cwd=dest,
+            )
+            add_phase(result, "push", start)
+    except (
+        subprocess.CalledProcessError,
+        OSError,
+        RuntimeError,
+        ClientError,
+        BotoCoreError,
+        boto3.exceptions.Boto3Error,
+    ) as err:
+        shutil.rmtree(dest, ignore_errors=True)
+        error = getattr(err, "stderr", None) or str(err)
+        LOG.error("Failed to restore %s: %s", full_name, str(error).strip())
+        return {**result, "status": "failed", "error": str(error).strip()}
+    except Exception:
+        shutil.rmtree(dest, ignore_errors=True)
+        raise
+
+    LOG.info("Restored %s (%d bytes)", full_name, result["bytes"])
+    return {**result, "status": "ok"}
+
+
+def run_restore(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Restore the selected repos of a backup date.
+
+    :param args: Command-line arguments.
+    :return: Report with totals, phase statistics and every result.
+    """
+    get_s3_client(args.workers * args.download_concurrency + 10)
+    date = args.date or latest_backup_date(args.bucket)
+    manifest = load_manifest(args.bucket, date)
+    entries = select_entries(iter_manifest_entries(args.bucket, manifest), args.repo)
+    backed_up = [e for e in entries if e.get("status") != "failed"]
+    LOG.info(
+        "Restoring %d repositories from %s (%d matching repos failed to back up "
+        "that day) with %d workers",
+        len(backed_up),
+        date,
+        len(entries) - len(backed_up),
+        args.workers,
+    )
+
+    os.makedirs(args.dest, exist_ok=True)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda e: restore_repo(e, args), backed_up))
+    wall = time.monotonic() - start
+
+    nbytes = sum(r["bytes"] for r in results)
+    phases = {}
+    for phase in _PHASES:
+        values = [r["phases"][phase] for r in results if phase in r["phases"]]
+        if values:
+            phases[phase] = {
+                "p50_seconds": percentile(values, 0.5),
+                "p95_seconds": percentile(values, 0.95),
+                "total_seconds": round(sum(values), 3),
+            }
+    return {
+        "date": date,
+        "restored_count": sum(1 for r in results if r["status"] == "ok"),
+        "skipped_count": sum(1 for r in results if r["status"] == "skipped"),
+        "failure_count": sum(1 for r in results if r["status"] == "failed"),
+        "not_backed_up": [e["repo"] for e in entries if e.get("status") == "failed"],
+        "bytes_downloaded": nbytes,
+        "wall_seconds": round(wall, 3),
+        "throughput_mib_per_second": round(nbytes / 1024**2 / wall, 3) if wall else 0,
+        "phases": phases,
+        "repos": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Print a human-readable summary of a restore report.
+
+    :param report: Report from :func:`run_restore`.
+    """
+    print()
+    print(
+        f"Repositories:   {report['restored_count']} restored, "
+        f"{report['skipped_count']} already there, {report['failure_count']} failed"
+    )
+    print(f"Downloaded:     {report['bytes_downloaded'] / 1024**2:.1f} MiB")
+    print(f"Wall time:      {report['wall_seconds']:.1f} s")
+    print(f"Throughput:     {report['throughput_mib_per_second']:.1f} MiB/s")
+    for phase, stats in report["phases"].items():
+        print(
+            f"  {phase:<8} p50 {stats['p50_seconds']:8.3f} s  "
+            f"p95 {stats['p95_seconds']:8.3f} s  total {stats['total_seconds']:9.1f} s"
+        )
+    for result in report["repos"]:
+        if result["status"] == "failed":
+            print(f"Failed:         {result['repo']}: {result['error']}")
+    if report["not_backed_up"]:
+        print(f"Not backed up:  {', '.join(report['not_backed_up'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Parse arguments, restore and report.
+
+    Exits with status 1 if any repo failed to restore.
+
+    :param argv: Command-line arguments (default: ``sys.argv``).
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--bucket",
+        default=os.environ.get("S3_BUCKET"),
+        required="S3_BUCKET" not in os.environ,
+        help="backup bucket (default: $S3_BUCKET)",
+    )
+    parser.add_argument(
+        "--date", help="backup date, YYYY-MM-DD (default: the latest complete one)"
+    )
+    parser.add_argument(
+        "--repo",
+        action="append",
+        help="restore only repos matching this glob, e.g. 'your-org/api-*' "
+        "(repeatable; default: every repo)",
+    )
+    parser.add_argument(
+        "--dest", default="restored", help="directory of the restored mirrors"
+    )
+    parser.add_argument(
+        "--push-url",
+        help="push every restored mirror here; {repo}, {org} and {name} are "
+        "replaced, e.g. 'git@github.com:new-org/{name}.git'",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="repos restored at the same time"
+    )
+    parser.add_argument(
+        "--download-concurrency",
+        type=int,
+        default=8,
+        help="ranged GETs in flight per bundle download",
+    )
+    parser.add_argument(
+        "--part-size-mb", type=int, default=16, help="size of each ranged GET in MiB"
+    )
+    parser.add_argument("--report", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = run_restore(args)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as fp:
+            json.dump(report, fp, indent=2)
+    if report["failure_count"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,21 @@ resource "aws_ecs_task_definition" "backup" {
     size_in_gib = local.task_ephemeral_storage_gb
   }
 
+  dynamic "volume" {
+    for_each = var.mirror_cache_enabled ? [1] : []
+    content {
+      name = "mirror-cache"
+      efs_volume_configuration {
+        file_system_id     = aws_efs_file_system.mirror_cache[0].id
+        transit_encryption = "ENABLED"
+        authorization_config {
+          access_point_id = aws_efs_access_point.mirror_cache[0].id
+          iam             = "ENABLED"
+        }
+      }
+    }
+  }
+
   container_definitions = jsonencode([
     {
       name      = "github-backup"
@@ -48,12 +63,152 @@ resource "aws_ecs_task_definition" "backup" {
           name  = "S3_BUCKET"
           value = module.backup_bucket.bucket_name
         },
+        {
+          name  = "GITHUB_API_CONCURRENCY"
+          value = tostring(var.github_api_concurrency)
+        },
         {
           name  = "AWS_DEFAULT_REGION"
           value = data.aws_region.current.name
         },
+        {
+          name  = "BACKUP_CONCURRENCY"
+          value = tostring(var.backup_concurrency)
+        },
+        {
+          name  = "BACKUP_CLONE_WORKERS"
+          value = tostring(local.backup_stage_workers.clone)
+        },
+        {
+          name  = "BACKUP_BUNDLE_WORKERS"
+          value = tostring(local.backup_stage_workers.bundle)
+        },
+        {
+          name  = "BACKUP_UPLOAD_WORKERS"
+          value = tostring(local.backup_stage_workers.upload)
+        },
+        {
+          name  = "BACKUP_ADAPTIVE_CONCURRENCY"
+          value = tostring(var.adaptive_concurrency)
+        },
+        {
+          name  = "BACKUP_MAX_REPOS_IN_FLIGHT"
+          value = tostring(local.max_repos_in_flight)
+        },
+        {
+          name  = "BACKUP_MAX_ATTEMPTS"
+          value = tostring(var.backup_max_attempts)
+        },
+        {
+          name  = "BACKUP_HUGE_REPO_GB"
+          value = tostring(var.huge_repo_threshold_gb)
+        },
+        {
+          name  = "BACKUP_MAX_HUGE_REPOS"
+          value = tostring(var.max_concurrent_huge_repos)
+        },
+        {
+          name  = "BACKUP_STORAGE_BUDGET_GB"
+          value = tostring(local.backup_storage_budget_gb)
+        },
+        {
+          name  = "BACKUP_INCREMENTAL"
+          value = tostring(var.incremental_backups)
+        },
+        {
+          name  = "BACKUP_REF_FINGERPRINTS"
+          value = tostring(var.ref_fingerprints)
+        },
+        {
+          name  = "BACKUP_REUSE_MAX_AGE_DAYS"
+          value = tostring(local.backup_reuse_max_age_days)
+        },
+        {
+          name  = "BACKUP_DELTA_BUNDLES"
+          value = tostring(var.delta_bundles)
+        },
+        {
+          name  = "BACKUP_DELTA_FULL_INTERVAL_DAYS"
+          value = tostring(var.delta_full_interval_days)
+        },
+        {
+          name  = "BACKUP_STREAM_BUNDLES"
+          value = tostring(var.stream_bundles)
+        },
+        {
+          name  = "BACKUP_S3_PART_SIZE_MB"
+          value = tostring(var.s3_part_size_mb)
+        },
+        {
+          name  = "BACKUP_S3_MAX_CONCURRENCY"
+          value = tostring(var.s3_max_concurrency)
+        },
+        {
+          name  = "BACKUP_PACK_THREADS"
+          value = var.pack_settings.threads == null ? "" : tostring(var.pack_settings.threads)
+        },
+        {
+          name  = "BACKUP_PACK_WINDOW"
+          value = var.pack_settings.window == null ? "" : tostring(var.pack_settings.window)
+        },
+        {
+          name  = "BACKUP_PACK_DEPTH"
+          value = var.pack_settings.depth == null ? "" : tostring(var.pack_settings.depth)
+        },
+        {
+          name  = "BACKUP_PACK_COMPRESSION"
+          value = var.pack_settings.compression == null ? "" : tostring(var.pack_settings.compression)
+        },
+        {
+          name  = "BACKUP_PACK_REUSE"
+          value = tostring(var.pack_settings.reuse)
+        },
+        {
+          name  = "BACKUP_BUNDLE_COMPRESSION"
+          value = var.bundle_compression
+        },
+        {
+          name  = "BACKUP_ZSTD_LEVEL"
+          value = tostring(var.zstd_level)
+        },
+        {
+          name  = "BACKUP_DEDUP_BUNDLES"
+          value = tostring(var.dedup_bundles)
+        },
+        {
+          name  = "BACKUP_REPO_POLICIES"
+          value = jsonencode(var.repo_policies)
+        },
+        {
+          name  = "BACKUP_METADATA"
+          value = tostring(var.metadata_backup)
+        },
+        {
+          name  = "BACKUP_VERIFY_SAMPLE"
+          value = tostring(var.verify_sample_size)
+        },
+        {
+          name  = "BACKUP_MIRROR_CACHE_DIR"
+          value = var.mirror_cache_enabled ? local.mirror_cache_path : ""
+        },
+        {
+          name  = "BACKUP_SHARD_COUNT"
+          value = tostring(var.shard_count)
+        },
+        {
+          name  = "BACKUP_SHARD_STRATEGY"
+          value = var.shard_strategy
+        },
       ]
 
+      mountPoints = var.mirror_cache_enabled ? [
+        {
+          sourceVolume  = "mirror-cache"
+          containerPath = local.mirror_cache_path
+          readOnly      = false
+        }
+      ] : []
+
       logConfiguration = {
         logDriver = "awslogs"
         options = {
@@ -65,5 +220,8 @@ resource "aws_ecs_task_definition" "backup" {
     }
   ])
 
+  # Tasks must not start before the file system is mountable
+  depends_on = [aws_efs_mount_target.mirror_cache]
+
   tags = local.all_tags
 }
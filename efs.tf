@@ -0,0 +1,101 @@
+# Persistent mirror cache (optional).
+#
+# Git mirrors are kept on EFS between runs, so each run only fetches what
+# changed since the last one instead of re-cloning every repository.
+# Mirrors can always be re-cloned from GitHub, so the file system holds no
+# data that is not also in the backup bucket.
+
+data "aws_subnet" "mirror_cache" {
+  for_each = var.mirror_cache_enabled ? toset(var.subnets) : toset([])
+  id       = each.value
+}
+
+resource "aws_efs_file_system" "mirror_cache" {
+  count = var.mirror_cache_enabled ? 1 : 0
+
+  creation_token   = "${var.service_name}-mirror-cache"
+  encrypted        = true
+  throughput_mode  = "elastic"
+  performance_mode = "generalPurpose"
+
+  # Mirrors of repos that are rarely pushed to are read once a run at
+  # most; Infrequent Access storage is much cheaper for them.
+  lifecycle_policy {
+    transition_to_ia = "AFTER_30_DAYS"
+  }
+
+  lifecycle_policy {
+    transition_to_primary_storage_class = "AFTER_1_ACCESS"
+  }
+
+  tags = merge(
+    {
+      Name = "${var.service_name} mirror cache"
+    },
+    local.all_tags,
+  )
+}
+
+resource "aws_security_group" "mirror_cache" {
+  count = var.mirror_cache_enabled ? 1 : 0
+
+  description = "NFS access to the ${var.service_name} mirror cache"
+  name_prefix = "${var.service_name}-efs-"
+  vpc_id      = data.aws_subnet.selected.vpc_id
+
+  tags = merge(
+    {
+      Name = "${var.service_name} mirror cache"
+    },
+    local.all_tags,
+  )
+}
+
+resource "aws_vpc_security_group_ingress_rule" "mirror_cache_nfs" {
+  count = var.mirror_cache_enabled ? 1 : 0
+
+  security_group_id            = aws_security_group.mirror_cache[0].id
+  description                  = "NFS from the ${var.service_name} Fargate task"
+  ip_protocol                  = "tcp"
+  from_port                    = 2049
+  to_port                      = 2049
+  referenced_security_group_id = aws_security_group.backup.id
+  tags = merge(
+    {
+      Name = "nfs from fargate"
+    },
+    local.all_tags,
+  )
+}
+
+# EFS allows one mount target per availability zone.
+resource "aws_efs_mount_target" "mirror_cache" {
+  for_each = local.mirror_cache_subnets
+
+  file_system_id  = aws_efs_file_system.mirror_cache[0].id
+  subnet_id       = each.value
+  security_groups = [aws_security_group.mirror_cache[0].id]
+}
+
+# The container runs as appuser (uid/gid 1000, see container/Dockerfile).
+resource "aws_efs_access_point" "mirror_cache" {
+  count = var.mirror_cache_enabled ? 1 : 0
+
+  file_system_id = aws_efs_file_system.mirror_cache[0].id
+
+  posix_user {
+    uid = 1000
+    gid = 1000
+  }
+
+  root_directory {
+    path = "/mirrors"
+    creation_info {
+      owner_uid   = 1000
+      owner_gid   = 1000
+      permissions = "0750"
+    }
+  }
+
+  tags = local.all_tags
+}
@@ -55,6 +55,43 @@ resource "aws_cloudwatch_event_target" "backup" {
   arn      = aws_ecs_cluster.backup.arn
   role_arn = aws_iam_role.eventbridge.arn
 
+  ecs_target {
+    task_definition_arn = aws_ecs_task_definition.backup.arn
+    task_count          = var.shard_count
+    launch_type         = "FARGATE"
+
+    network_configuration {
+      subnets          = var.subnets
+      security_groups  = [aws_security_group.backup.id]
+      assign_public_ip = data.aws_subnet.selected.map_public_ip_on_launch
+    }
+  }
+}
+
+# Optional second schedule that checks the latest backup instead of
+# taking one: same task definition, with --verify as its command.
+resource "aws_cloudwatch_event_rule" "verify" {
+  count               = var.verify_schedule_expression == null ? 0 : 1
+  name_prefix         = "${var.service_name}-verify-"
+  description         = "Schedule for GitHub backup verification"
+  schedule_expression = var.verify_schedule_expression
+  tags                = local.all_tags
+}
+
+resource "aws_cloudwatch_event_target" "verify" {
+  count    = var.verify_schedule_expression == null ? 0 : 1
+  rule     = aws_cloudwatch_event_rule.verify[0].name
+  arn      = aws_ecs_cluster.backup.arn
+  role_arn = aws_iam_role.eventbridge.arn
+  input = jsonencode({
+    containerOverrides = [
+      {
+        name    = "github-backup"
+        command = ["--verify"]
+      }
+    ]
+  })
+
   ecs_target {
     task_definition_arn = aws_ecs_task_definition.backup.arn
     task_count          = 1
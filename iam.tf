@@ -46,10 +46,11 @@ resource "aws_iam_role" "task" {
 }
 
 data "aws_iam_policy_document" "task_permissions" {
-  # S3 — upload backups
+  # S3 — upload backups, read earlier manifests (incremental mode)
   statement {
     actions = [
       "s3:PutObject",
+      "s3:GetObject",
       "s3:ListBucket",
       "s3:GetBucketLocation",
     ]
@@ -78,6 +79,22 @@ data "aws_iam_policy_document" "task_permissions" {
     }
   }
 
+  # EFS — read/write the persistent mirror cache through its access point
+  dynamic "statement" {
+    for_each = var.mirror_cache_enabled ? [1] : []
+    content {
+      actions = [
+        "elasticfilesystem:ClientMount",
+        "elasticfilesystem:ClientWrite",
+      ]
+      resources = [aws_efs_file_system.mirror_cache[0].arn]
+      condition {
+        test     = "StringEquals"
+        variable = "elasticfilesystem:AccessPointArn"
+        values   = [aws_efs_access_point.mirror_cache[0].arn]
+      }
+    }
+  }
 }
 
 resource "aws_iam_role_policy" "task" {
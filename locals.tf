@@ -5,6 +5,44 @@ locals {
   task_memory               = var.task_memory
   task_ephemeral_storage_gb = var.task_ephemeral_storage_gb
 
+  # Share of ephemeral storage the backup pipeline may fill with mirrors
+  # and bundles in flight. The rest is headroom for the container image,
+  # git temporary files and estimation error (repo sizes reported by the
+  # GitHub API are approximate).
+  backup_storage_budget_gb = floor(local.task_ephemeral_storage_gb * 0.8)
+
+  # Incremental and delta modes may point a manifest at an older day's
+  # bundle. Cap that age below backup_retention_days so the lifecycle
+  # rule never expires a bundle a current manifest still references.
+  backup_reuse_max_age_days = (
+    var.backup_retention_days > 0
+    ? min(30, var.backup_retention_days - 1)
+    : 30
+  )
+
+  backup_stage_workers = {
+    clone  = coalesce(var.backup_stage_concurrency.clone, var.backup_concurrency)
+    bundle = coalesce(var.backup_stage_concurrency.bundle, var.backup_concurrency)
+    upload = coalesce(var.backup_stage_concurrency.upload, var.backup_concurrency)
+  }
+
+  # Adaptive concurrency ceiling: one repo per quarter vCPU by default;
+  # the runner backs off earlier if memory or disk run short.
+  max_repos_in_flight = coalesce(
+    var.max_repos_in_flight,
+    max(4, floor(var.task_cpu / 256))
+  )
+
+  # Where the task mounts the EFS mirror cache (if enabled)
+  mirror_cache_path = "/mnt/mirror-cache"
+
+  # One subnet per availability zone for the EFS mount targets
+  mirror_cache_subnets = {
+    for az, ids in {
+      for s in data.aws_subnet.mirror_cache : s.availability_zone => s.id...
+    } : az => sort(ids)[0]
+  }
+
   # Auto-generate bucket name if not provided
   bucket_name = (
     var.s3_bucket_name != null
@@ -57,3 +57,8 @@ output "security_group_id" {
   description = "ID of the security group for the Fargate task."
   value       = aws_security_group.backup.id
 }
+
+output "mirror_cache_file_system_id" {
+  description = "ID of the EFS file system holding the mirror cache (null if disabled)."
+  value       = try(aws_efs_file_system.mirror_cache[0].id, null)
+}
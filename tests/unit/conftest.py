@@ -0,0 +1,151 @@
+"""
+Fixtures of the unit tests of the container's scripts.
+
+They run locally: S3 is mocked with moto and git repositories are
+created in temporary directories, so no AWS account or GitHub App is
+needed.
+"""
+
+import os
+import subprocess
+import threading
+import sys
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# backup.py reads its settings when it is imported
+os.environ.setdefault("GITHUB_APP_ID", "1")
+os.environ.setdefault("GITHUB_APP_INSTALLATION_ID", "2")
+os.environ.setdefault("GITHUB_APP_KEY_SECRET_ARN", "arn:aws:secretsmanager:test")
+os.environ.setdefault("S3_BUCKET", "github-backup-test")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+for role in ("AUTHOR", "COMMITTER"):
+    os.environ.setdefault(f"GIT_{role}_NAME", "Test")
+    os.environ.setdefault(f"GIT_{role}_EMAIL", "test@example.com")
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "container")
+)
+
+import backup_common  # noqa: E402
+
+BUCKET = os.environ["S3_BUCKET"]
+
+
+def git(cwd, *args):
+    """
+    Run a git command in a directory and return its output.
+    """
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit(repo_dir, name, content):
+    """
+    Commit a file to a work tree and return the new commit's ID.
+    """
+    with open(os.path.join(repo_dir, name), "wb") as f:
+        f.write(content)
+    git(repo_dir, "add", name)
+    git(repo_dir, "commit", "-q", "-m", f"Update {name}")
+    return git(repo_dir, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """
+    Mocked S3 with an empty backup bucket.
+    """
+    with mock_aws():
+        # The scripts share one client; make it one of this mock's
+        monkeypatch.setattr(backup_common, "_S3_CLIENT", None)
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def source_repo(tmp_path):
+    """
+    Work tree of a repository with one commit on ``main``.
+    """
+    repo_dir = str(tmp_path / "source")
+    subprocess.run(["git", "init", "-q", "-b", "main", repo_dir], check=True)
+    commit(repo_dir, "README.md", b"# Test\n")
+    return repo_dir
+
+
+@pytest.fixture
+def local_github(monkeypatch):
+    """
+    Make the backup runner clone repos from local paths instead of
+    GitHub.
+
+    Maps ``org/repo`` to the directory it is cloned from; a repo can
+    be pointed at another directory between runs.
+    """
+    import backup
+
+    sources = {}
+
+    def clone_mirror(repo, token_mgr, dest_dir, cache_dir=None, blob_limit=None):
+        mirror_dir = os.path.join(dest_dir, "mirror.git")
+        git(dest_dir, "clone", "-q", "--mirror", sources[repo["full_name"]], mirror_dir)
+        return mirror_dir
+
+    monkeypatch.setattr(backup, "clone_mirror", clone_mirror)
+    return sources
+
+
+@pytest.fixture
+def run_pipeline(s3, local_github):
+    """
+    Back up repos from ``local_github`` with BackupPipeline.
+
+    Returns a function that takes the repos, the run's date, the
+    previous run's entries, the token manager, the clone, bundle and
+    upload worker counts, and a checkpoint to record entries in.  It
+    returns the recorded entries by repo; with ``manifest``, it also
+    writes them as the day's manifest, as main does.
+    """
+    import backup
+
+    def run(
+        repos,
+        date_prefix="2026-10-14",
+        previous=None,
+        token_mgr=None,
+        workers=(1, 1, 1),
+        manifest=False,
+        checkpoint=None,
+    ):
+        pipeline = backup.BackupPipeline(
+            token_mgr,
+            date_prefix,
+            backup.StorageBudget(1024**3),
+            previous or {},
+            *workers,
+            checkpoint=checkpoint,
+        )
+        entries = {}
+        lock = threading.Lock()
+        writer = backup.ManifestWriter()
+
+        def on_result(entry):
+            with lock:
+                entries[entry["repo"]] = entry
+            writer.add(entry)
+
+        try:
+            pipeline.run(repos, on_result)
+            if manifest:
+                summary = {"date": date_prefix, "total_repos": writer.total}
+                writer.upload(BUCKET, f"github-backup/{date_prefix}/manifest", summary)
+        finally:
+            writer.close()
+        return entries
+
+    return run
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import backup
+from backup import Checkpoint
+from tests.unit.conftest import BUCKET, commit, git
+
+DATE = "2026-10-14"
+CHECKPOINT_KEY = f"github-backup/{DATE}/checkpoint.json"
+
+
+@pytest.fixture
+def checkpointing(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_CHECKPOINT_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(backup, "BACKUP_DEDUP_BUNDLES", True)
+    monkeypatch.setattr(backup, "BACKUP_REUSE_MAX_AGE_DAYS", 30)
+    monkeypatch.setattr(backup, "BACKUP_MAX_ATTEMPTS", 1)
+
+
+def run_with_checkpoint(run_pipeline, repos):
+    checkpoint = Checkpoint(BUCKET, DATE)
+    resumed = checkpoint.load()
+    checkpoint.start()
+    try:
+        todo = [repo for repo in repos if repo["full_name"] not in resumed]
+        entries = run_pipeline(todo, DATE, checkpoint=checkpoint)
+    finally:
+        checkpoint.close()
+    return resumed, entries
+
+
+def test_rerun_resumes_from_the_checkpoint(
+    s3, tmp_path, local_github, run_pipeline, monkeypatch, checkpointing
+):
+    """
+    A run stopped before its manifest is resumed on the same day: repos
+    whose bundles are in S3 are skipped, the others are backed up.
+    """
+    repos = []
+    for name in ("a", "b", "c"):
+        source = tmp_path / name
+        git(tmp_path, "init", "-q", "-b", "main", str(source))
+        commit(str(source), "README.md", f"{name}\n".encode())
+        local_github[f"org/{name}"] = str(source)
+        repos.append({"full_name": f"org/{name}"})
+
+    # The first run is stopped while org/c is still cloning
+    clone = backup.clone_mirror
+
+    def interrupted_clone(repo, *args, **kwargs):
+        if repo["full_name"] == "org/c":
+            raise RuntimeError("task stopped")
+        return clone(repo, *args, **kwargs)
+
+    monkeypatch.setattr(backup, "clone_mirror", interrupted_clone)
+    _, first = run_with_checkpoint(run_pipeline, repos)
+    body = s3.get_object(Bucket=BUCKET, Key=CHECKPOINT_KEY)["Body"].read()
+    assert sorted(entry["repo"] for entry in json.loads(body)) == ["org/a", "org/b"]
+
+    # Content-addressed bundles live outside the dated prefix, so the
+    # checkpoint must find them with HEAD requests; org/b's is gone.
+    assert all(
+        entry["s3_key"].startswith("github-backup/objects/")
+        for repo, entry in first.items()
+        if repo != "org/c"
+    )
+    s3.delete_object(Bucket=BUCKET, Key=first["org/b"]["s3_key"])
+
+    monkeypatch.setattr(backup, "clone_mirror", clone)
+    resumed, second = run_with_checkpoint(run_pipeline, repos)
+
+    assert list(resumed) == ["org/a"]
+    assert resumed["org/a"] == first["org/a"]
+    assert sorted(second) == ["org/b", "org/c"]
+    assert all("status" not in entry for entry in second.values())
+    body = s3.get_object(Bucket=BUCKET, Key=CHECKPOINT_KEY)["Body"].read()
+    assert sorted(entry["repo"] for entry in json.loads(body)) == [
+        "org/a",
+        "org/b",
+        "org/c",
+    ]
+    s3.head_object(Bucket=BUCKET, Key=second["org/b"]["s3_key"])
+
+
+def test_heartbeat_rewrites_an_unchanged_checkpoint(s3, monkeypatch):
+    """
+    An idle checkpoint is still rewritten once the heartbeat is due, so
+    a live task is told apart from a stalled one.
+    """
+    checkpoint = Checkpoint(BUCKET, DATE)
+    checkpoint.add({"repo": "org/a"})
+    checkpoint._flush()
+    s3.head_object(Bucket=BUCKET, Key=CHECKPOINT_KEY)
+
+    puts = []
+    client = backup.get_s3_client()
+    monkeypatch.setattr(client, "put_object", lambda **kwargs: puts.append(kwargs))
+    checkpoint._flush()
+    assert puts == [], "nothing changed and no heartbeat was due"
+
+    monkeypatch.setattr(backup, "_CHECKPOINT_HEARTBEAT_SECONDS", 0)
+    checkpoint._flush()
+    assert [put["Key"] for put in puts] == [CHECKPOINT_KEY]
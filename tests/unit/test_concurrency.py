@@ -0,0 +1,130 @@
+import pytest
+
+import backup
+from backup import ConcurrencyController, cpu_limit, cpu_seconds, memory_in_use
+
+MB = 1024**2
+
+
+@pytest.fixture(autouse=True)
+def two_cpus(monkeypatch):
+    monkeypatch.setattr(backup, "cpu_limit", lambda: 2.0)
+
+
+def sample(time, network_mb=0, cpu_seconds=0.0, memory=0.5, disk_free=0.5):
+    """A resource sample as sample_resources returns it."""
+    return {
+        "time": float(time),
+        "cpu_seconds": cpu_seconds,
+        "memory": memory,
+        "disk_free": disk_free,
+        "network_bytes": network_mb * MB,
+    }
+
+
+class Run:
+    """Feeds a controller one sample per window, every slot busy."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        # The first sample opens the first window
+        self.previous = sample(backup._ADAPTIVE_SAMPLE_SECONDS)
+        controller._adjust(sample(0), self.previous)
+
+    def fill(self):
+        while self.controller._in_flight < self.controller.limit:
+            self.controller.acquire()
+
+    def window(self, mb_per_second, seconds=60, cpu=0.5, **readings):
+        start = self.previous
+        current = sample(
+            start["time"] + seconds,
+            start["network_bytes"] / MB + mb_per_second * seconds,
+            start["cpu_seconds"] + cpu * 2 * seconds,
+            **readings,
+        )
+        self.controller._adjust(start, current)
+        self.previous = current
+        return self.controller.limit
+
+
+def test_limit_rises_while_throughput_does():
+    run = Run(ConcurrencyController(2, 4))
+    run.fill()
+    assert run.window(10) == 3
+    run.fill()
+    assert run.window(20) == 4
+    run.fill()
+    assert run.window(40) == 4, "capped at the maximum"
+    assert run.controller.summary()["peak"] == 4
+
+
+def test_limit_holds_once_throughput_levels_off():
+    run = Run(ConcurrencyController(2, 8))
+    run.fill()
+    assert run.window(10) == 3
+    run.fill()
+    # Less than 5% more than the window before: the step is taken back
+    assert run.window(10.2) == 2
+    # ... and the limit holds for _PLATEAU_HOLD_SECONDS
+    for _ in range(backup._PLATEAU_HOLD_SECONDS // 60 - 1):
+        assert run.window(10) == 2
+    assert run.window(10) == 3
+
+
+@pytest.mark.parametrize(
+    "busy, cpu",
+    [
+        # Some slot was idle
+        (False, 0.5),
+        # The CPUs were saturated
+        (True, 0.95),
+    ],
+)
+def test_limit_holds_without_a_comparable_window(busy, cpu):
+    run = Run(ConcurrencyController(2, 8))
+    if busy:
+        run.fill()
+    assert run.window(10, cpu=cpu) == 2
+
+
+@pytest.mark.parametrize(
+    "readings",
+    [{"memory": backup._MEMORY_HIGH}, {"disk_free": backup._DISK_FREE_LOW / 2}],
+)
+def test_limit_backs_off_under_pressure(readings):
+    run = Run(ConcurrencyController(4, 8))
+    run.fill()
+    assert run.window(10, **readings) == 3
+    assert run.controller.summary()["backoffs"] == 1
+
+    # Once repos finish, no new ones start until below the limit
+    run.controller.release()
+    run.controller.release()
+    assert run.window(10, **readings) == 1
+    assert run.controller.summary() == {
+        "initial": 4,
+        "final": 1,
+        "peak": 4,
+        "backoffs": 2,
+    }
+
+
+def test_no_memory_limit_reading_is_no_pressure():
+    run = Run(ConcurrencyController(2, 8))
+    run.fill()
+    assert run.window(10, memory=None) == 3
+
+
+def test_cgroup_v2_readings(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "_CGROUP_ROOT", str(tmp_path))
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    (tmp_path / "cpu.stat").write_text("usage_usec 2500000\nuser_usec 2000000\n")
+    (tmp_path / "memory.current").write_text(f"{600 * MB}\n")
+    (tmp_path / "memory.max").write_text(f"{1000 * MB}\n")
+    (tmp_path / "memory.stat").write_text(f"anon 1\ninactive_file {100 * MB}\n")
+
+    assert cpu_limit() == 1.5
+    assert cpu_seconds() == 2.5
+    # Inactive page cache does not count
+    assert memory_in_use() == 0.5
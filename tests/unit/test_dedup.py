@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import backup
+from backup import bundle_object_key, find_stored_object
+from tests.unit.conftest import BUCKET, commit, git
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_DEDUP_BUNDLES", True)
+    monkeypatch.setattr(backup, "BACKUP_REUSE_MAX_AGE_DAYS", 30)
+
+
+def mirror(source_repo, dest):
+    git(os.path.dirname(source_repo), "clone", "-q", "--mirror", source_repo, dest)
+    return dest
+
+
+def stored_objects(s3):
+    response = s3.list_objects_v2(Bucket=BUCKET, Prefix="github-backup/objects/")
+    return [obj["Key"] for obj in response.get("Contents", [])]
+
+
+def test_same_content_same_address(source_repo, tmp_path, dedup):
+    """Two mirrors of the same refs (say, a fork) share one address."""
+    first = bundle_object_key(mirror(source_repo, str(tmp_path / "a.git")))
+    second = bundle_object_key(mirror(source_repo, str(tmp_path / "b.git")))
+
+    assert first == second
+    prefix, fan_out, name = first.rsplit("/", 2)
+    assert prefix == "github-backup/objects"
+    assert name.startswith(fan_out)
+
+
+def test_address_follows_content(source_repo, tmp_path, dedup):
+    mirror_dir = mirror(source_repo, str(tmp_path / "a.git"))
+    key = bundle_object_key(mirror_dir)
+    base = git(mirror_dir, "rev-parse", "HEAD")
+
+    assert bundle_object_key(mirror_dir, exclude=[base]) != key
+    assert bundle_object_key(mirror_dir, blob_limit=1024) != key
+
+    commit(source_repo, "app.py", b"print('hello')\n")
+    git(mirror_dir, "fetch", "-q", source_repo, "+refs/*:refs/*")
+    assert bundle_object_key(mirror_dir) != key
+
+
+def test_identical_repo_is_stored_once(
+    s3, source_repo, local_github, dedup, run_pipeline
+):
+    local_github["org/app"] = source_repo
+    local_github["fork/app"] = source_repo
+
+    first = run_pipeline([{"full_name": "org/app"}])["org/app"]
+    second = run_pipeline([{"full_name": "fork/app"}])["fork/app"]
+
+    assert stored_objects(s3) == [first["s3_key"]]
+    assert second["s3_key"] == first["s3_key"]
+    assert second["deduplicated"] is True
+    assert second["size_bytes"] == first["size_bytes"]
+    assert not first.get("deduplicated")
+
+
+def test_changed_repo_gets_a_new_object(
+    s3, source_repo, local_github, dedup, run_pipeline
+):
+    local_github["org/app"] = source_repo
+    first = run_pipeline([{"full_name": "org/app"}])["org/app"]
+    commit(source_repo, "app.py", b"print('hello')\n")
+    second = run_pipeline([{"full_name": "org/app"}])["org/app"]
+
+    assert second["s3_key"] != first["s3_key"]
+    assert sorted(stored_objects(s3)) == sorted([first["s3_key"], second["s3_key"]])
+
+
+def test_old_object_is_not_referenced(
+    s3, source_repo, local_github, dedup, run_pipeline
+):
+    """An object the lifecycle rule may expire soon is written again."""
+    local_github["org/app"] = source_repo
+    entry = run_pipeline([{"full_name": "org/app"}])["org/app"]
+    written = entry["bundle_date"]
+
+    assert find_stored_object(BUCKET, entry["s3_key"], written) is not None
+    assert find_stored_object(BUCKET, entry["s3_key"], "2099-01-01") is None
+    assert find_stored_object(BUCKET, "github-backup/objects/00/none", written) is None
@@ -0,0 +1,54 @@
+import pytest
+
+import backup
+from backup import delta_chain
+
+
+@pytest.fixture(autouse=True)
+def delta_settings(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_DELTA_FULL_INTERVAL_DAYS", 7)
+    monkeypatch.setattr(backup, "BACKUP_DELTA_MAX_CHAIN", 3)
+    monkeypatch.setattr(backup, "BACKUP_REUSE_MAX_AGE_DAYS", 30)
+
+
+def chain_entry(*dates):
+    return {
+        "repo": "org/repo",
+        "fingerprint": "2026-10-14T00:00:00Z",
+        "refs": {"refs/heads/main": "a" * 40},
+        "chain": [
+            {"s3_key": f"github-backup/{d}/org/repo.bundle", "bundle_date": d}
+            for d in dates
+        ],
+    }
+
+
+def test_delta_extends_the_previous_chain():
+    entry = chain_entry("2026-10-12", "2026-10-13")
+    assert delta_chain(entry, "2026-10-14") == entry["chain"]
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        None,
+        # Written before delta mode: no chain to extend
+        {"repo": "org/repo", "s3_key": "k", "bundle_date": "2026-10-13"},
+        # No refs recorded, so the delta's prerequisites are unknown
+        {**chain_entry("2026-10-13"), "refs": {}},
+        # The chain is as long as allowed
+        chain_entry("2026-10-11", "2026-10-12", "2026-10-13"),
+        # The full bundle is BACKUP_DELTA_FULL_INTERVAL_DAYS old
+        chain_entry("2026-10-07", "2026-10-13"),
+    ],
+)
+def test_full_bundle_is_forced(entry):
+    assert delta_chain(entry, "2026-10-14") is None
+
+
+def test_full_interval_is_capped_by_reuse_age(monkeypatch):
+    """A chain never outlives the bundles the lifecycle rule keeps."""
+    monkeypatch.setattr(backup, "BACKUP_DELTA_FULL_INTERVAL_DAYS", 60)
+    monkeypatch.setattr(backup, "BACKUP_DELTA_MAX_CHAIN", 100)
+    assert delta_chain(chain_entry("2026-09-15"), "2026-10-14") is not None
+    assert delta_chain(chain_entry("2026-09-14"), "2026-10-14") is None
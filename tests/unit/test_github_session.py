@@ -0,0 +1,92 @@
+import time
+
+import pytest
+import requests
+import responses
+
+import backup
+from backup import GitHubSession
+
+URL = "https://api.github.com/orgs/org/repos"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the session's sleeps instead of sleeping."""
+    slept = []
+    monkeypatch.setattr(backup.time, "sleep", slept.append)
+    return slept
+
+
+@responses.activate
+def test_retry_after_is_honored(sleeps):
+    responses.get(URL, status=403, headers={"Retry-After": "7"})
+    responses.get(URL, json=[{"name": "app"}])
+
+    response = GitHubSession().get(URL)
+
+    assert response.json() == [{"name": "app"}]
+    assert sleeps == [7.0]
+
+
+@responses.activate
+def test_waits_until_the_limit_resets(sleeps):
+    reset = int(time.time()) + 120
+    responses.get(
+        URL,
+        status=429,
+        headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)},
+    )
+    responses.get(URL, json=[])
+
+    GitHubSession().get(URL)
+
+    [delay] = sleeps
+    assert 120 < delay <= 122
+
+
+@responses.activate
+def test_gives_up_after_max_retries(sleeps):
+    responses.get(URL, status=429, headers={"Retry-After": "1"})
+
+    with pytest.raises(requests.HTTPError):
+        GitHubSession().get(URL)
+
+    assert len(responses.calls) == backup._MAX_RATE_LIMIT_RETRIES + 1
+    assert sleeps == [1.0] * backup._MAX_RATE_LIMIT_RETRIES
+
+
+@responses.activate
+def test_forbidden_is_not_retried(sleeps):
+    """A 403 that is not a rate limit means missing permissions."""
+    responses.get(URL, status=403, json={"message": "Resource not accessible"})
+
+    with pytest.raises(requests.HTTPError):
+        GitHubSession().get(URL)
+
+    assert len(responses.calls) == 1
+    assert sleeps == []
+
+
+@responses.activate
+def test_wait_for_budget_throttles_until_reset(sleeps):
+    session = GitHubSession()
+    session.wait_for_budget(10)
+    assert sleeps == [], "no budget is known before the first response"
+
+    reset = int(time.time()) + 30
+    responses.get(
+        URL,
+        json=[],
+        headers={"X-RateLimit-Remaining": "4", "X-RateLimit-Reset": str(reset)},
+    )
+    session.get(URL)
+    assert session.rate_limit_remaining == 4
+    assert session.rate_limit_reset == reset
+
+    session.wait_for_budget(4)
+    assert sleeps == []
+
+    session.wait_for_budget(5)
+    [delay] = sleeps
+    assert 30 < delay <= 32
@@ -0,0 +1,132 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pytest
+import responses
+
+import backup
+from backup import lfs_object_key, lfs_pointers, parse_lfs_pointer, sync_lfs_objects
+from tests.unit.conftest import BUCKET, commit
+
+DATE = "2026-10-14"
+BATCH_URL = "https://github.com/org/app.git/info/lfs/objects/batch"
+TOKENS = SimpleNamespace(token="installation-token")
+
+
+def lfs_object(content):
+    return {"oid": hashlib.sha256(content).hexdigest(), "size": len(content)}
+
+
+def pointer(obj):
+    return (
+        "version https://git-lfs.github.com/spec/v1\n"
+        f"oid sha256:{obj['oid']}\n"
+        f"size {obj['size']}\n"
+    ).encode()
+
+
+def serve(contents):
+    """
+    Mock the LFS batch API offering ``contents`` (by OID) for download.
+    """
+
+    def batch(request):
+        wanted = json.loads(request.body)["objects"]
+        answer = []
+        for obj in wanted:
+            if obj["oid"] in contents:
+                href = f"https://lfs.example.com/{obj['oid']}"
+                answer.append({**obj, "actions": {"download": {"href": href}}})
+            else:
+                answer.append({**obj, "error": {"code": 404, "message": "Not found"}})
+        return 200, {}, json.dumps({"objects": answer})
+
+    responses.add_callback(responses.POST, BATCH_URL, callback=batch)
+    for oid, content in contents.items():
+        responses.get(f"https://lfs.example.com/{oid}", body=content)
+
+
+def requested_oids():
+    return [
+        obj["oid"]
+        for call in responses.calls
+        if call.request.url == BATCH_URL
+        for obj in json.loads(call.request.body)["objects"]
+    ]
+
+
+def test_parse_lfs_pointer():
+    obj = lfs_object(b"model weights")
+    assert parse_lfs_pointer(pointer(obj)) == obj
+    assert parse_lfs_pointer(b"print('hello')\n") is None
+    assert parse_lfs_pointer(b"\xff\xfe") is None
+    assert parse_lfs_pointer(pointer({"oid": obj["oid"], "size": "big"})) is None
+
+
+def test_lfs_pointers_lists_each_object_once(source_repo):
+    weights = lfs_object(b"model weights")
+    dataset = lfs_object(b"dataset")
+    commit(source_repo, "weights.bin", pointer(weights))
+    commit(source_repo, "copy.bin", pointer(weights))
+    commit(source_repo, "dataset.csv", pointer(dataset))
+
+    assert lfs_pointers(source_repo) == sorted(
+        [weights, dataset], key=lambda obj: obj["oid"]
+    )
+
+
+@responses.activate
+def test_sync_stores_new_objects(s3):
+    stored = lfs_object(b"already stored")
+    s3.put_object(Bucket=BUCKET, Key=lfs_object_key(stored["oid"]), Body=b"x")
+    new = lfs_object(b"new object")
+    gone = lfs_object(b"never uploaded")
+    serve({new["oid"]: b"new object"})
+
+    uploaded, missing = sync_lfs_objects(
+        "org/app", [stored, new, gone], TOKENS, BUCKET, DATE
+    )
+
+    assert (uploaded, missing) == (new["size"], 1)
+    assert sorted(requested_oids()) == sorted([new["oid"], gone["oid"]])
+    body = s3.get_object(Bucket=BUCKET, Key=lfs_object_key(new["oid"]))["Body"]
+    assert body.read() == b"new object"
+
+
+@pytest.mark.parametrize(
+    "obj, content, error",
+    [
+        (lfs_object(b"new object"), b"new objecT", "does not match"),
+        # Matches the OID, but is longer than the pointer says
+        ({**lfs_object(b"new object"), "size": 3}, b"new object", "larger than"),
+    ],
+)
+@responses.activate
+def test_mismatched_object_is_not_stored(s3, obj, content, error):
+    serve({obj["oid"]: content})
+
+    with pytest.raises(RuntimeError, match=error):
+        sync_lfs_objects("org/app", [obj], TOKENS, BUCKET, DATE)
+
+    listed = s3.list_objects_v2(Bucket=BUCKET, Prefix="github-backup/lfs/")
+    assert "Contents" not in listed
+
+
+@responses.activate
+def test_lfs_repo_is_backed_up_with_its_objects(
+    s3, source_repo, local_github, run_pipeline, monkeypatch
+):
+    monkeypatch.setattr(backup, "BACKUP_REPO_POLICIES", [{"strategy": "lfs"}])
+    weights = lfs_object(b"model weights")
+    commit(source_repo, "weights.bin", pointer(weights))
+    serve({weights["oid"]: b"model weights"})
+    local_github["org/app"] = source_repo
+
+    entry = run_pipeline([{"full_name": "org/app"}], DATE, token_mgr=TOKENS)["org/app"]
+
+    assert entry["strategy"] == "lfs"
+    assert entry["lfs_missing"] == 0
+    listed = s3.get_object(Bucket=BUCKET, Key=entry["lfs_key"])["Body"].read()
+    assert json.loads(listed) == [weights]
+    s3.head_object(Bucket=BUCKET, Key=lfs_object_key(weights["oid"]))
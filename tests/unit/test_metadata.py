@@ -0,0 +1,131 @@
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import backup
+from backup import export_repo_metadata
+from tests.unit.conftest import BUCKET
+
+REPO = {"full_name": "org/app"}
+TOKENS = SimpleNamespace(token="installation-token")
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """
+    Serve the lists of a repo from ``data`` (by API path) and record
+    the parameters each list was requested with.
+    """
+    data = {
+        "issues": [{"number": 1, "title": "Bug"}],
+        "pulls": [
+            {"number": 3, "updated_at": "2026-10-13T12:00:00Z"},
+            {"number": 2, "updated_at": "2026-10-01T00:00:00Z"},
+        ],
+        "pulls/3/reviews": [{"id": 30}],
+        "pulls/2/reviews": [{"id": 20}],
+        "releases": [{"id": 7, "tag_name": "v1.0", "assets": []}],
+    }
+    calls = {}
+
+    def github_list(full_name, path, token, params=None):
+        calls[path] = params or {}
+        return iter(data.get(path, []))
+
+    monkeypatch.setattr(backup, "github_list", github_list)
+    return SimpleNamespace(data=data, calls=calls)
+
+
+def records(s3, key):
+    body = s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    return [
+        (line["type"], line["data"])
+        for line in map(json.loads, gzip.decompress(body).splitlines())
+    ]
+
+
+def export(date_prefix, previous=None):
+    return export_repo_metadata(REPO, TOKENS, BUCKET, date_prefix, previous)
+
+
+def test_first_export_is_full(s3, github):
+    entry = export("2026-10-13")
+
+    assert entry["since"] is None
+    assert "since" not in github.calls["issues"]
+    [link] = entry["chain"]
+    assert link == {
+        "s3_key": "github-backup/2026-10-13/org/app.metadata.jsonl.gz",
+        "date": "2026-10-13",
+    }
+    assert [record_type for record_type, _ in records(s3, link["s3_key"])] == [
+        "issue",
+        "pull",
+        "review",
+        "pull",
+        "review",
+        "release",
+    ]
+    assert entry["counts"]["pull"] == 2
+
+
+def test_delta_continues_the_chain_from_the_cursor(s3, github):
+    first = export("2026-10-13")
+    cursor = "2026-10-13T06:00:00Z"
+    github.data["issues"] = [{"number": 4, "title": "New"}]
+
+    second = export("2026-10-14", {**first, "cursor": cursor})
+
+    assert second["since"] == cursor
+    assert github.calls["issues"]["since"] == cursor
+    assert github.calls["issues/comments"]["since"] == cursor
+    assert second["chain"][0] == first["chain"][0]
+    assert [link["date"] for link in second["chain"]] == ["2026-10-13", "2026-10-14"]
+    # Pull requests stop at the first one updated before the cursor;
+    # releases are unchanged, so they are not written again
+    assert records(s3, second["chain"][1]["s3_key"]) == [
+        ("issue", {"number": 4, "title": "New"}),
+        ("pull", github.data["pulls"][0]),
+        ("review", {"id": 30}),
+    ]
+
+
+def test_delta_without_records_uploads_nothing(s3, github):
+    first = export("2026-10-13")
+    github.data["issues"] = github.data["pulls"] = []
+
+    second = export("2026-10-14", first)
+
+    assert second["chain"] == first["chain"]
+    listed = s3.list_objects_v2(Bucket=BUCKET, Prefix="github-backup/2026-10-14/")
+    assert "Contents" not in listed
+
+
+@pytest.mark.parametrize(
+    "previous",
+    [
+        # The chain started BACKUP_REUSE_MAX_AGE_DAYS ago
+        {
+            "status": "ok",
+            "cursor": "2026-09-13T00:00:00Z",
+            "chain": [{"s3_key": "k", "date": "2026-09-13"}],
+        },
+        # The previous export failed
+        {"repo": "org/app", "status": "failed", "error": "HTTPError: 502"},
+        # Malformed entries
+        {"status": "ok", "cursor": "2026-10-13T00:00:00Z"},
+        {"status": "ok", "cursor": "2026-10-13T00:00:00Z", "chain": []},
+        {"status": "ok", "chain": [{"s3_key": "k", "date": "2026-10-13"}]},
+        {"status": "ok", "cursor": "c", "chain": [{"s3_key": "k", "date": "soon"}]},
+    ],
+)
+def test_full_export_without_a_usable_previous_entry(s3, github, monkeypatch, previous):
+    monkeypatch.setattr(backup, "BACKUP_REUSE_MAX_AGE_DAYS", 30)
+
+    entry = export("2026-10-14", previous)
+
+    assert entry["since"] is None
+    assert "since" not in github.calls["issues"]
+    assert [link["date"] for link in entry["chain"]] == ["2026-10-14"]
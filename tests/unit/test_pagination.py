@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+import backup
+from backup import github_map, paginate
+
+URL = "https://api.github.com/orgs/org/repos"
+
+
+def page_of(request):
+    return int(parse_qs(urlparse(request.url).query).get("page", ["1"])[0])
+
+
+def numbered_pages(count, delays=None):
+    """
+    Serve ``count`` numbered pages of two items each, linking to the
+    next and the last page as GitHub does; page ``n`` is answered after
+    ``delays[n]`` seconds.
+    """
+
+    def page(request):
+        number = page_of(request)
+        time.sleep((delays or {}).get(number, 0))
+        links = [f'<{URL}?per_page=100&page={count}>; rel="last"']
+        if number < count:
+            links.insert(0, f'<{URL}?per_page=100&page={number + 1}>; rel="next"')
+        items = [{"id": number * 10 + i} for i in range(2)]
+        return 200, {"Link": ", ".join(links)}, json.dumps(items)
+
+    responses.add_callback(responses.GET, URL, callback=page)
+
+
+@responses.activate
+def test_pages_fetched_concurrently_come_out_in_order():
+    # Later pages answer first
+    numbered_pages(4, delays={2: 0.2, 3: 0.1})
+
+    items = [item["id"] for item in paginate(URL, "token", concurrency=4)]
+
+    assert items == [10, 11, 20, 21, 30, 31, 40, 41]
+    assert sorted(page_of(call.request) for call in responses.calls) == [1, 2, 3, 4]
+
+
+@responses.activate
+def test_cursor_pages_are_followed_in_order():
+    """Without rel="last", pages are followed one by one via rel="next"."""
+    for cursor, after in (("", "abc"), ("abc", "def"), ("def", None)):
+        headers = {}
+        if after:
+            headers["Link"] = f'<{URL}?per_page=100&after={after}>; rel="next"'
+        responses.get(
+            URL,
+            match=[
+                responses.matchers.query_param_matcher(
+                    {"per_page": "100", **({"after": cursor} if cursor else {})}
+                )
+            ],
+            json={"repositories": [{"cursor": cursor}]},
+            headers=headers,
+        )
+
+    items = paginate(URL, "token", items_key="repositories", concurrency=4)
+
+    assert [item["cursor"] for item in items] == ["", "abc", "def"]
+
+
+@responses.activate
+def test_caller_can_stop_early():
+    numbered_pages(5)
+
+    items = paginate(URL, "token", concurrency=1)
+    assert [next(items)["id"] for _ in range(3)] == [10, 11, 20]
+
+    assert len(responses.calls) == 2
+
+
+def test_github_map_keeps_the_order_of_its_items():
+    def slow_square(n):
+        time.sleep((10 - n) / 200)
+        return n * n
+
+    assert list(github_map(slow_square, range(10), concurrency=4)) == [
+        n * n for n in range(10)
+    ]
+
+
+def test_github_map_holds_a_bounded_number_of_items():
+    taken = []
+
+    def items():
+        for n in range(1000):
+            taken.append(n)
+            yield n
+
+    results = github_map(lambda n: n, items(), concurrency=3)
+    assert [next(results) for _ in range(5)] == [0, 1, 2, 3, 4]
+    results.close()
+
+    assert len(taken) <= 5 + 2 * 3
+
+
+def test_github_map_raises_in_order(monkeypatch):
+    waits = []
+    session = backup.get_github_session()
+    monkeypatch.setattr(session, "wait_for_budget", waits.append)
+    release = threading.Event()
+
+    def call(n):
+        if n == 2:
+            raise ValueError(n)
+        if n == 1:
+            release.wait(5)
+        return n
+
+    results = github_map(call, range(4), concurrency=2)
+    assert next(results) == 0
+    release.set()
+    assert next(results) == 1
+    with pytest.raises(ValueError):
+        next(results)
+    # Every call waits for a budget that covers all calls in flight
+    assert set(waits) == {2}
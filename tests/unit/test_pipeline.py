@@ -0,0 +1,59 @@
+import json
+import threading
+
+import backup
+from backup import TokenManager
+from tests.unit.conftest import BUCKET, commit, git
+
+DATE = "2026-10-14"
+MANIFEST = f"github-backup/{DATE}/manifest"
+
+
+def test_concurrent_workers_back_up_each_repo_once(
+    s3, monkeypatch, tmp_path, local_github, run_pipeline
+):
+    """
+    With several workers per stage sharing one token manager, every repo
+    lands in the manifest exactly once, and the token is fetched once.
+    """
+    issued = []
+    monkeypatch.setattr(backup, "create_jwt", lambda app_id, key: "jwt")
+
+    def get_installation_token(jwt_token, installation_id):
+        issued.append(threading.current_thread().name)
+        return "token-1", backup.time.time() + 3600
+
+    monkeypatch.setattr(backup, "get_installation_token", get_installation_token)
+
+    fake_clone = backup.clone_mirror
+
+    def clone_mirror(repo, token_mgr, dest_dir, cache_dir=None, blob_limit=None):
+        assert token_mgr.git_env()["GIT_ASKPASS"]
+        return fake_clone(repo, token_mgr, dest_dir, cache_dir, blob_limit)
+
+    monkeypatch.setattr(backup, "clone_mirror", clone_mirror)
+
+    repos = []
+    for i in range(12):
+        source = tmp_path / f"src{i}"
+        git(tmp_path, "init", "-q", "-b", "main", str(source))
+        commit(str(source), "README.md", f"repo {i}\n".encode())
+        local_github[f"org/repo{i}"] = str(source)
+        repos.append({"full_name": f"org/repo{i}"})
+
+    token_mgr = TokenManager("1", "key", "2")
+    try:
+        run_pipeline(repos, DATE, token_mgr=token_mgr, workers=(4, 3, 3), manifest=True)
+    finally:
+        token_mgr.close()
+
+    body = s3.get_object(Bucket=BUCKET, Key=f"{MANIFEST}.jsonl")["Body"].read()
+    entries = [json.loads(line) for line in body.decode().splitlines()]
+    assert sorted(entry["repo"] for entry in entries) == sorted(
+        repo["full_name"] for repo in repos
+    )
+    assert all("status" not in entry for entry in entries)
+    for entry in entries:
+        for obj in backup.bundle_objects(entry):
+            s3.head_object(Bucket=BUCKET, Key=obj["s3_key"])
+    assert len(issued) == 1
@@ -0,0 +1,73 @@
+import pytest
+
+import backup
+from backup import estimate_plan
+
+
+@pytest.fixture(autouse=True)
+def workers(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_CLONE_WORKERS", 2)
+    monkeypatch.setattr(backup, "BACKUP_BUNDLE_WORKERS", 1)
+    monkeypatch.setattr(backup, "BACKUP_UPLOAD_WORKERS", 1)
+
+
+def timings(**seconds):
+    return {phase: {"seconds": s, "bytes": 0} for phase, s in seconds.items()}
+
+
+def test_estimate_from_previous_timings():
+    repos = [
+        {"full_name": "org/a", "size": 10},
+        {"full_name": "org/b", "size": 10},
+        {"full_name": "org/c", "size": 10},
+    ]
+    previous = {
+        "org/a": {"size_bytes": 4000, "phases": timings(clone=10, bundle=4, upload=2)},
+        "org/b": {
+            "size_bytes": 1000,
+            "phases": timings(clone=6, bundle=2, upload=2, objects=3),
+        },
+        "org/c": {"size_bytes": 500, "phases": timings(clone=2, bundle=1, upload=1)},
+    }
+
+    estimates, total_bytes, duration = estimate_plan(repos, previous, {})
+
+    assert estimates == [
+        {"repo": "org/a", "bytes": 4000, "seconds": 16.0},
+        {"repo": "org/b", "bytes": 1000, "seconds": 13.0},
+        {"repo": "org/c", "bytes": 500, "seconds": 4.0},
+    ]
+    assert total_bytes == 5500
+    # The busiest stage: 18 s of clones on two workers, 10 s of
+    # bundling and object syncing on one
+    assert duration == 10.0
+
+
+def test_new_repos_are_scaled_from_the_previous_totals():
+    """Repos without timings of their own take time by GitHub size."""
+    summary = {
+        "stats": {
+            "bytes_cloned": 1000 * 1024,
+            "phases": {
+                "clone": {"total_seconds": 100.0},
+                "upload": {"total_seconds": 20.0},
+            },
+        }
+    }
+    repos = [{"full_name": "org/new", "size": 500}]
+
+    estimates, total_bytes, duration = estimate_plan(repos, {}, summary)
+
+    assert estimates == [{"repo": "org/new", "bytes": 500 * 1024, "seconds": 60.0}]
+    assert total_bytes == 500 * 1024
+    assert duration == 25.0
+
+
+def test_no_previous_timings():
+    repos = [{"full_name": "org/a", "size": 2}, {"full_name": "org/b"}]
+
+    estimates, total_bytes, duration = estimate_plan(repos, {}, {})
+
+    assert [e["seconds"] for e in estimates] == [0.0, 0.0]
+    assert total_bytes == 2048
+    assert duration is None
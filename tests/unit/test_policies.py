@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+from boto3.s3.transfer import TransferConfig
+
+import backup
+from backup import blob_key, materialize_repo, repo_policy
+from tests.unit.conftest import BUCKET, commit, git
+
+RULES = [
+    {"repos": "org/assets-*", "min_size_gb": 5, "strategy": "filtered"},
+    {"repos": "org/media", "strategy": "lfs"},
+    {"min_size_gb": 50, "strategy": "filtered", "blob_limit_mb": 10},
+]
+
+
+@pytest.fixture
+def policies(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_REPO_POLICIES", RULES)
+
+
+@pytest.mark.parametrize(
+    "repo, expected",
+    [
+        # Matches the glob and is large enough
+        (
+            {"full_name": "org/assets-video", "size": 6 * 1024**2},
+            {"strategy": "filtered", "blob_limit": 1024**2},
+        ),
+        # Matches the glob but is too small, so falls through to "full"
+        ({"full_name": "org/assets-icons", "size": 1024}, {"strategy": "full"}),
+        # A rule without min_size_gb matches any size
+        ({"full_name": "org/media", "size": 0}, {"strategy": "lfs"}),
+        # A rule without repos matches any name
+        (
+            {"full_name": "other/monorepo", "size": 60 * 1024**2},
+            {"strategy": "filtered", "blob_limit": 10 * 1024**2},
+        ),
+        # The first matching rule wins
+        (
+            {"full_name": "org/assets-video", "size": 60 * 1024**2},
+            {"strategy": "filtered", "blob_limit": 1024**2},
+        ),
+        # Globs match the whole name, case-sensitively
+        ({"full_name": "org/Media", "size": 0}, {"strategy": "full"}),
+        ({"full_name": "org/media-old", "size": 0}, {"strategy": "full"}),
+    ],
+)
+def test_repo_policy(policies, repo, expected):
+    assert repo_policy(repo) == {"blob_limit": None, **expected}
+
+
+def test_no_rules_means_full(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_REPO_POLICIES", [])
+    assert repo_policy({"full_name": "org/app", "size": 10**9}) == {
+        "strategy": "full",
+        "blob_limit": None,
+    }
+
+
+def test_filtered_repo_round_trip(
+    s3, source_repo, local_github, run_pipeline, monkeypatch, tmp_path
+):
+    """
+    A large blob is stored apart from the bundle, and a restore puts it
+    back.
+    """
+    monkeypatch.setattr(
+        backup,
+        "BACKUP_REPO_POLICIES",
+        [{"strategy": "filtered", "blob_limit_mb": 0.001}],
+    )
+    content = os.urandom(4096)
+    commit(source_repo, "data.bin", content)
+    oid = git(source_repo, "rev-parse", "HEAD:data.bin")
+    local_github["org/app"] = source_repo
+
+    entry = run_pipeline([{"full_name": "org/app"}])["org/app"]
+
+    assert entry["strategy"] == "filtered"
+    assert entry["blob_limit_bytes"] == 1048
+    blobs = s3.get_object(Bucket=BUCKET, Key=entry["blobs_key"])["Body"].read()
+    assert json.loads(blobs) == [{"oid": oid, "size": 4096}]
+    stored = s3.get_object(Bucket=BUCKET, Key=blob_key(oid))["Body"].read()
+    assert stored == content
+    assert entry["size_bytes"] < len(content), "the bundle left the blob out"
+
+    repo_dir = str(tmp_path / "restored.git")
+    materialize_repo(BUCKET, entry, repo_dir, str(tmp_path), TransferConfig())
+    git(repo_dir, "fsck", "--strict")
+    assert git(repo_dir, "rev-parse", "HEAD:data.bin") == oid
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+
+import pytest
+from boto3.s3.transfer import TransferConfig
+
+import backup
+import restore
+from backup import lfs_object_key, verify_repo
+from tests.unit.conftest import BUCKET, commit, git
+
+CONFIG = TransferConfig()
+
+
+@pytest.fixture
+def delta_zstd(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_DELTA_BUNDLES", True)
+    monkeypatch.setattr(backup, "BACKUP_DELTA_FULL_INTERVAL_DAYS", 7)
+    monkeypatch.setattr(backup, "BACKUP_DELTA_MAX_CHAIN", 30)
+    monkeypatch.setattr(backup, "BACKUP_BUNDLE_COMPRESSION", "zstd")
+
+
+def refs(repo_dir):
+    return git(repo_dir, "for-each-ref", "--format=%(objectname) %(refname)")
+
+
+def test_round_trip_full_delta_zstd(
+    s3, source_repo, local_github, delta_zstd, tmp_path, run_pipeline
+):
+    """
+    A chain of a full and a delta bundle, both zstd-compressed, restores
+    to exactly the refs of the source, deleted branches included.
+    """
+    local_github["org/app"] = source_repo
+    git(source_repo, "branch", "feature")
+    day1 = run_pipeline([{"full_name": "org/app"}], "2026-10-13", manifest=True)
+
+    commit(source_repo, "app.py", b"print('hello')\n")
+    git(source_repo, "tag", "v1.0")
+    git(source_repo, "branch", "-D", "feature")
+    day2 = run_pipeline([{"full_name": "org/app"}], "2026-10-14", day1, manifest=True)
+
+    entry = day2["org/app"]
+    assert [link["bundle_type"] for link in entry["chain"]] == ["full", "delta"]
+    assert all(link["s3_key"].endswith(".bundle.zst") for link in entry["chain"])
+    verify_repo(BUCKET, entry)
+
+    dest = str(tmp_path / "restored")
+    report_path = str(tmp_path / "report.json")
+    restore.main(["--bucket", BUCKET, "--dest", dest, "--report", report_path])
+
+    mirror_dir = f"{dest}/org/app.git"
+    assert refs(mirror_dir) == refs(source_repo)
+    assert git(mirror_dir, "symbolic-ref", "HEAD") == "refs/heads/main"
+    git(mirror_dir, "fsck", "--strict")
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report["date"] == "2026-10-14"
+    assert report["restored_count"] == 1
+    assert report["failure_count"] == 0
+
+
+def test_restore_is_resumable(s3, source_repo, local_github, tmp_path, run_pipeline):
+    """A repo already in the destination is skipped on a second run."""
+    local_github["org/app"] = source_repo
+    run_pipeline([{"full_name": "org/app"}], "2026-10-14", manifest=True)
+    argv = ["--bucket", BUCKET, "--dest", str(tmp_path / "restored")]
+    report_path = str(tmp_path / "report.json")
+
+    restore.main(argv)
+    restore.main([*argv, "--report", report_path])
+
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report["skipped_count"] == 1
+    assert report["restored_count"] == 0
+
+
+def test_corrupt_bundle_fails_the_repo(
+    s3, source_repo, local_github, tmp_path, run_pipeline
+):
+    """A bundle that doesn't match its SHA-256 leaves nothing behind."""
+    local_github["org/app"] = source_repo
+    entries = run_pipeline([{"full_name": "org/app"}], "2026-10-14", manifest=True)
+    entry = entries["org/app"]
+    s3.put_object(Bucket=BUCKET, Key=entry["s3_key"], Body=b"not a bundle")
+    dest = str(tmp_path / "restored")
+
+    with pytest.raises(SystemExit):
+        restore.main(["--bucket", BUCKET, "--dest", dest])
+
+    assert not (tmp_path / "restored" / "org" / "app.git").exists()
+
+
+def test_lfs_objects_are_checked(s3, tmp_path):
+    """
+    LFS objects land where git-lfs looks for them, unless they don't
+    match their pointers.
+    """
+    good = b"model weights"
+    oid = hashlib.sha256(good).hexdigest()
+    s3.put_object(Bucket=BUCKET, Key=lfs_object_key(oid), Body=good)
+    path = tmp_path / "lfs" / "objects" / oid[:2] / oid[2:4] / oid
+    objects = [{"oid": oid, "size": len(good)}]
+
+    nbytes = restore.download_lfs_objects(BUCKET, str(tmp_path), objects, CONFIG)
+
+    assert nbytes == len(good)
+    assert path.read_bytes() == good
+
+    path.unlink()
+    for stored, size in [(b"model weightz", len(good)), (good, len(good) + 1)]:
+        s3.put_object(Bucket=BUCKET, Key=lfs_object_key(oid), Body=stored)
+        with pytest.raises(RuntimeError):
+            restore.download_lfs_objects(
+                BUCKET, str(tmp_path), [{"oid": oid, "size": size}], CONFIG
+            )
+        assert os.listdir(path.parent) == []
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import backup
+from backup import RepoScheduler
+from tests.unit.conftest import BUCKET
+
+
+@pytest.fixture
+def backoff(monkeypatch):
+    """
+    Record the backoff before each retry, and retry at once.
+
+    Only the timers that put a job back into the clone queue are cut
+    short; others, such as the bundle watchdog, keep their interval.
+    """
+    delays = []
+    timer = threading.Timer
+
+    def immediate_timer(interval, function, args=None, kwargs=None):
+        if isinstance(getattr(function, "__self__", None), RepoScheduler):
+            delays.append(interval)
+            interval = 0
+        return timer(interval, function, args=args, kwargs=kwargs)
+
+    monkeypatch.setattr(backup.threading, "Timer", immediate_timer)
+    monkeypatch.setattr(backup, "BACKUP_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(backup, "BACKUP_RETRY_BASE_SECONDS", 30)
+    return delays
+
+
+@pytest.fixture
+def flaky_clone(monkeypatch, local_github):
+    """
+    Make the clone of each repo fail a given number of times first.
+    """
+    failures = {}
+    clone = backup.clone_mirror
+
+    def clone_mirror(repo, *args, **kwargs):
+        if failures.get(repo["full_name"], 0):
+            failures[repo["full_name"]] -= 1
+            raise RuntimeError("connection reset")
+        return clone(repo, *args, **kwargs)
+
+    monkeypatch.setattr(backup, "clone_mirror", clone_mirror)
+    return failures
+
+
+def test_failed_repo_is_retried_with_backoff(
+    s3, source_repo, local_github, flaky_clone, backoff, run_pipeline
+):
+    local_github["org/flaky"] = source_repo
+    local_github["org/steady"] = source_repo
+    flaky_clone["org/flaky"] = 2
+
+    entries = run_pipeline(
+        [{"full_name": "org/flaky"}, {"full_name": "org/steady"}], workers=(2, 1, 1)
+    )
+
+    assert "status" not in entries["org/flaky"]
+    assert "status" not in entries["org/steady"]
+    # Exponential: the base, then twice that
+    assert backoff == [30, 60]
+    s3.head_object(Bucket=BUCKET, Key=entries["org/flaky"]["s3_key"])
+
+
+def test_repo_fails_after_max_attempts(
+    s3, source_repo, local_github, flaky_clone, backoff, run_pipeline
+):
+    """The other repos carry on; the failing one is recorded as failed."""
+    local_github["org/broken"] = source_repo
+    local_github["org/steady"] = source_repo
+    flaky_clone["org/broken"] = 10
+
+    entries = run_pipeline(
+        [{"full_name": "org/broken"}, {"full_name": "org/steady"}], workers=(2, 1, 1)
+    )
+
+    assert entries["org/broken"] == {
+        "repo": "org/broken",
+        "status": "failed",
+        "error": "RuntimeError: connection reset",
+        "attempts": 3,
+    }
+    assert "status" not in entries["org/steady"]
+    assert backoff == [30, 60]
@@ -0,0 +1,85 @@
+import pytest
+
+import backup
+from backup import find_reusable_entry
+
+
+@pytest.fixture(autouse=True)
+def reuse_settings(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_REUSE_MAX_AGE_DAYS", 30)
+
+
+def chain_entry(*dates):
+    return {
+        "repo": "org/repo",
+        "fingerprint": "2026-10-14T00:00:00Z",
+        "refs": {"refs/heads/main": "a" * 40},
+        "chain": [
+            {"s3_key": f"github-backup/{d}/org/repo.bundle", "bundle_date": d}
+            for d in dates
+        ],
+    }
+
+
+def test_unchanged_repo_reuses_its_entry():
+    entry = {
+        **chain_entry("2026-10-10", "2026-10-13"),
+        "phases": {"clone": {"seconds": 1.0}},
+    }
+    repo = {"full_name": "org/repo", "pushed_at": entry["fingerprint"]}
+
+    reused = find_reusable_entry(repo, {"org/repo": entry}, "2026-10-14")
+
+    assert reused["reused"] is True
+    assert reused["chain"] == entry["chain"]
+    assert "phases" not in reused
+
+
+def test_single_bundle_entry_is_reused():
+    entry = {
+        "repo": "org/repo",
+        "fingerprint": "2026-10-14T00:00:00Z",
+        "s3_key": "github-backup/2026-10-13/org/repo.bundle",
+        "bundle_date": "2026-10-13",
+    }
+    repo = {"full_name": "org/repo", "pushed_at": entry["fingerprint"]}
+
+    reused = find_reusable_entry(repo, {"org/repo": entry}, "2026-10-14")
+
+    assert reused["s3_key"] == entry["s3_key"]
+
+
+def test_ref_fingerprint_wins_over_pushed_at():
+    entry = {**chain_entry("2026-10-13"), "fingerprint": "refs-hash"}
+    repo = {
+        "full_name": "org/repo",
+        "pushed_at": "2026-10-14T00:00:00Z",
+        "ref_fingerprint": "refs-hash",
+    }
+    assert find_reusable_entry(repo, {"org/repo": entry}, "2026-10-14") is not None
+
+
+@pytest.mark.parametrize(
+    "repo, previous",
+    [
+        # Pushed since the last run
+        (
+            {"full_name": "org/repo", "pushed_at": "2026-10-14T09:00:00Z"},
+            {"org/repo": chain_entry("2026-10-13")},
+        ),
+        # Not in the previous manifest
+        ({"full_name": "org/repo", "pushed_at": "2026-10-14T00:00:00Z"}, {}),
+        # Its full bundle is BACKUP_REUSE_MAX_AGE_DAYS old
+        (
+            {"full_name": "org/repo", "pushed_at": "2026-10-14T00:00:00Z"},
+            {"org/repo": chain_entry("2026-09-14", "2026-10-13")},
+        ),
+        # No bundle date recorded
+        (
+            {"full_name": "org/repo", "pushed_at": "2026-10-14T00:00:00Z"},
+            {"org/repo": {"repo": "org/repo", "fingerprint": "2026-10-14T00:00:00Z"}},
+        ),
+    ],
+)
+def test_repo_is_backed_up_again(repo, previous):
+    assert find_reusable_entry(repo, previous, "2026-10-14") is None
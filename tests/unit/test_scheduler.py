@@ -0,0 +1,86 @@
+import threading
+
+import backup
+from backup import RepoScheduler, _RepoJob, _STOP
+
+
+def job(index, size_kb):
+    return _RepoJob(index, {"full_name": f"org/repo-{index}", "size": size_kb})
+
+
+def drain(scheduler):
+    names = []
+    while True:
+        item = scheduler.get()
+        if item is _STOP:
+            return names
+        names.append(item.full_name)
+        scheduler.release(item)
+
+
+def test_largest_repo_first(monkeypatch):
+    """Repos come out largest first, equal sizes in arrival order."""
+    monkeypatch.setattr(backup, "BACKUP_HUGE_REPO_BYTES", 10**12)
+    scheduler = RepoScheduler(max_huge=1)
+    for index, size in enumerate([10, 300, 0, 300, 50]):
+        scheduler.put(job(index, size))
+    scheduler.put(_STOP)
+
+    assert drain(scheduler) == [
+        "org/repo-1",
+        "org/repo-3",
+        "org/repo-4",
+        "org/repo-0",
+        "org/repo-2",
+    ]
+
+
+def test_huge_repos_are_capped(monkeypatch):
+    """
+    Past the cap, workers get the other repos instead of another huge
+    one, and a released slot lets the next huge repo start.
+    """
+    monkeypatch.setattr(backup, "BACKUP_HUGE_REPO_BYTES", 1024 * 1024)
+    scheduler = RepoScheduler(max_huge=1)
+    scheduler.put(job(0, 4096))
+    scheduler.put(job(1, 2048))
+    scheduler.put(job(2, 100))
+
+    first = scheduler.get()
+    assert first.full_name == "org/repo-0"
+    assert first.huge_slot
+    second = scheduler.get()
+    assert second.full_name == "org/repo-2"
+    assert not second.huge_slot
+
+    started = []
+    waiter = threading.Thread(target=lambda: started.append(scheduler.get()))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive(), "a second huge repo started past the cap"
+
+    scheduler.release(first)
+    waiter.join(timeout=5)
+    assert [j.full_name for j in started] == ["org/repo-1"]
+
+
+def test_stop_waits_for_huge_repos(monkeypatch):
+    """A worker only stops once no huge repo is left waiting."""
+    monkeypatch.setattr(backup, "BACKUP_HUGE_REPO_BYTES", 1024 * 1024)
+    scheduler = RepoScheduler(max_huge=1)
+    scheduler.put(job(0, 4096))
+    scheduler.put(job(1, 4096))
+    scheduler.put(_STOP)
+    scheduler.put(_STOP)
+
+    first = scheduler.get()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(scheduler.get()))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive()
+
+    scheduler.release(first)
+    waiter.join(timeout=5)
+    assert results[0].full_name == "org/repo-1"
+    assert scheduler.get() is _STOP
@@ -0,0 +1,170 @@
+import json
+
+import pytest
+
+import backup
+from backup import (
+    ManifestWriter,
+    claim_shard,
+    hash_shard,
+    load_shard_plan,
+    merge_shard_manifests,
+    plan_shards,
+    shard_key,
+)
+from tests.unit.conftest import BUCKET
+
+DATE = "2026-10-14"
+
+
+@pytest.fixture(autouse=True)
+def three_shards(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_SHARD_COUNT", 3)
+    monkeypatch.setattr(backup, "BACKUP_SHARD_STRATEGY", "size")
+
+
+def repos(*sizes):
+    return [
+        {"full_name": f"org/repo-{i}", "size": size} for i, size in enumerate(sizes)
+    ]
+
+
+def write_partial(shard, names):
+    writer = ManifestWriter()
+    try:
+        for name in names:
+            writer.add({"repo": name, "s3_key": f"github-backup/{DATE}/{name}.bundle"})
+        summary = {
+            "total_repos": len(names),
+            "success_count": len(names),
+            "failure_count": 0,
+            "reused_count": 0,
+            "resumed_count": 0,
+        }
+        key = f"github-backup/{DATE}/" + shard_key(shard, 3, "manifest")
+        writer.upload(BUCKET, key, summary)
+    finally:
+        writer.close()
+
+
+def merged_entries(s3):
+    body = s3.get_object(Bucket=BUCKET, Key=f"github-backup/{DATE}/manifest.jsonl")
+    return [json.loads(line) for line in body["Body"].iter_lines()]
+
+
+def test_size_plan_balances_shards():
+    plan = plan_shards(repos(900, 500, 400, 300, 200, 10**6), 3, "size")
+
+    assert plan["org/repo-5"] == 0
+    loads = [0, 0, 0]
+    for repo in repos(900, 500, 400, 300, 200):
+        loads[plan[repo["full_name"]]] += repo["size"]
+    # Everything but the huge repo goes to the other two shards
+    assert loads[0] == 0
+    assert sorted(loads[1:]) == [1100, 1200]
+
+
+def test_hash_plan_is_stable():
+    plan = plan_shards(repos(1, 2, 3), 3, "hash")
+    assert plan == {name: hash_shard(name, 3) for name in plan}
+    assert plan == plan_shards(list(reversed(repos(3, 2, 1))), 3, "hash")
+
+
+def test_tasks_share_the_first_plan(s3):
+    """A task listing different sizes still uses the stored plan."""
+    first = load_shard_plan(BUCKET, DATE, repos(900, 500, 400))
+    second = load_shard_plan(BUCKET, DATE, repos(1, 1, 10**6, 5))
+
+    assert {name: second[name] for name in first} == first
+    assert second["org/repo-3"] == hash_shard("org/repo-3", 3)
+
+
+def test_each_shard_is_claimed_once(s3):
+    assert [claim_shard(BUCKET, DATE) for _ in range(3)] == [0, 1, 2]
+    assert claim_shard(BUCKET, DATE) is None
+
+
+def test_stalled_shard_is_taken_over_once(s3, monkeypatch):
+    for _ in range(3):
+        claim_shard(BUCKET, DATE)
+    write_partial(0, ["org/repo-0"])
+
+    # Shards 1 and 2 are still running
+    monkeypatch.setattr(backup, "_SHARD_STALE_SECONDS", 3600)
+    assert claim_shard(BUCKET, DATE) is None
+
+    # Both stalled: a rerun takes over the first one, not the finished
+    # shard 0.  The claim's ETag changed, so a rerun working from the
+    # old one loses.
+    monkeypatch.setattr(backup, "_SHARD_STALE_SECONDS", 0)
+    claim_key = f"github-backup/{DATE}/" + shard_key(1, 3, "claim")
+    old_etag = s3.head_object(Bucket=BUCKET, Key=claim_key)["ETag"]
+    assert claim_shard(BUCKET, DATE) == 1
+    with pytest.raises(s3.exceptions.ClientError):
+        s3.put_object(Bucket=BUCKET, Key=claim_key, Body=b"{}", IfMatch=old_etag)
+
+
+def test_merge_waits_for_running_shards(s3, monkeypatch):
+    monkeypatch.setattr(backup, "_SHARD_STALE_SECONDS", 3600)
+    for _ in range(3):
+        claim_shard(BUCKET, DATE)
+    write_partial(0, ["org/repo-0"])
+    write_partial(1, ["org/repo-1"])
+
+    assert merge_shard_manifests(BUCKET, DATE) is None
+    with pytest.raises(s3.exceptions.ClientError):
+        s3.head_object(Bucket=BUCKET, Key=f"github-backup/{DATE}/manifest.json")
+
+    write_partial(2, ["org/repo-2", "org/repo-3"])
+    summary = merge_shard_manifests(BUCKET, DATE)
+
+    assert summary["total_repos"] == 4
+    assert summary["success_count"] == 4
+    assert "missing_shards" not in summary
+    assert sorted(e["repo"] for e in merged_entries(s3)) == [
+        "org/repo-0",
+        "org/repo-1",
+        "org/repo-2",
+        "org/repo-3",
+    ]
+
+
+def test_merge_reports_stalled_shards(s3, monkeypatch):
+    """
+    A stalled shard keeps its checkpointed repos; its other repos are
+    recorded as failed.
+    """
+    plan = load_shard_plan(BUCKET, DATE, repos(900, 500, 400, 300))
+    by_shard = {}
+    for name, shard in sorted(plan.items()):
+        by_shard.setdefault(shard, []).append(name)
+    for _ in range(3):
+        claim_shard(BUCKET, DATE)
+    write_partial(0, by_shard[0])
+    write_partial(1, by_shard[1])
+    checkpointed, unfinished = by_shard[2]
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=f"github-backup/{DATE}/" + shard_key(2, 3, "checkpoint.json"),
+        Body=json.dumps(
+            [
+                {
+                    "repo": checkpointed,
+                    "s3_key": "objects/x.bundle",
+                    "bundle_date": "2026-10-01",
+                }
+            ]
+        ),
+    )
+    monkeypatch.setattr(backup, "_SHARD_STALE_SECONDS", 0)
+
+    summary = merge_shard_manifests(BUCKET, DATE)
+
+    assert summary["missing_shards"] == [2]
+    assert summary["unfinished_count"] == 1
+    assert summary["total_repos"] == 4
+    assert summary["success_count"] == 3
+    assert summary["failure_count"] == 1
+    entries = {e["repo"]: e for e in merged_entries(s3)}
+    assert entries[checkpointed]["s3_key"] == "objects/x.bundle"
+    assert entries[unfinished]["status"] == "failed"
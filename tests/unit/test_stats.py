@@ -0,0 +1,104 @@
+import pytest
+
+from backup import RunStats
+
+
+def phases(**timings):
+    return {
+        phase: {"seconds": seconds, "bytes": nbytes}
+        for phase, (seconds, nbytes) in timings.items()
+    }
+
+
+ENTRIES = [
+    # Backed up: bundle compressed from 3000 to 1000 bytes
+    {
+        "repo": "org/a",
+        "size_bytes": 1000,
+        "uncompressed_size_bytes": 3000,
+        "phases": phases(clone=(4.0, 5000), bundle=(2.0, 3000), upload=(1.0, 1000)),
+    },
+    # Its bundle was already stored, but its large blobs were uploaded
+    {
+        "repo": "org/b",
+        "size_bytes": 500,
+        "deduplicated": True,
+        "phases": phases(clone=(2.0, 2000), bundle=(1.0, 0), objects=(3.0, 700)),
+    },
+    # Failed after cloning
+    {
+        "repo": "org/c",
+        "status": "failed",
+        "error": "RuntimeError: boom",
+        "phases": phases(clone=(6.0, 800)),
+    },
+    # No new objects since the last run
+    {"repo": "org/d", "size_bytes": 300, "reused": True, "phases": {}},
+]
+
+
+def test_summary_counts_bytes_and_phases():
+    stats = RunStats()
+    for entry in ENTRIES:
+        stats.add(entry)
+
+    summary = stats.summary()
+
+    assert summary["bytes_cloned"] == 5000 + 2000 + 800
+    assert summary["bytes_uploaded"] == 1000 + 700
+    assert summary["bytes_bundled"] == 3000
+    assert summary["deduplicated_count"] == 1
+    assert summary["phases"] == {
+        "clone": {
+            "count": 3,
+            "total_seconds": 12.0,
+            "p50_seconds": 4.0,
+            "p95_seconds": 6.0,
+        },
+        "bundle": {
+            "count": 2,
+            "total_seconds": 3.0,
+            "p50_seconds": 1.0,
+            "p95_seconds": 2.0,
+        },
+        "upload": {
+            "count": 1,
+            "total_seconds": 1.0,
+            "p50_seconds": 1.0,
+            "p95_seconds": 1.0,
+        },
+        "objects": {
+            "count": 1,
+            "total_seconds": 3.0,
+            "p50_seconds": 3.0,
+            "p95_seconds": 3.0,
+        },
+    }
+
+
+def test_metric_data():
+    stats = RunStats()
+    stats._start -= 10
+    stats.add(ENTRIES[0])
+
+    metrics = {
+        (m["MetricName"], tuple(d["Value"] for d in m.get("Dimensions", []))): m
+        for m in stats.metric_data()
+    }
+
+    duration = metrics["RunDuration", ()]["Value"]
+    assert duration == pytest.approx(10, abs=1)
+    assert metrics["BytesUploaded", ()]["Value"] == 1000
+    assert metrics["UploadThroughput", ()]["Value"] == pytest.approx(1000 / duration)
+    assert metrics["UploadThroughput", ()]["Unit"] == "Bytes/Second"
+    assert metrics["PhaseDurationP50", ("clone",)]["Value"] == 4.0
+    assert metrics["PhaseDurationP95", ("upload",)]["Unit"] == "Seconds"
+    # Only phases that some repo went through
+    assert ("PhaseDurationP50", ("objects",)) not in metrics
+    assert len(metrics) == 3 + 2 * 3
+
+
+def test_empty_run():
+    summary = RunStats().summary()
+    assert summary["bytes_uploaded"] == summary["deduplicated_count"] == 0
+    assert summary["phases"] == {}
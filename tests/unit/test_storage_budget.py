@@ -0,0 +1,59 @@
+import threading
+
+import backup
+from backup import StorageBudget, estimate_footprint
+
+
+def test_acquire_blocks_until_released():
+    """A reservation waits until enough bytes are given back."""
+    budget = StorageBudget(100)
+    assert budget.acquire(60) == 60
+
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(budget.acquire(50)))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive(), "the budget was overcommitted"
+
+    budget.release(60)
+    waiter.join(timeout=5)
+    assert acquired == [50]
+
+
+def test_oversized_request_is_capped():
+    """A repo larger than the budget runs alone instead of never."""
+    budget = StorageBudget(100)
+    assert budget.acquire(500) == 100
+    budget.release(100)
+    assert budget.acquire(40) == 40
+
+
+def test_oversized_request_waits_for_an_empty_budget():
+    """The capped reservation still waits for everything in flight."""
+    budget = StorageBudget(100)
+    budget.acquire(10)
+
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(budget.acquire(500)))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive()
+
+    budget.release(10)
+    waiter.join(timeout=5)
+    assert acquired == [100]
+
+
+def test_footprint(monkeypatch):
+    """A mirror and a bundle each take about the repo's size on disk."""
+    monkeypatch.setattr(backup, "BACKUP_MIRROR_CACHE_DIR", None)
+    monkeypatch.setattr(backup, "BACKUP_STREAM_BUNDLES", False)
+    assert estimate_footprint({"size": 10 * 1024}) == 2 * 10 * 1024**2
+    assert estimate_footprint({"size": 0}) == backup._MIN_REPO_FOOTPRINT
+
+    # A cached mirror is not on ephemeral storage, a streamed bundle
+    # never touches the disk
+    monkeypatch.setattr(backup, "BACKUP_MIRROR_CACHE_DIR", "/mnt/cache")
+    assert estimate_footprint({"size": 10 * 1024}) == 10 * 1024**2
+    monkeypatch.setattr(backup, "BACKUP_STREAM_BUNDLES", True)
+    assert estimate_footprint({"size": 10 * 1024}) == backup._MIN_REPO_FOOTPRINT
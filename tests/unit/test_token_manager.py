@@ -0,0 +1,82 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+import backup
+from backup import TokenManager
+
+
+@pytest.fixture
+def installation_tokens(monkeypatch):
+    """
+    Issue ``token-1``, ``token-2``, ... each valid for an hour, and
+    record when each one was asked for.
+    """
+    issued = []
+    monkeypatch.setattr(backup, "create_jwt", lambda app_id, key: "jwt")
+
+    def get_installation_token(jwt_token, installation_id):
+        issued.append(time.time())
+        return f"token-{len(issued)}", time.time() + 3600
+
+    monkeypatch.setattr(backup, "get_installation_token", get_installation_token)
+    return issued
+
+
+def askpass(env, prompt):
+    return subprocess.run(
+        [env["GIT_ASKPASS"], prompt],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def test_expired_token_is_renewed_for_git(installation_tokens, monkeypatch):
+    token_mgr = TokenManager("1", "key", "2")
+    try:
+        env = token_mgr.git_env()
+        assert token_mgr.token == "token-1"
+        assert askpass(env, "Username for 'https://github.com': ") == ("x-access-token")
+        assert askpass(env, "Password for 'https://github.com': ") == "token-1"
+
+        # Force the token past its refresh threshold
+        token_mgr._current = (token_mgr._current[0], time.time())
+
+        # Every write goes to a partial file that is renamed over the
+        # token file, so git never reads half a token
+        replaced = []
+        replace = os.replace
+
+        def recording_replace(src, dst):
+            with open(src) as f:
+                replaced.append((src, dst, f.read()))
+            replace(src, dst)
+
+        monkeypatch.setattr(backup.os, "replace", recording_replace)
+        assert token_mgr.token == "token-2"
+        [(src, dst, content)] = replaced
+        assert src == f"{dst}.partial"
+        assert content == "token-2\n"
+        assert oct(os.stat(dst).st_mode & 0o777) == oct(0o600)
+        assert not os.path.exists(src)
+
+        # A git process started with the old environment gets the new
+        # token
+        assert askpass(env, "Password for 'https://github.com': ") == "token-2"
+        assert len(installation_tokens) == 2
+    finally:
+        token_mgr.close()
+    assert not os.path.exists(env["GIT_ASKPASS"])
+
+
+def test_valid_token_is_not_refreshed(installation_tokens):
+    token_mgr = TokenManager("1", "key", "2")
+    try:
+        assert {token_mgr.token for _ in range(5)} == {"token-1"}
+        assert len(installation_tokens) == 1
+    finally:
+        token_mgr.close()
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import backup
+from backup import get_s3_client, transfer_config
+from tests.unit.conftest import BUCKET
+
+MiB = 1024**2
+
+
+class Stream:
+    """
+    Non-seekable reader, like a bundle stream, that records how many
+    parts had been read but not yet uploaded at each read.
+    """
+
+    def __init__(self, size, part_size):
+        self.remaining = size
+        self.part_size = part_size
+        self.bytes_read = 0
+        self.parts_sent = 0
+        self.parts_buffered = []
+        self._lock = threading.Lock()
+
+    def read(self, size=-1):
+        with self._lock:
+            size = self.remaining if size < 0 else min(size, self.remaining)
+            self.remaining -= size
+            self.bytes_read += size
+            self.parts_buffered.append(
+                -(-self.bytes_read // self.part_size) - self.parts_sent
+            )
+            return b"\0" * size
+
+    def part_sent(self, **kwargs):
+        with self._lock:
+            self.parts_sent += 1
+
+
+def test_part_size_grows_with_the_object(monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_S3_PART_SIZE_BYTES", 16 * MiB)
+
+    assert transfer_config(MiB).multipart_chunksize == 16 * MiB
+    # 9,000 parts of 16 MiB are not enough for 200 GiB
+    config = transfer_config(200 * 1024 * MiB)
+    assert config.multipart_chunksize == 23 * MiB
+    assert config.multipart_threshold == config.multipart_chunksize
+
+
+def test_streamed_upload_buffers_at_most_max_concurrency_parts(s3, monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_S3_PART_SIZE_BYTES", 5 * MiB)
+    monkeypatch.setattr(backup, "BACKUP_S3_MAX_CONCURRENCY", 2)
+    stream = Stream(40 * MiB, 5 * MiB)
+    client = get_s3_client()
+    # Slow part uploads: reading must wait for them instead of running
+    # ahead of S3 with the whole stream in memory
+    client.meta.events.register(
+        "before-call.s3.UploadPart", lambda **kwargs: time.sleep(0.05)
+    )
+    client.meta.events.register("after-call.s3.UploadPart", stream.part_sent)
+
+    client.upload_fileobj(stream, BUCKET, "streamed", Config=transfer_config(MiB))
+
+    assert s3.head_object(Bucket=BUCKET, Key="streamed")["ContentLength"] == 40 * MiB
+    assert stream.parts_sent == 8
+    # Two parts being uploaded, and the next one read while it waits
+    # for a slot
+    assert max(stream.parts_buffered) == 3
@@ -0,0 +1,110 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+
+import backup
+from backup import check_object, verify
+from tests.unit.conftest import BUCKET, commit, git
+
+DATE = "2026-10-14"
+
+
+@pytest.fixture
+def backed_up(s3, source_repo, local_github, run_pipeline, tmp_path):
+    """Back up two repos and write the day's manifest."""
+    other = tmp_path / "other"
+    git(str(tmp_path), "clone", "-q", source_repo, str(other))
+    commit(str(other), "app.py", b"print('hello')\n")
+    local_github["org/app"] = source_repo
+    local_github["org/other"] = str(other)
+    return run_pipeline(
+        [{"full_name": "org/app"}, {"full_name": "org/other"}], DATE, manifest=True
+    )
+
+
+def verify_failure_metric():
+    now = datetime.now(timezone.utc)
+    datapoints = boto3.client("cloudwatch").get_metric_statistics(
+        Namespace="GitHubBackup",
+        MetricName="VerifyFailure",
+        StartTime=now - timedelta(hours=1),
+        EndTime=now + timedelta(hours=1),
+        Period=3600,
+        Statistics=["Sum"],
+    )["Datapoints"]
+    return sum(point["Sum"] for point in datapoints)
+
+
+def verify_report(s3):
+    key = f"github-backup/{DATE}/verify.json"
+    return json.loads(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read())
+
+
+def test_intact_backup_verifies(s3, backed_up, monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_VERIFY_SAMPLE", 2)
+
+    assert verify(DATE) == 0
+
+    report = verify_report(s3)
+    assert report["bundles_checked"] == 2
+    assert sorted(report["sampled_repos"]) == ["org/app", "org/other"]
+    assert report["bundle_failures"] == report["sample_failures"] == []
+    assert verify_failure_metric() == 0
+
+
+def corrupt(s3, s3_key, damage):
+    body = s3.get_object(Bucket=BUCKET, Key=s3_key)["Body"].read()
+    if damage == "missing":
+        s3.delete_object(Bucket=BUCKET, Key=s3_key)
+        return
+    if damage == "size":
+        body += b"\0"
+    else:
+        body = body[:-1] + bytes([body[-1] ^ 1])
+    s3.put_object(Bucket=BUCKET, Key=s3_key, Body=body, ChecksumAlgorithm="SHA256")
+
+
+@pytest.mark.parametrize(
+    "damage, problem",
+    [("size", "size is"), ("checksum", "checksum is"), ("missing", "missing")],
+)
+def test_damaged_bundle_fails_verification(s3, backed_up, monkeypatch, damage, problem):
+    monkeypatch.setattr(backup, "BACKUP_VERIFY_SAMPLE", 0)
+    bundle = backed_up["org/app"]
+    corrupt(s3, bundle["s3_key"], damage)
+
+    assert check_object(BUCKET, bundle).startswith(problem)
+    assert check_object(BUCKET, backed_up["org/other"]) is None
+    assert verify(DATE) == 1
+
+    [failure] = verify_report(s3)["bundle_failures"]
+    assert failure["repo"] == "org/app"
+    assert failure["problem"].startswith(problem)
+    assert verify_failure_metric() == 1
+
+
+def test_sampled_repo_that_fails_to_restore(s3, backed_up, monkeypatch):
+    """
+    A bundle whose S3 size and checksum match, but whose content does
+    not match the SHA-256 the manifest recorded, is caught by the
+    sample.
+    """
+    monkeypatch.setattr(backup, "BACKUP_VERIFY_SAMPLE", 2)
+    key = f"github-backup/{DATE}/manifest.jsonl"
+    entries = [
+        {**entry, "sha256": "0" * 64} if entry["repo"] == "org/app" else entry
+        for entry in backed_up.values()
+    ]
+    body = "".join(json.dumps(entry) + "\n" for entry in entries)
+    s3.put_object(Bucket=BUCKET, Key=key, Body=body.encode())
+
+    assert verify(DATE) == 1
+
+    report = verify_report(s3)
+    assert report["bundle_failures"] == []
+    [failure] = report["sample_failures"]
+    assert failure["repo"] == "org/app"
+    assert "SHA-256" in failure["error"]
+    assert verify_failure_metric() == 1
@@ -138,6 +138,59 @@ variable "backup_retention_days" {
   }
 }
 
+variable "incremental_backups" {
+  description = <<-EOT
+    If true, repositories with no pushes since the previous
+    run are not cloned again. Their manifest entry points at
+    the bundle uploaded by an earlier run instead. A fresh
+    bundle is still made at least every 30 days, and always
+    within backup_retention_days.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "ref_fingerprints" {
+  description = <<-EOT
+    With incremental_backups, decide which repositories
+    changed by comparing their refs (git ls-remote, run for
+    all of them in parallel before any clone) instead of
+    GitHub's pushed_at. Catches ref changes that pushed_at
+    misses, at the cost of one ls-remote per repository.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "delta_bundles" {
+  description = <<-EOT
+    If true, upload delta git bundles that only contain the
+    objects added since the previous run, chained to the last
+    full bundle. The manifest records the chain that a restore
+    must apply in order.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "delta_full_interval_days" {
+  description = <<-EOT
+    With delta_bundles, upload a full bundle once the full
+    bundle at the start of a repository's chain is this many
+    days old. Capped below backup_retention_days.
+  EOT
+  type        = number
+  default     = 7
+
+  validation {
+    condition     = var.delta_full_interval_days >= 1
+    error_message = <<-EOT
+      delta_full_interval_days must be >= 1.
+      Got: ${var.delta_full_interval_days}
+    EOT
+  }
+}
+
 variable "image_uri" {
   description = <<-EOT
     Docker image URI for the backup runner.
@@ -196,13 +249,417 @@ variable "task_memory" {
 variable "task_ephemeral_storage_gb" {
   description = <<-EOT
     Ephemeral storage (GiB) for the Fargate task.
-    Must be large enough to hold the biggest single
-    repository mirror and its git bundle simultaneously.
+    80% of it is the budget for mirrors and bundles in
+    flight; the backup pipeline holds repos back until
+    they fit. Must be large enough for the mirror and git
+    bundle of the biggest single repository.
   EOT
   type        = number
   default     = 50
 }
 
+variable "backup_concurrency" {
+  description = <<-EOT
+    Default number of worker threads in each stage (clone,
+    bundle, upload) of the backup pipeline. Override single
+    stages with backup_stage_concurrency.
+  EOT
+  type        = number
+  default     = 4
+
+  validation {
+    condition     = var.backup_concurrency >= 1 && floor(var.backup_concurrency) == var.backup_concurrency
+    error_message = <<-EOT
+      backup_concurrency must be a positive integer.
+      Got: ${var.backup_concurrency}
+    EOT
+  }
+}
+
+variable "backup_stage_concurrency" {
+  description = <<-EOT
+    Per-stage worker counts for the backup pipeline. Cloning
+    is network-bound, bundling is CPU/disk-bound and uploading
+    is egress-bound, so each stage can be sized separately.
+    Stages left unset use backup_concurrency.
+  EOT
+  type = object({
+    clone  = optional(number)
+    bundle = optional(number)
+    upload = optional(number)
+  })
+  default = {}
+
+  validation {
+    condition = alltrue([
+      for n in values(var.backup_stage_concurrency) :
+      n == null ? true : n >= 1 && floor(n) == n
+    ])
+    error_message = "backup_stage_concurrency worker counts must be positive integers."
+  }
+}
+
+variable "adaptive_concurrency" {
+  description = <<-EOT
+    If true, the runner adjusts the number of repositories in
+    flight while it runs: it adds one at a time while network
+    throughput keeps rising and the CPUs are not saturated,
+    and backs off before memory or ephemeral storage run
+    out. backup_concurrency and backup_stage_concurrency only
+    set the starting point.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "max_repos_in_flight" {
+  description = <<-EOT
+    Upper bound on repositories in flight with
+    adaptive_concurrency. Defaults to one per 256 CPU units
+    of task_cpu, at least 4.
+  EOT
+  type        = number
+  default     = null
+
+  validation {
+    condition = (
+      var.max_repos_in_flight == null
+      ? true
+      : var.max_repos_in_flight >= 1 && floor(var.max_repos_in_flight) == var.max_repos_in_flight
+    )
+    error_message = "max_repos_in_flight must be a positive integer."
+  }
+}
+
+variable "github_api_concurrency" {
+  description = <<-EOT
+    Number of GitHub API requests in flight at once, e.g.
+    when listing the repositories page by page. Requests slow
+    down as the installation's rate limit runs low.
+  EOT
+  type        = number
+  default     = 8
+
+  validation {
+    condition     = var.github_api_concurrency >= 1
+    error_message = <<-EOT
+      github_api_concurrency must be >= 1.
+      Got: ${var.github_api_concurrency}
+    EOT
+  }
+}
+
+variable "backup_max_attempts" {
+  description = <<-EOT
+    Number of times a repository is tried before it is
+    recorded as failed. Retries back off exponentially (30s,
+    60s, ...) while the other repositories carry on.
+  EOT
+  type        = number
+  default     = 3
+
+  validation {
+    condition     = var.backup_max_attempts >= 1
+    error_message = <<-EOT
+      backup_max_attempts must be >= 1.
+      Got: ${var.backup_max_attempts}
+    EOT
+  }
+}
+
+variable "huge_repo_threshold_gb" {
+  description = <<-EOT
+    Repository size (GitHub's packed size, in GB) from which
+    a repository counts as huge. Repositories are backed up
+    largest first, and huge ones are capped by
+    max_concurrent_huge_repos.
+  EOT
+  type        = number
+  default     = 5
+
+  validation {
+    condition     = var.huge_repo_threshold_gb > 0
+    error_message = <<-EOT
+      huge_repo_threshold_gb must be > 0.
+      Got: ${var.huge_repo_threshold_gb}
+    EOT
+  }
+}
+
+variable "max_concurrent_huge_repos" {
+  description = <<-EOT
+    Maximum number of huge repositories (see
+    huge_repo_threshold_gb) cloned and bundled at the same
+    time. Other repositories keep the remaining workers busy.
+  EOT
+  type        = number
+  default     = 2
+
+  validation {
+    condition     = var.max_concurrent_huge_repos >= 1
+    error_message = <<-EOT
+      max_concurrent_huge_repos must be >= 1.
+      Got: ${var.max_concurrent_huge_repos}
+    EOT
+  }
+}
+
+variable "stream_bundles" {
+  description = <<-EOT
+    If true, pipe each git bundle straight into an S3
+    multipart upload instead of writing it to ephemeral
+    storage first. Halves disk I/O and peak storage, and
+    the upload starts before bundling finishes.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "s3_part_size_mb" {
+  description = <<-EOT
+    Minimum S3 multipart part size (MiB) for bundle uploads.
+    The runner raises it for bundles that would otherwise
+    need more than 10,000 parts.
+  EOT
+  type        = number
+  default     = 16
+
+  validation {
+    condition     = var.s3_part_size_mb >= 5 && var.s3_part_size_mb <= 5120
+    error_message = <<-EOT
+      s3_part_size_mb must be between 5 and 5120 (S3 part size limits).
+      Got: ${var.s3_part_size_mb}
+    EOT
+  }
+}
+
+variable "s3_max_concurrency" {
+  description = <<-EOT
+    Number of parts uploaded in parallel for each bundle.
+    With stream_bundles, each upload buffers up to this many
+    parts in memory.
+  EOT
+  type        = number
+  default     = 8
+
+  validation {
+    condition     = var.s3_max_concurrency >= 1
+    error_message = <<-EOT
+      s3_max_concurrency must be >= 1.
+      Got: ${var.s3_max_concurrency}
+    EOT
+  }
+}
+
+variable "pack_settings" {
+  description = <<-EOT
+    git pack tuning for bundle creation: threads
+    (pack.threads), window (pack.window), depth (pack.depth)
+    and compression (core.compression, -1 to 9). Unset fields
+    keep git's defaults. With reuse = true (default) bundles
+    reuse the deltas of each mirror's packs as they are, so
+    the other settings only apply to objects git packs
+    afresh; reuse = false repacks every mirror with them
+    first, spending CPU to recompute all deltas.
+  EOT
+  type = object({
+    threads     = optional(number)
+    window      = optional(number)
+    depth       = optional(number)
+    compression = optional(number)
+    reuse       = optional(bool, true)
+  })
+  default = {}
+
+  validation {
+    condition = (
+      var.pack_settings.compression == null
+      ? true
+      : var.pack_settings.compression >= -1 && var.pack_settings.compression <= 9
+    )
+    error_message = <<-EOT
+      pack_settings.compression must be between -1 and 9.
+      Got: ${coalesce(var.pack_settings.compression, 0)}
+    EOT
+  }
+}
+
+variable "bundle_compression" {
+  description = <<-EOT
+    Outer compression of stored bundles: "none" or "zstd".
+    zstd bundles are stored as <repo>.bundle.zst. git packs
+    are already zlib-compressed, so zstd mostly pays off
+    with pack_settings compression = 0 and reuse = false.
+  EOT
+  type        = string
+  default     = "none"
+
+  validation {
+    condition     = contains(["none", "zstd"], var.bundle_compression)
+    error_message = <<-EOT
+      bundle_compression must be "none" or "zstd".
+      Got: ${var.bundle_compression}
+    EOT
+  }
+}
+
+variable "zstd_level" {
+  description = "zstd compression level (1-19) when bundle_compression is \"zstd\"."
+  type        = number
+  default     = 3
+
+  validation {
+    condition     = var.zstd_level >= 1 && var.zstd_level <= 19
+    error_message = <<-EOT
+      zstd_level must be between 1 and 19.
+      Got: ${var.zstd_level}
+    EOT
+  }
+}
+
+variable "dedup_bundles" {
+  description = <<-EOT
+    If true, store each bundle once under
+    github-backup/objects/, keyed by a hash of its refs, and
+    have the daily manifests point at it. Repositories whose
+    refs did not change (and forks identical to their
+    upstream) are neither bundled nor uploaded again, which
+    also saves replication traffic to replica_region.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "repo_policies" {
+  description = <<-EOT
+    Per-repository backup strategies, tried in order; the
+    first rule whose repos glob (e.g. "your-org/assets-*")
+    and min_size_gb both match a repository applies, and
+    repositories no rule matches get "full". "full" bundles
+    everything. "filtered" leaves blobs larger than
+    blob_limit_mb (default 1) out of the clone and bundle
+    and stores them once per object ID under
+    github-backup/blobs/. "lfs" bundles everything and also
+    copies the repository's Git LFS objects to
+    github-backup/lfs/, once per LFS object ID.
+  EOT
+  type = list(object({
+    repos         = optional(string)
+    min_size_gb   = optional(number)
+    strategy      = string
+    blob_limit_mb = optional(number)
+  }))
+  default = []
+
+  validation {
+    condition = alltrue([
+      for rule in var.repo_policies :
+      contains(["full", "filtered", "lfs"], rule.strategy)
+    ])
+    error_message = "repo_policies strategy must be one of: full, filtered, lfs."
+  }
+}
+
+variable "metadata_backup" {
+  description = <<-EOT
+    If true, also back up issues, pull requests (with
+    reviews), releases (with their assets) and wikis. Issues
+    and pull requests are exported incrementally, as
+    compressed JSON Lines next to the bundles; wikis are
+    bundled like repositories. The GitHub App needs read
+    access to issues and pull requests.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "mirror_cache_enabled" {
+  description = <<-EOT
+    If true, keep git mirrors on an EFS file system between
+    runs. Later runs only fetch what changed instead of
+    cloning every repository from scratch, and mirrors no
+    longer count against task_ephemeral_storage_gb.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "shard_count" {
+  description = <<-EOT
+    Number of Fargate tasks each scheduled run starts. Every
+    task backs up its own shard of the repositories and
+    writes a partial manifest; the last one to finish merges
+    them into manifest.json.
+  EOT
+  type        = number
+  default     = 1
+
+  validation {
+    condition     = var.shard_count >= 1 && floor(var.shard_count) == var.shard_count
+    error_message = <<-EOT
+      shard_count must be a positive integer.
+      Got: ${var.shard_count}
+    EOT
+  }
+}
+
+variable "shard_strategy" {
+  description = <<-EOT
+    How repositories are split between shards: "size"
+    balances the shards' total repository size, "hash"
+    assigns each repository by a hash of its name.
+  EOT
+  type        = string
+  default     = "size"
+
+  validation {
+    condition     = contains(["size", "hash"], var.shard_strategy)
+    error_message = <<-EOT
+      shard_strategy must be "size" or "hash".
+      Got: ${var.shard_strategy}
+    EOT
+  }
+}
+
+variable "verify_schedule_expression" {
+  description = <<-EOT
+    EventBridge schedule expression for checking the latest
+    backup (backup.py --verify), e.g. "cron(0 12 * * ? *)".
+    The check compares every stored bundle's size and S3
+    checksum with the manifest, without downloading it, and
+    restores verify_sample_size random repositories with
+    git. Failures raise the verify_failure alarm. Null
+    disables scheduled checks.
+  EOT
+  type        = string
+  default     = null
+
+  validation {
+    condition = (
+      var.verify_schedule_expression == null
+      || can(regex("^(rate|cron)\\(", var.verify_schedule_expression))
+    )
+    error_message = "verify_schedule_expression must start with 'rate(' or 'cron('."
+  }
+}
+
+variable "verify_sample_size" {
+  description = <<-EOT
+    Number of random repositories a backup check downloads
+    and verifies with git bundle verify.
+  EOT
+  type        = number
+  default     = 10
+
+  validation {
+    condition     = var.verify_sample_size >= 0
+    error_message = <<-EOT
+      verify_sample_size must be 0 or more.
+      Got: ${var.verify_sample_size}
+    EOT
+  }
+}
+
 variable "force_destroy" {
   description = <<-EOT
     Allow destroying S3 buckets even when they contain